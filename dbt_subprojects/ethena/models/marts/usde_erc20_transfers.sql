@@ -1,7 +1,14 @@
 {{
     config(
-        materialized='table'
+        materialized='incremental',
+        unique_key=['chainid', 'block_number', 'log_index'],
+        incremental_strategy='delete+insert',
+        indexes=[
+            {'columns': ['chainid', 'block_number']},
+            {'columns': ['chainid', '_dlt_load_id']},
+            {'columns': ['chainid', 'token_address', 'block_timestamp']}
+        ]
     )
 }}
 
-{{ extract_erc20_transfers(ref('stg_usde_contract_logs'), decimals=18)}}
\ No newline at end of file
+{{ extract_erc20_transfers(ref('stg_usde_contract_logs'), decimals=18)}}
@@ -0,0 +1,13 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['chainid', 'token_address', 'day'],
+        incremental_strategy='delete+insert',
+        indexes=[
+            {'columns': ['chainid', 'token_address', 'day'], 'unique': True},
+            {'columns': ['chainid', '_dlt_load_id']}
+        ]
+    )
+}}
+
+{{ daily_transfer_rollup(ref('usde_erc20_transfers')) }}
@@ -1,7 +1,13 @@
 {{
     config(
-        materialized='table'
+        materialized='incremental',
+        unique_key=['chainid', 'block_number', 'log_index'],
+        incremental_strategy='delete+insert',
+        indexes=[
+            {'columns': ['chainid', 'block_number']},
+            {'columns': ['chainid', '_dlt_load_id']}
+        ]
     )
 }}
 
-{{ process_contract_logs('raw_usde_contracts', 'usde_contract_logs') }}
\ No newline at end of file
+{{ process_contract_logs('raw_usde_contracts', 'usde_contract_logs') }}
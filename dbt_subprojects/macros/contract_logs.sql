@@ -1,9 +1,15 @@
 {% macro process_contract_logs(source_schema, source_table) %}
-select distinct
-    topics::json->>0 as topic0,
-    case when json_array_length(topics::json) >= 2 then topics::json->>1 end as topic1,
-    case when json_array_length(topics::json) >= 3 then topics::json->>2 end as topic2,
-    case when json_array_length(topics::json) >= 4 then topics::json->>3 end as topic3,
+{%- set source_relation = source(source_schema, source_table) -%}
+{%- set source_columns = [] -%}
+{%- if execute -%}
+    {%- set source_columns = adapter.get_columns_in_relation(source_relation) | map(attribute='name') | list -%}
+{%- endif -%}
+{#- The raw table is merged on (chainid, transaction_hash, log_index) at load time and
+    has a unique index on it, so no de-duplication is needed here. -#}
+select
+    {% for i in range(4) -%}
+    {{ log_topic(i, source_columns) }} as topic{{ i }},
+    {% endfor -%}
     chainid,
     address as contract_address,
     {{ clean_hex_field('data') }} as data,
@@ -14,6 +20,21 @@ select distinct
     gas_used,
     log_index,
     transaction_hash,
-    transaction_index
-from {{ source(source_schema, source_table) }}
-{% endmacro %}
\ No newline at end of file
+    transaction_index,
+    _dlt_load_id
+from {{ source_relation }} as logs
+where {{ incremental_load_filter('logs') }}
+{% endmacro %}
+
+{% macro log_topic(n, source_columns) %}
+    {#- topicN is written by the loader since topics were split at ingestion; rows loaded
+        before that only have the JSON `topics` array, which is parsed just for them. -#}
+    {%- set split_column = 'topic' ~ n -%}
+    {%- if split_column in source_columns and 'topics' in source_columns -%}
+        coalesce({{ split_column }}, topics::json->>{{ n }})
+    {%- elif 'topics' in source_columns -%}
+        topics::json->>{{ n }}
+    {%- else -%}
+        {{ split_column }}
+    {%- endif -%}
+{% endmacro %}
@@ -6,7 +6,7 @@ select
     {{ hex_to_address('topic2') }} as to_address,
     {{ extract_hex_value('data') }} as amount_hex,
     (
-        {{ hex_to_numeric(extract_hex_value('data')) }} / power(10, {{ decimals }})
+        {{ hex_to_numeric(extract_hex_value('data')) }} / power(10::numeric, {{ decimals }})
     ) as amount,
     block_number,
     block_hash,
@@ -15,13 +15,14 @@ select
     gas_used,
     log_index,
     transaction_hash,
-    transaction_index
+    transaction_index,
+    _dlt_load_id
     {% if contract_name %}
     , '{{ contract_name }}' as contract_name
     {% endif %}
-from {{ logs_ref }}
+from {{ logs_ref }} as logs
 where topic0 = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'  -- Transfer event signature
     and topic1 is not null
     and topic2 is not null
-order by block_number, log_index
+    and {{ incremental_load_filter('logs') }}
 {% endmacro %}
\ No newline at end of file
@@ -26,21 +26,44 @@
     case 
         when {{ hex_value }} is null or {{ hex_value }} = '' or {{ hex_value }} = '0'
         then 0::numeric
-        else (
-            select sum(
-                case 
-                    when substr({{ hex_value }}, i, 1) between '0' and '9' 
-                    then substr({{ hex_value }}, i, 1)::int
-                    when upper(substr({{ hex_value }}, i, 1)) = 'A' then 10
-                    when upper(substr({{ hex_value }}, i, 1)) = 'B' then 11
-                    when upper(substr({{ hex_value }}, i, 1)) = 'C' then 12
-                    when upper(substr({{ hex_value }}, i, 1)) = 'D' then 13
-                    when upper(substr({{ hex_value }}, i, 1)) = 'E' then 14
-                    when upper(substr({{ hex_value }}, i, 1)) = 'F' then 15
-                    else 0
-                end * power(16, length({{ hex_value }}) - i)
-            )::numeric
-            from generate_series(1, length({{ hex_value }})) as i
-        )
+        else {{ target.schema }}.hex_to_uint256({{ hex_value }})
     end
-{% endmacro %}
\ No newline at end of file
+{% endmacro %}
+
+{% macro hex_to_uint256_function_sql() %}
+-- Exact uint256 decoding: parses the hex string in 8-byte (16 hex char) chunks through
+-- bit(64) -> bigint casts, correcting for the sign of the top bit, and accumulates in numeric.
+create schema if not exists {{ target.schema }};
+create or replace function {{ target.schema }}.hex_to_uint256(hex_value text)
+returns numeric
+language plpgsql immutable strict parallel safe
+as $$
+declare
+    digits text := hex_value;
+    n_chunks int;
+    chunk bigint;
+    result numeric := 0;
+begin
+    if left(digits, 2) in ('0x', '0X') then
+        digits := substr(digits, 3);
+    end if;
+    if digits = '' then
+        return 0;
+    end if;
+
+    n_chunks := (length(digits) + 15) / 16;
+    digits := lpad(digits, n_chunks * 16, '0');
+    for i in 0 .. n_chunks - 1 loop
+        chunk := ('x' || substr(digits, i * 16 + 1, 16))::bit(64)::bigint;
+        result := result * 18446744073709551616::numeric
+            + case when chunk < 0 then chunk + 18446744073709551616::numeric else chunk end;
+    end loop;
+    return result;
+end;
+$$;
+{% endmacro %}
+
+{% macro create_hex_to_uint256_function() %}
+    {% do run_query(hex_to_uint256_function_sql()) %}
+    {{ log("Created " ~ target.schema ~ ".hex_to_uint256", info=True) }}
+{% endmacro %}
@@ -0,0 +1,39 @@
+{% macro load_watermarks(relation, load_column='_dlt_load_id', chain_column='chainid') %}
+    {#- Newest load marker per chain already in `relation`, as a list of (chain, marker) rows.
+        Queried once when the model is compiled; empty at parse time. -#}
+    {%- if not execute -%}
+        {{ return([]) }}
+    {%- endif -%}
+    {%- set watermarks = run_query(
+        'select ' ~ chain_column ~ ', max(' ~ load_column ~ ') from ' ~ relation
+        ~ ' where ' ~ load_column ~ ' is not null group by 1 order by 1'
+    ) -%}
+    {{ return(watermarks.rows | list) }}
+{% endmacro %}
+
+{% macro incremental_load_filter(relation_alias, load_column='_dlt_load_id', chain_column='chainid') %}
+    {#- On incremental runs, keep only rows loaded after the newest load already in the model
+        for the same chain, whatever their block: windows loaded out of block order and refilled
+        gaps are modeled too, and the model's unique_key replaces rows loaded again.
+        dlt load ids (also written by the COPY loader) are fixed-width epoch timestamps, so they
+        order correctly as text. The per-chain watermarks are queried once (load_watermarks) and
+        inlined as constants, so the source is range-scanned on its load marker rather than
+        evaluating a subquery per row. -#}
+    {% if is_incremental() %}
+    {%- set watermarks = load_watermarks(this, load_column, chain_column) -%}
+    {%- if watermarks | length == 0 %}
+    true
+    {%- else %}
+    (
+        {{ relation_alias }}.{{ chain_column }} not in (
+            {%- for chain, _ in watermarks %}{{ chain }}{% if not loop.last %}, {% endif %}{% endfor -%}
+        )
+        {%- for chain, watermark in watermarks %}
+        or ({{ relation_alias }}.{{ chain_column }} = {{ chain }} and {{ relation_alias }}.{{ load_column }} > '{{ watermark }}')
+        {%- endfor %}
+    )
+    {%- endif %}
+    {% else %}
+    true
+    {% endif %}
+{% endmacro %}
@@ -0,0 +1,112 @@
+"""
+Benchmark the hex_to_uint256 Postgres function against the previous generate_series
+hex_to_numeric macro, on random 64-char Transfer amounts.
+
+The function is created by dbt (on-run-start hook), or explicitly with:
+    ./scripts/run_dbt_ethena.sh run-operation create_hex_to_uint256_function
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from stables.config import PostgresConfig
+from stables.utils.postgres import get_postgres_connection
+from stables.utils.logging import setup_streaming_logging
+
+logger = logging.getLogger(__name__)
+setup_streaming_logging()
+
+# Expansion of the hex_to_numeric macro before it delegated to hex_to_uint256
+LEGACY_HEX_TO_NUMERIC = """
+    case
+        when h is null or h = '' or h = '0'
+        then 0::numeric
+        else (
+            select sum(
+                case
+                    when substr(h, i, 1) between '0' and '9'
+                    then substr(h, i, 1)::int
+                    when upper(substr(h, i, 1)) = 'A' then 10
+                    when upper(substr(h, i, 1)) = 'B' then 11
+                    when upper(substr(h, i, 1)) = 'C' then 12
+                    when upper(substr(h, i, 1)) = 'D' then 13
+                    when upper(substr(h, i, 1)) = 'E' then 14
+                    when upper(substr(h, i, 1)) = 'F' then 15
+                    else 0
+                end * power(16, length(h) - i)
+            )::numeric
+            from generate_series(1, length(h)) as i
+        )
+    end
+"""
+
+
+def _random_amounts(n_rows: int, seed: int = 0):
+    """Random uint256 values, skewed like token amounts (mostly 18-decimal sized)."""
+    rng = random.Random(seed)
+    bits = [64, 80, 96, 128, 256]
+    return [rng.getrandbits(rng.choice(bits)) for _ in range(n_rows)]
+
+
+def _time_query(cursor, query: str):
+    started = time.perf_counter()
+    cursor.execute(query)
+    rows = cursor.fetchall()
+    return time.perf_counter() - started, rows
+
+
+def benchmark(schema: str = "ethena", n_rows: int = 100_000):
+    amounts = _random_amounts(n_rows)
+    hex_values = [f"{amount:064x}" for amount in amounts]
+
+    with get_postgres_connection(PostgresConfig()) as conn:
+        cursor = conn.cursor()
+        cursor.execute("CREATE TEMP TABLE hex_bench (id int, h text) ON COMMIT DROP")
+        cursor.execute(
+            "INSERT INTO hex_bench SELECT i, h FROM unnest(%s::text[]) WITH ORDINALITY AS t(h, i)",
+            (hex_values,),
+        )
+        cursor.execute("ANALYZE hex_bench")
+
+        legacy_seconds, legacy_rows = _time_query(
+            cursor,
+            f"SELECT id, ({LEGACY_HEX_TO_NUMERIC})::text FROM hex_bench ORDER BY id",
+        )
+        function_seconds, function_rows = _time_query(
+            cursor,
+            f"SELECT id, {schema}.hex_to_uint256(h)::text FROM hex_bench ORDER BY id",
+        )
+        conn.rollback()
+
+    started = time.perf_counter()
+    python_values = [int(h, 16) for h in hex_values]
+    python_seconds = time.perf_counter() - started
+
+    legacy_mismatches = sum(
+        int(value) != amount for (_, value), amount in zip(legacy_rows, amounts)
+    )
+    function_mismatches = sum(
+        int(value) != amount for (_, value), amount in zip(function_rows, amounts)
+    )
+    assert python_values == amounts
+
+    logger.info(f"Decoded {n_rows} uint256 values")
+    for name, seconds, mismatches in [
+        ("generate_series macro", legacy_seconds, legacy_mismatches),
+        ("hex_to_uint256 function", function_seconds, function_mismatches),
+        ("python int(h, 16)", python_seconds, 0),
+    ]:
+        logger.info(
+            f"{name:<24} {seconds:8.3f}s {n_rows / seconds:12,.0f} rows/s "
+            f"{mismatches} inexact results"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--schema", default="ethena")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    benchmark(schema=args.schema, n_rows=args.rows)
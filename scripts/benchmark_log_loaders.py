@@ -0,0 +1,125 @@
+"""
+Benchmark the two log write paths on synthetic ERC-20 Transfer logs: dlt's merge
+(pipeline.run) against the COPY loader (stables.data.load.copy_loader).
+
+Each loader writes the same windows into its own table of a scratch schema, which is
+dropped before and after the run.
+"""
+
+import argparse
+import logging
+import random
+import time
+
+import dlt
+
+from stables.config import PostgresConfig
+from stables.data.load.logs import commit_window
+from stables.data.source.etherscan import decode_log_batch
+from stables.utils.postgres import get_postgres_connection
+from stables.utils.logging import setup_streaming_logging
+
+logger = logging.getLogger(__name__)
+setup_streaming_logging()
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+def _raw_logs(from_block: int, to_block: int, logs_per_block: int, rng):
+    """Raw getLogs items as Etherscan returns them (hex fields, topics array)."""
+    items = []
+    for block in range(from_block, to_block + 1):
+        for log_index in range(logs_per_block):
+            items.append(
+                {
+                    "address": "0x4c9edd5852cd905f086c759e8383e09bff1e68b3",
+                    "topics": [
+                        TRANSFER_TOPIC,
+                        f"0x{rng.getrandbits(160):064x}",
+                        f"0x{rng.getrandbits(160):064x}",
+                    ],
+                    "data": f"0x{rng.getrandbits(96):064x}",
+                    "blockNumber": hex(block),
+                    "blockHash": f"0x{rng.getrandbits(256):064x}",
+                    "timeStamp": hex(1_700_000_000 + 12 * block),
+                    "gasPrice": hex(rng.randrange(10**9, 10**11)),
+                    "gasUsed": hex(rng.randrange(21_000, 500_000)),
+                    "logIndex": hex(log_index) if log_index else "0x",
+                    "transactionHash": f"0x{rng.getrandbits(256):064x}",
+                    "transactionIndex": hex(log_index),
+                }
+            )
+    return items
+
+
+def _drop_schema(db_config: PostgresConfig, schema: str):
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        cursor.execute(f"DROP SCHEMA IF EXISTS {schema}_staging CASCADE")
+        conn.commit()
+
+
+def benchmark(
+    schema: str = "bench_log_loaders",
+    n_windows: int = 10,
+    blocks_per_window: int = 500,
+    logs_per_block: int = 4,
+):
+    db_config = PostgresConfig()
+    rng = random.Random(0)
+    windows = []
+    for i in range(n_windows):
+        from_block = 1 + i * blocks_per_window
+        to_block = from_block + blocks_per_window - 1
+        windows.append(
+            (from_block, to_block, _raw_logs(from_block, to_block, logs_per_block, rng))
+        )
+    n_rows = sum(len(raw) for _, _, raw in windows)
+
+    _drop_schema(db_config, schema)
+    pipeline = dlt.pipeline(
+        pipeline_name="bench_log_loaders",
+        destination=dlt.destinations.postgres(**db_config.get_dlt_connection_params()),
+        dataset_name=schema,
+    )
+
+    try:
+        for loader in ["dlt", "copy"]:
+            started = time.perf_counter()
+            for from_block, to_block, raw in windows:
+                logs = decode_log_batch([dict(item) for item in raw], chainid=1)
+                commit_window(
+                    pipeline,
+                    db_config,
+                    schema,
+                    f"logs_{loader}",
+                    1,
+                    "0x4c9edd5852cd905f086c759e8383e09bff1e68b3",
+                    from_block,
+                    to_block,
+                    logs,
+                    loader=loader,
+                )
+            seconds = time.perf_counter() - started
+            logger.info(
+                f"{loader:<5} {n_rows} logs in {n_windows} windows: {seconds:8.2f}s "
+                f"{n_rows / seconds:12,.0f} rows/s"
+            )
+    finally:
+        _drop_schema(db_config, schema)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--schema", default="bench_log_loaders")
+    parser.add_argument("--windows", type=int, default=10)
+    parser.add_argument("--blocks-per-window", type=int, default=500)
+    parser.add_argument("--logs-per-block", type=int, default=4)
+    args = parser.parse_args()
+    benchmark(
+        schema=args.schema,
+        n_windows=args.windows,
+        blocks_per_window=args.blocks_per_window,
+        logs_per_block=args.logs_per_block,
+    )
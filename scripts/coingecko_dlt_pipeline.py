@@ -0,0 +1,84 @@
+"""
+Backfill and refresh CoinGecko prices of many coins into `<dataset>.prices_<granularity>`.
+
+By default the coins are the gecko_id values of the DefiLlama stablecoins. Each run
+only fetches the timestamps after the last loaded one of every coin.
+"""
+
+import argparse
+import logging
+from datetime import datetime
+
+import dlt
+
+from stables.config import PostgresConfig
+from stables.data.source import coingecko_market_chart_range, defillama_stables_base
+from stables.utils.logging import setup_file_logging, setup_streaming_logging
+
+logger = logging.getLogger(__name__)
+setup_file_logging(log_file="logs/coingecko_dlt_pipeline.log")
+setup_streaming_logging()
+
+
+def stablecoin_gecko_ids():
+    """CoinGecko ids of the DefiLlama stablecoins, in DefiLlama's order."""
+    return [row["gecko_id"] for row in defillama_stables_base() if row["gecko_id"]]
+
+
+def coingecko_prices_pipeline(
+    coin_ids=None,
+    vs_currency: str = "usd",
+    granularity: str = "daily",
+    start: datetime = None,
+    dataset_name: str = "coingecko",
+    arrow: bool = False,
+):
+    db_config = PostgresConfig()
+    pipeline = dlt.pipeline(
+        pipeline_name="coingecko_prices",
+        destination=dlt.destinations.postgres(**db_config.get_dlt_connection_params()),
+        dataset_name=dataset_name,
+    )
+    coin_ids = coin_ids or stablecoin_gecko_ids()
+    logger.info(f"Loading {granularity} prices of {len(coin_ids)} coins")
+    load_info = pipeline.run(
+        coingecko_market_chart_range(
+            coin_ids,
+            vs_currency=vs_currency,
+            granularity=granularity,
+            start=start,
+            arrow=arrow,
+        ),
+        table_name=f"prices_{granularity}",
+    )
+    logger.info(load_info)
+    return load_info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--coin-ids",
+        nargs="+",
+        help="CoinGecko ids, all DefiLlama stablecoins if omitted",
+    )
+    parser.add_argument("--vs-currency", default="usd")
+    parser.add_argument("--granularity", choices=["daily", "hourly"], default="daily")
+    parser.add_argument(
+        "--start",
+        type=datetime.fromisoformat,
+        help="First UTC timestamp of coins without loaded prices, e.g. 2024-01-01",
+    )
+    parser.add_argument("--dataset", default="coingecko")
+    parser.add_argument(
+        "--arrow", action="store_true", help="Load pyarrow batches (needs pyarrow)"
+    )
+    args = parser.parse_args()
+    coingecko_prices_pipeline(
+        coin_ids=args.coin_ids,
+        vs_currency=args.vs_currency,
+        granularity=args.granularity,
+        start=args.start,
+        dataset_name=args.dataset,
+        arrow=args.arrow,
+    )
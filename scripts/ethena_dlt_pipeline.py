@@ -1,10 +1,12 @@
+import argparse
 import logging
 import dlt
 
 
 from stables.utils.logging import setup_file_logging, setup_streaming_logging
 from stables.config import PostgresConfig
-from stables.data.load.logs import logs_loading
+from stables.data.decode import decode_contract_events
+from stables.data.load.logs import follow_logs, logs_loading
 
 logger = logging.getLogger(__name__)
 setup_file_logging(log_file="logs/ethena_dlt_pipeline.log")
@@ -37,9 +39,82 @@ def backfill_logs(
         contract_address=contract_address,
         start_block=None,
         end_block=19_510_000,
-        block_chunk_size=1_000,
+        block_chunk_size=10_000,
+        max_workers=4,
+    )
+
+
+def follow_usde_logs(
+    table_schema: str = "ethena_raw",
+    table_name: str = "usde_contract_logs",
+    confirmations: int = 12,
+    poll_interval: float = 12.0,
+):
+    """Load usde logs up to the chain head, then keep following it."""
+
+    db_config = PostgresConfig()
+    pipeline = dlt.pipeline(
+        pipeline_name="ethena",
+        destination=dlt.destinations.postgres(**db_config.get_dlt_connection_params()),
+        dataset_name=table_schema,
+    )
+
+    follow_logs(
+        pipeline=pipeline,
+        db_config=db_config,
+        table_schema=table_schema,
+        table_name=table_name,
+        chainid=1,
+        contract_address="0x4c9edd5852cd905f086c759e8383e09bff1e68b3",
+        confirmations=confirmations,
+        poll_interval=poll_interval,
+        block_chunk_size=10_000,
+        max_workers=4,
+    )
+
+
+def decode_usde_events(
+    table_schema: str = "ethena_raw",
+    table_name: str = "usde_contract_logs",
+    events_schema: str = "ethena_events",
+):
+    """Decode the loaded usde logs into one table per event of the usde ABI."""
+
+    db_config = PostgresConfig()
+    pipeline = dlt.pipeline(
+        pipeline_name="ethena_events",
+        destination=dlt.destinations.postgres(**db_config.get_dlt_connection_params()),
+        dataset_name=events_schema,
+    )
+
+    decode_contract_events(
+        pipeline=pipeline,
+        db_config=db_config,
+        table_schema=table_schema,
+        table_name=table_name,
+        chainid=1,
+        contract_address="0x4c9edd5852cd905f086c759e8383e09bff1e68b3",
+        table_prefix="usde_evt_",
     )
 
 
 if __name__ == "__main__":
-    backfill_logs()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--follow", action="store_true", help="Keep following the chain head"
+    )
+    parser.add_argument(
+        "--decode", action="store_true", help="Decode the loaded logs into event tables"
+    )
+    parser.add_argument("--confirmations", type=int, default=12)
+    parser.add_argument("--poll-interval", type=float, default=12.0)
+    args = parser.parse_args()
+
+    if args.decode:
+        decode_usde_events()
+    elif args.follow:
+        follow_usde_logs(
+            confirmations=args.confirmations, poll_interval=args.poll_interval
+        )
+    else:
+        backfill_logs()
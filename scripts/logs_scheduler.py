@@ -0,0 +1,50 @@
+"""
+Load the event logs of every contract in a manifest, interleaving all targets in one
+worker pool (see stables.data.load.scheduler), and keep following the chain heads.
+"""
+
+import argparse
+import logging
+
+from stables.utils.logging import setup_file_logging, setup_streaming_logging
+from stables.config import PostgresConfig
+from stables.data.load.scheduler import LogScheduler, load_manifest
+
+logger = logging.getLogger(__name__)
+setup_file_logging(log_file="logs/logs_scheduler.log")
+setup_streaming_logging()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--manifest", default="scripts/log_targets.toml")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--confirmations", type=int, default=0)
+    parser.add_argument("--poll-interval", type=float, default=60.0)
+    parser.add_argument(
+        "--once", action="store_true", help="Exit once all targets are caught up"
+    )
+    args = parser.parse_args()
+
+    targets = load_manifest(args.manifest)
+    logger.info(f"Loaded {len(targets)} targets from {args.manifest}")
+    scheduler = LogScheduler(
+        targets,
+        PostgresConfig(),
+        max_workers=args.workers,
+        confirmations=args.confirmations,
+        poll_interval=args.poll_interval,
+    )
+    if args.once:
+        scheduler.run_once()
+        if scheduler.errors:
+            raise SystemExit(f"{len(scheduler.errors)} targets failed")
+        return
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+
+
+if __name__ == "__main__":
+    main()
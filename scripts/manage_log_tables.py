@@ -0,0 +1,46 @@
+"""
+Create the indexes of the log tables of every target in a manifest and optionally
+range-partition them by block_number (see stables.data.load.log_tables).
+
+Loads create missing indexes themselves; run this to index existing tables up front
+or to partition a table that has grown large. Stop the loaders before partitioning.
+"""
+
+import argparse
+import logging
+
+from stables.utils.logging import setup_streaming_logging
+from stables.config import PostgresConfig
+from stables.data.load.log_tables import ensure_log_indexes, partition_log_table
+from stables.data.load.scheduler import load_manifest
+
+logger = logging.getLogger(__name__)
+setup_streaming_logging()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--manifest", default="scripts/log_targets.toml")
+    parser.add_argument(
+        "--partition-size",
+        type=int,
+        default=None,
+        help="Partition the tables into ranges of this many blocks",
+    )
+    args = parser.parse_args()
+
+    db_config = PostgresConfig()
+    tables = sorted(
+        {(t.table_schema, t.table_name) for t in load_manifest(args.manifest)}
+    )
+    for table_schema, table_name in tables:
+        if args.partition_size:
+            partition_log_table(
+                db_config, table_schema, table_name, args.partition_size
+            )
+        if not ensure_log_indexes(db_config, table_schema, table_name):
+            logger.warning(f"{table_schema}.{table_name} does not exist yet")
+
+
+if __name__ == "__main__":
+    main()
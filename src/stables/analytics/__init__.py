@@ -0,0 +1,43 @@
+from .balances import (
+    BalanceSnapshot,
+    BalanceUpdate,
+    apply_transfers,
+    read_transfers,
+    top_holders,
+    update_balances,
+)
+from .peg import (
+    PegState,
+    PegUpdate,
+    peg_metrics,
+    read_peg_inputs,
+    update_peg_metrics,
+    update_peg_state,
+)
+from .rollups import (
+    hll_estimate,
+    hll_merge,
+    hll_sketch,
+    read_daily_rollup,
+    rollup_periods,
+)
+
+__all__ = [
+    "BalanceSnapshot",
+    "BalanceUpdate",
+    "apply_transfers",
+    "read_transfers",
+    "top_holders",
+    "update_balances",
+    "PegState",
+    "PegUpdate",
+    "peg_metrics",
+    "read_peg_inputs",
+    "update_peg_metrics",
+    "update_peg_state",
+    "hll_estimate",
+    "hll_merge",
+    "hll_sketch",
+    "read_daily_rollup",
+    "rollup_periods",
+]
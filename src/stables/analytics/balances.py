@@ -0,0 +1,378 @@
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from stables.analytics.uint256 import (
+    N_LIMBS,
+    hex_to_limbs,
+    is_nonzero,
+    limbs_to_decimal,
+    limbs_to_int,
+    normalize_limbs,
+    sort_descending,
+)
+from stables.config import PostgresConfig
+from stables.utils.postgres import read_sql_frame
+
+logger = logging.getLogger(__name__)
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+TRANSFER_COLUMNS = [
+    "block_number",
+    "log_index",
+    "block_timestamp",
+    "from_address",
+    "to_address",
+    "amount_hex",
+]
+
+
+@dataclass
+class BalanceSnapshot:
+    """
+    Balances of every address of a token after a position in the transfer stream.
+
+    The zero address holds minus the total supply (mints are transfers from it,
+    burns transfers to it).
+    """
+
+    chainid: int
+    token_address: str
+    decimals: int = 18
+    # Position of the last transfer included, (block_number, log_index)
+    position: Tuple[int, int] = (-1, -1)
+    addresses: np.ndarray = field(default_factory=lambda: np.array([], dtype="U42"))
+    # Normalized limbs, shape (len(addresses), N_LIMBS)
+    balances: np.ndarray = field(
+        default_factory=lambda: np.zeros((0, N_LIMBS), dtype=np.int64)
+    )
+
+    @property
+    def total_supply(self) -> int:
+        zero = np.flatnonzero(self.addresses == ZERO_ADDRESS)
+        if not len(zero):
+            return 0
+        return -int(limbs_to_int(self.balances[zero])[0])
+
+    @property
+    def holders(self) -> int:
+        """Number of addresses other than the zero address with a non-zero balance."""
+        return int((is_nonzero(self.balances) & (self.addresses != ZERO_ADDRESS)).sum())
+
+    def save(self, path: str):
+        """Write the snapshot to a .npz file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = {
+            "chainid": self.chainid,
+            "token_address": self.token_address,
+            "decimals": self.decimals,
+            "position": list(self.position),
+        }
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                meta=np.array(json.dumps(meta)),
+                addresses=self.addresses,
+                balances=self.balances,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BalanceSnapshot":
+        """Read a snapshot written by save."""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                chainid=meta["chainid"],
+                token_address=meta["token_address"],
+                decimals=meta["decimals"],
+                position=tuple(meta["position"]),
+                addresses=data["addresses"],
+                balances=data["balances"],
+            )
+
+
+@dataclass
+class BalanceUpdate:
+    """Result of applying a batch of transfers to a snapshot."""
+
+    snapshot: BalanceSnapshot
+    # One row per balance change: address, block_number, log_index, balance_raw, balance
+    history: Optional[pd.DataFrame]
+    # One row per day with transfers: day, supply_raw, supply, holders (end of day, UTC)
+    daily: pd.DataFrame
+
+
+def apply_transfers(
+    snapshot: BalanceSnapshot, transfers: pd.DataFrame, history: bool = True
+) -> BalanceUpdate:
+    """
+    Apply ERC-20 transfers to a balance snapshot.
+
+    Every transfer becomes a debit row of `from_address` and a credit row of
+    `to_address`, and every address of the snapshot an opening row. Rows are sorted by
+    (address, position) and one cumulative sum over their uint256 limbs yields the
+    running balance of every address after each of its transfers, exact and without a
+    Python loop over transfers. Supply and holder counts per day follow from the
+    running balances of the zero address and from balances turning (non-)zero.
+
+    Transfers at or before the snapshot position are skipped, so overlapping batches
+    can be applied safely.
+
+    Args:
+        snapshot: Balances before the transfers
+        transfers: DataFrame with the TRANSFER_COLUMNS of the usde_erc20_transfers mart
+        history: Also return the running balance of every balance change, which
+            converts one value per transfer side to Python ints and Decimals
+
+    Returns:
+        BalanceUpdate: New snapshot, balance history and daily supply and holders
+    """
+    block = transfers["block_number"].to_numpy(dtype=np.int64)
+    log_index = transfers["log_index"].to_numpy(dtype=np.int64)
+    last_block, last_log_index = snapshot.position
+    new = (block > last_block) | ((block == last_block) & (log_index > last_log_index))
+    transfers = transfers[new]
+    if transfers.empty:
+        return BalanceUpdate(snapshot, None, _empty_daily())
+
+    order = np.lexsort(
+        (
+            transfers["log_index"].to_numpy(dtype=np.int64),
+            transfers["block_number"].to_numpy(dtype=np.int64),
+        )
+    )
+    transfers = transfers.iloc[order]
+    n = len(transfers)
+    amounts = hex_to_limbs(transfers["amount_hex"].to_numpy())
+
+    # Address codes over the snapshot addresses and the new ones. Hashing is much
+    # faster than sorting the strings; only the distinct addresses are sorted.
+    codes, uniques = pd.factorize(
+        np.concatenate(
+            [
+                snapshot.addresses.astype(object),
+                transfers["from_address"].str.lower().to_numpy(dtype=object),
+                transfers["to_address"].str.lower().to_numpy(dtype=object),
+            ]
+        )
+    )
+    address_order = np.argsort(uniques.astype(str))
+    addresses = uniques.astype(str)[address_order]
+    code = np.empty_like(address_order)
+    code[address_order] = np.arange(len(address_order))
+    code = code[codes]
+    n_open = len(snapshot.addresses)
+    # Opening rows come first (seq -1), then debit and credit of transfer i (seq i)
+    seq = np.concatenate([np.full(n_open, -1), np.arange(n), np.arange(n)])
+    delta = np.concatenate([snapshot.balances, -amounts, amounts])
+
+    rows = np.lexsort((seq, code))
+    code, seq, delta = code[rows], seq[rows], delta[rows]
+    running = np.cumsum(delta, axis=0)
+    # Restart the sum at each address: subtract the total of the preceding addresses
+    starts = np.flatnonzero(np.r_[True, code[1:] != code[:-1]])
+    offsets = np.vstack([np.zeros((1, N_LIMBS), np.int64), running[starts[1:] - 1]])
+    group_sizes = np.diff(np.r_[starts, len(code)])
+    running = normalize_limbs(running - np.repeat(offsets, group_sizes, axis=0))
+
+    # Holders: balances turning non-zero (+1) or zero (-1), except the zero address
+    after = is_nonzero(running)
+    before = np.r_[False, after[:-1]]
+    before[starts] = False
+    counted = addresses[code] != ZERO_ADDRESS
+    holder_delta = (after.astype(np.int64) - before) * counted
+
+    last_rows = np.r_[starts[1:] - 1, len(code) - 1]
+    new_snapshot = BalanceSnapshot(
+        chainid=snapshot.chainid,
+        token_address=snapshot.token_address,
+        decimals=snapshot.decimals,
+        position=(
+            int(transfers["block_number"].iloc[-1]),
+            int(transfers["log_index"].iloc[-1]),
+        ),
+        addresses=addresses[code[last_rows]].astype("U42"),
+        balances=running[last_rows],
+    )
+
+    changes = seq >= 0
+    daily = _daily(
+        snapshot,
+        transfers,
+        seq[changes],
+        running[changes],
+        addresses[code[changes]] == ZERO_ADDRESS,
+        holder_delta[changes],
+    )
+
+    history_df = None
+    if history:
+        chronological = np.lexsort((np.arange(changes.sum()), seq[changes]))
+        balances = running[changes][chronological]
+        history_seq = seq[changes][chronological]
+        history_df = pd.DataFrame(
+            {
+                "address": addresses[code[changes]][chronological],
+                "block_number": transfers["block_number"].to_numpy()[history_seq],
+                "log_index": transfers["log_index"].to_numpy()[history_seq],
+                "balance_raw": limbs_to_int(balances),
+                "balance": limbs_to_decimal(balances, snapshot.decimals),
+            }
+        )
+
+    logger.info(
+        f"Applied {n} transfers up to block {new_snapshot.position[0]}: "
+        f"{len(addresses)} addresses, {new_snapshot.holders} holders"
+    )
+    return BalanceUpdate(new_snapshot, history_df, daily)
+
+
+def _empty_daily() -> pd.DataFrame:
+    return pd.DataFrame(columns=["day", "supply_raw", "supply", "holders"])
+
+
+def _daily(
+    snapshot: BalanceSnapshot,
+    transfers: pd.DataFrame,
+    seq: np.ndarray,
+    running: np.ndarray,
+    is_zero_address: np.ndarray,
+    holder_delta: np.ndarray,
+) -> pd.DataFrame:
+    """Supply and holders at the end of every UTC day with transfers."""
+    timestamps = pd.to_datetime(transfers["block_timestamp"], utc=True)
+    days = timestamps.dt.tz_localize(None).to_numpy(dtype="datetime64[D]")
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    row_days = day_index[seq]
+
+    # Supply is minus the zero address balance after its last change of each day. The
+    # zero address rows are in seq order, so the row indices grow with the day and a
+    # running maximum carries the supply forward over days without mints or burns.
+    zero_rows = np.flatnonzero(is_zero_address)
+    last_change = np.full(len(unique_days), -1)
+    last_change[row_days[zero_rows]] = zero_rows
+    last_change = np.maximum.accumulate(last_change)
+    opening = snapshot.balances[snapshot.addresses == ZERO_ADDRESS]
+    opening = opening[0] if len(opening) else np.zeros(N_LIMBS, np.int64)
+    supply_limbs = normalize_limbs(
+        -np.where(
+            (last_change >= 0)[:, None], running[np.maximum(last_change, 0)], opening
+        )
+    )
+
+    holders = snapshot.holders + np.cumsum(
+        np.bincount(
+            row_days,
+            weights=holder_delta,
+            minlength=len(unique_days),
+        ).astype(np.int64)
+    )
+    return pd.DataFrame(
+        {
+            "day": pd.to_datetime(unique_days).tz_localize("UTC"),
+            "supply_raw": limbs_to_int(supply_limbs),
+            "supply": limbs_to_decimal(supply_limbs, snapshot.decimals),
+            "holders": holders,
+        }
+    )
+
+
+def top_holders(snapshot: BalanceSnapshot, n: int = 10) -> pd.DataFrame:
+    """
+    The largest balances of a snapshot, the zero address excluded.
+
+    Returns:
+        pd.DataFrame: address, balance_raw and balance (Decimal), largest first
+    """
+    holders = snapshot.addresses != ZERO_ADDRESS
+    addresses = snapshot.addresses[holders]
+    balances = snapshot.balances[holders]
+    top = sort_descending(balances)[:n]
+    return pd.DataFrame(
+        {
+            "address": addresses[top],
+            "balance_raw": limbs_to_int(balances[top]),
+            "balance": limbs_to_decimal(balances[top], snapshot.decimals),
+        }
+    )
+
+
+def read_transfers(
+    db_config: PostgresConfig,
+    chainid: int,
+    token_address: str,
+    after: Tuple[int, int] = (-1, -1),
+    table: str = "ethena_marts.usde_erc20_transfers",
+) -> pd.DataFrame:
+    """
+    Read the transfers of a token after a (block_number, log_index) position.
+
+    Args:
+        db_config: PostgresConfig instance
+        chainid: Blockchain chain ID
+        token_address: Token contract address
+        after: Position of the last transfer already applied
+        table: Transfers table, with the columns of the usde_erc20_transfers mart
+
+    Returns:
+        pd.DataFrame: TRANSFER_COLUMNS of the new transfers
+    """
+    return read_sql_frame(
+        db_config,
+        table,
+        columns=TRANSFER_COLUMNS,
+        where="chainid = %(chainid)s AND token_address = %(token_address)s"
+        " AND (block_number, log_index) > (%(block_number)s, %(log_index)s)",
+        params={
+            "chainid": chainid,
+            "token_address": token_address.lower(),
+            "block_number": after[0],
+            "log_index": after[1],
+        },
+    )
+
+
+def update_balances(
+    db_config: PostgresConfig,
+    snapshot_path: str,
+    chainid: int,
+    token_address: str,
+    decimals: int = 18,
+    table: str = "ethena_marts.usde_erc20_transfers",
+    history: bool = False,
+) -> BalanceUpdate:
+    """
+    Bring a stored balance snapshot up to date with the transfers table.
+
+    Only transfers after the snapshot position are read; the updated snapshot is
+    written back to `snapshot_path`. Without a stored snapshot the balances are built
+    from the first transfer.
+
+    Args:
+        db_config: PostgresConfig instance
+        snapshot_path: Path of the .npz snapshot
+        chainid: Blockchain chain ID
+        token_address: Token contract address
+        decimals: Token decimals, used for new snapshots
+        table: Transfers table, see read_transfers
+        history: Also return the running balance of every balance change
+
+    Returns:
+        BalanceUpdate: New snapshot, balance history and daily supply and holders
+    """
+    if os.path.exists(snapshot_path):
+        snapshot = BalanceSnapshot.load(snapshot_path)
+    else:
+        snapshot = BalanceSnapshot(chainid, token_address.lower(), decimals)
+
+    transfers = read_transfers(
+        db_config, chainid, token_address, snapshot.position, table
+    )
+    update = apply_transfers(snapshot, transfers, history=history)
+    update.snapshot.save(snapshot_path)
+    return update
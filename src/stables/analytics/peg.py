@@ -0,0 +1,457 @@
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from stables.config import PostgresConfig
+from stables.utils.postgres import read_sql_frame
+
+logger = logging.getLogger(__name__)
+
+# Price of one unit of each DefiLlama peg type, in the quote currency of the prices
+PEG_PRICES = {"peggedUSD": 1.0}
+# Lower bound of the supply change volatility, so a coin whose supply did not move
+# over the window gets a finite z-score on its first move
+SUPPLY_STD_FLOOR = 1e-4
+METRIC_COLUMNS = [
+    "price",
+    "deviation",
+    "max_abs_deviation",
+    "volatility",
+    "supply",
+    "supply_change",
+    "supply_z",
+]
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum over the last `window` rows (inclusive) of a (time, coin) matrix."""
+    total = np.cumsum(values, axis=0)
+    rolled = total.copy()
+    rolled[window:] -= total[:-window]
+    return rolled
+
+
+def rolling_mean_std(
+    values: np.ndarray, window: int, min_periods: int = 2
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rolling mean and sample standard deviation along the time axis, ignoring NaN.
+
+    All coins are rolled at once from cumulative sums of the values, their squares
+    and the number of values, in O(time x coins).
+
+    Args:
+        values: (time, coin) matrix
+        window: Rows in each window, ending at the current one
+        min_periods: Fewer values in a window give NaN
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Mean and standard deviation, shaped like values
+    """
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+    n = _rolling_sum(valid.astype(np.float64), window)
+    s1 = _rolling_sum(x, window)
+    s2 = _rolling_sum(x * x, window)
+    enough = n >= max(min_periods, 2)
+    safe_n = np.where(enough, n, 2.0)
+    mean = np.where(enough, s1 / safe_n, np.nan)
+    variance = np.maximum(s2 - s1 * s1 / safe_n, 0.0) / (safe_n - 1)
+    return mean, np.where(enough, np.sqrt(variance), np.nan)
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling maximum along the time axis, ignoring NaN (NaN for all-NaN windows)."""
+    padded = np.vstack(
+        [
+            np.full((window - 1, values.shape[1]), -np.inf),
+            np.where(np.isnan(values), -np.inf, values),
+        ]
+    )
+    rolled = sliding_window_view(padded, window, axis=0).max(axis=-1)
+    return np.where(np.isneginf(rolled), np.nan, rolled)
+
+
+def _log_change(values: np.ndarray) -> np.ndarray:
+    """Log change from the previous row, NaN for the first row and non-positive values."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.log(np.where(values > 0, values, np.nan))
+    change = np.full_like(logs, np.nan)
+    change[1:] = logs[1:] - logs[:-1]
+    return change
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Carry the last value of every column forward over NaN rows."""
+    rows = np.where(~np.isnan(values), np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])]
+
+
+def peg_metrics(
+    prices: np.ndarray, supplies: np.ndarray, pegs: np.ndarray, window: int
+) -> Dict[str, np.ndarray]:
+    """
+    Peg and supply metrics of a universe of coins on a regular time grid.
+
+    - deviation: price / peg - 1
+    - max_abs_deviation: largest |deviation| over the window
+    - volatility: standard deviation of the log price changes over the window
+    - supply_change: log change of the supply (carried forward over missing points)
+    - supply_z: supply_change in standard deviations of the changes of the previous
+      window, the standard deviation being at least SUPPLY_STD_FLOOR
+
+    Args:
+        prices: (time, coin) prices, NaN where missing
+        supplies: (time, coin) circulating supplies, NaN where missing
+        pegs: (coin,) peg prices, NaN for coins without a peg
+        window: Rows in the rolling windows
+
+    Returns:
+        dict[str, np.ndarray]: (time, coin) matrices keyed by METRIC_COLUMNS
+    """
+    min_periods = max(2, window // 2)
+    deviation = prices / pegs - 1
+    _, volatility = rolling_mean_std(_log_change(prices), window, min_periods)
+
+    supplies = _forward_fill(supplies)
+    supply_change = _log_change(supplies)
+    mean, std = rolling_mean_std(supply_change, window, min_periods)
+    # Compare each change with the window before it, which it is not part of
+    previous_mean = np.full_like(mean, np.nan)
+    previous_std = np.full_like(std, np.nan)
+    previous_mean[1:], previous_std[1:] = mean[:-1], std[:-1]
+    supply_z = (supply_change - previous_mean) / np.maximum(
+        previous_std, SUPPLY_STD_FLOOR
+    )
+
+    return {
+        "price": prices,
+        "deviation": deviation,
+        "max_abs_deviation": rolling_max(np.abs(deviation), window),
+        "volatility": volatility,
+        "supply": supplies,
+        "supply_change": supply_change,
+        "supply_z": supply_z,
+    }
+
+
+@dataclass
+class PegState:
+    """
+    Tail of the (time, coin) price and supply matrices of a coin universe.
+
+    The last window + 2 rows are enough context to extend every metric of
+    peg_metrics with new rows.
+    """
+
+    window: int = 30
+    # pandas frequency of the time grid
+    freq: str = "1D"
+    coins: np.ndarray = field(default_factory=lambda: np.array([], dtype=str))
+    pegs: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    # Grid timestamps of the tail rows, naive UTC
+    timestamps: np.ndarray = field(
+        default_factory=lambda: np.array([], dtype="datetime64[s]")
+    )
+    prices: np.ndarray = field(default_factory=lambda: np.zeros((0, 0)))
+    supplies: np.ndarray = field(default_factory=lambda: np.zeros((0, 0)))
+
+    @property
+    def last_timestamp(self) -> Optional[pd.Timestamp]:
+        """Last grid timestamp evaluated (UTC), None before the first update."""
+        if not len(self.timestamps):
+            return None
+        return pd.Timestamp(self.timestamps[-1], tz="UTC")
+
+    def save(self, path: str):
+        """Write the state to a .npz file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = {"window": self.window, "freq": self.freq}
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                meta=np.array(json.dumps(meta)),
+                coins=self.coins,
+                pegs=self.pegs,
+                timestamps=self.timestamps,
+                prices=self.prices,
+                supplies=self.supplies,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "PegState":
+        """Read a state written by save."""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                window=meta["window"],
+                freq=meta["freq"],
+                coins=data["coins"],
+                pegs=data["pegs"],
+                timestamps=data["timestamps"],
+                prices=data["prices"],
+                supplies=data["supplies"],
+            )
+
+
+@dataclass
+class PegUpdate:
+    """Result of extending a PegState with new points."""
+
+    state: PegState
+    # One row per (timestamp, coin_id) of the new grid rows with a price or a supply:
+    # METRIC_COLUMNS, and the depeg and supply_shock flags
+    metrics: pd.DataFrame
+
+
+def _utc_times(values) -> np.ndarray:
+    """Timestamps as naive UTC datetime64[ns], naive inputs being UTC."""
+    times = pd.DatetimeIndex(pd.to_datetime(pd.Series(values), utc=True, cache=False))
+    return times.tz_localize(None).to_numpy()
+
+
+def _floor(times: np.ndarray, freq: str) -> np.ndarray:
+    """datetime64 timestamps floored to a fixed-length grid, as datetime64[s]."""
+    step = pd.Timedelta(freq).value
+    floored = times.astype("datetime64[ns]").view(np.int64) // step * step
+    return floored.astype("datetime64[ns]").astype("datetime64[s]")
+
+
+def _to_matrix(
+    frame: Optional[pd.DataFrame],
+    column: str,
+    timestamps: np.ndarray,
+    coins: pd.Index,
+    freq: str,
+) -> np.ndarray:
+    """(time, coin) matrix of a long frame, the last point of a grid cell winning."""
+    matrix = np.full((len(timestamps), len(coins)), np.nan)
+    if frame is None or frame.empty:
+        return matrix
+    times = _utc_times(frame["timestamp"])
+    cells = _floor(times, freq)
+    rows = np.searchsorted(timestamps, cells)
+    columns = coins.get_indexer(frame["coin_id"])
+    keep = (rows < len(timestamps)) & (columns >= 0)
+    keep[keep] = timestamps[rows[keep]] == cells[keep]
+
+    # Last point of every cell, in time order
+    order = np.argsort(times, kind="stable")
+    order = order[keep[order]]
+    cell_ids = rows[order] * len(coins) + columns[order]
+    _, last = np.unique(cell_ids[::-1], return_index=True)
+    points = order[len(order) - 1 - last]
+    matrix[rows[points], columns[points]] = np.asarray(frame[column], dtype=np.float64)[
+        points
+    ]
+    return matrix
+
+
+def update_peg_metrics(
+    state: PegState,
+    prices: pd.DataFrame,
+    supplies: Optional[pd.DataFrame] = None,
+    pegs: Optional[Dict[str, float]] = None,
+    max_deviation: float = 0.005,
+    max_supply_z: float = 4.0,
+) -> PegUpdate:
+    """
+    Extend the peg metrics of a coin universe with new price and supply points.
+
+    Points are placed on the state's time grid (the last point of a coin in a grid
+    cell wins). Only grid rows after the last one already evaluated are new: load both
+    sources up to the same time before updating, as later points of evaluated rows are
+    ignored. The metrics of the new rows are computed for all coins at once by
+    peg_metrics over the state's tail and the new rows, and the tail is kept for the
+    next update.
+
+    Args:
+        state: State of the previous update, or a new PegState
+        prices: coin_id, timestamp, price
+        supplies: coin_id, timestamp, supply (circulating)
+        pegs: Peg price of coins, 1.0 for coins that appear without one
+        max_deviation: |deviation| from which a point is flagged `depeg`
+        max_supply_z: |supply_z| from which a point is flagged `supply_shock`
+
+    Returns:
+        PegUpdate: New state and the metrics of the new grid rows
+    """
+    pegs = pegs or {}
+    frames = [frame for frame in (prices, supplies) if frame is not None]
+    new_coins = pd.unique(
+        np.concatenate([np.asarray(frame["coin_id"], dtype=object) for frame in frames])
+    )
+    coins = pd.Index(list(state.coins)).append(
+        pd.Index(new_coins).difference(pd.Index(list(state.coins)), sort=False)
+    )
+    coin_pegs = np.concatenate(
+        [state.pegs, np.ones(len(coins) - len(state.coins))]
+    ).astype(np.float64)
+    for coin, peg in pegs.items():
+        if coin in coins:
+            coin_pegs[coins.get_loc(coin)] = peg
+
+    step = np.timedelta64(pd.Timedelta(state.freq).value, "ns").astype("timedelta64[s]")
+    grid = [_floor(_utc_times(frame["timestamp"]), state.freq) for frame in frames]
+    grid = np.concatenate(grid) if grid else np.array([], dtype="datetime64[s]")
+    if len(state.timestamps):
+        n_late = int((grid <= state.timestamps[-1]).sum())
+        if n_late:
+            logger.debug(f"Ignoring {n_late} points of already evaluated rows")
+        start = state.timestamps[-1] + step
+    else:
+        start = grid.min() if len(grid) else None
+    if start is None or not len(grid):
+        timestamps = np.array([], dtype="datetime64[s]")
+    else:
+        timestamps = np.arange(start, grid.max() + step, step)
+
+    # Tail rows widened to the new coins, followed by the new rows
+    pad = len(coins) - len(state.coins)
+    tail_prices = np.pad(state.prices, ((0, 0), (0, pad)), constant_values=np.nan)
+    tail_supplies = np.pad(state.supplies, ((0, 0), (0, pad)), constant_values=np.nan)
+    all_prices = np.vstack(
+        [tail_prices, _to_matrix(prices, "price", timestamps, coins, state.freq)]
+    )
+    all_supplies = np.vstack(
+        [
+            tail_supplies,
+            _to_matrix(supplies, "supply", timestamps, coins, state.freq),
+        ]
+    )
+    metrics = peg_metrics(all_prices, all_supplies, coin_pegs, state.window)
+
+    n_new = len(timestamps)
+    keep = state.window + 2
+    new_state = PegState(
+        window=state.window,
+        freq=state.freq,
+        coins=np.array(list(coins), dtype=str),
+        pegs=coin_pegs,
+        timestamps=np.concatenate([state.timestamps, timestamps])[-keep:],
+        prices=all_prices[-keep:],
+        supplies=metrics["supply"][-keep:],
+    )
+
+    # Long frame of the new rows, one row per (timestamp, coin) with data
+    new = {name: values[len(values) - n_new :] for name, values in metrics.items()}
+    present = ~(np.isnan(new["price"]) & np.isnan(new["supply"]))
+    time_index, coin_index = np.nonzero(present)
+    frame = pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime(timestamps[time_index]).tz_localize("UTC"),
+            "coin_id": np.asarray(coins, dtype=object)[coin_index],
+            **{name: new[name][present] for name in METRIC_COLUMNS},
+        }
+    )
+    frame["depeg"] = frame["deviation"].abs() >= max_deviation
+    frame["supply_shock"] = frame["supply_z"].abs() >= max_supply_z
+    return PegUpdate(state=new_state, metrics=frame)
+
+
+def read_peg_inputs(
+    db_config: PostgresConfig,
+    after: Optional[pd.Timestamp] = None,
+    prices_table: str = "coingecko.prices_daily",
+    stables_table: str = "defillama.defillama_stables_base",
+    chain_tokens_table: str = "defillama.defillama_stablecoins_chain_tokens",
+    vs_currency: str = "usd",
+) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, float]]:
+    """
+    Read CoinGecko prices and DefiLlama circulating supplies keyed by CoinGecko id.
+
+    Supplies are the circulating amounts of the chain tokens table summed over chains,
+    matched to coins through the gecko_id of the stables table. Pegs follow the peg type
+    of the stables table (PEG_PRICES), NaN for other peg types.
+
+    Args:
+        db_config: PostgresConfig instance
+        after: Only points at or after this UTC timestamp
+        prices_table: Table loaded by coingecko_market_chart_range
+        stables_table: Table loaded by defillama_stables_base
+        chain_tokens_table: Table loaded by defillama_stablecoins_chain_tokens
+        vs_currency: Quote currency of the prices
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame, dict]: Prices (coin_id, timestamp, price),
+            supplies (coin_id, timestamp, supply) and pegs by coin_id
+    """
+    time_range = (after, None) if after is not None else None
+    prices = read_sql_frame(
+        db_config,
+        prices_table,
+        columns=["coin_id", "timestamp", "price"],
+        where="vs_currency = %(vs_currency)s",
+        params={"vs_currency": vs_currency},
+        time_range=time_range,
+        time_column="timestamp",
+    )
+    supplies = read_sql_frame(
+        db_config,
+        f"""(
+            SELECT stables.gecko_id AS coin_id,
+                to_timestamp(tokens.date) AS timestamp,
+                sum(tokens.circulating) AS supply
+            FROM {chain_tokens_table} AS tokens
+            JOIN {stables_table} AS stables ON stables.id = tokens.stablecoin_id
+            WHERE stables.gecko_id IS NOT NULL
+            GROUP BY 1, 2
+        ) AS supplies""",
+        time_range=time_range,
+        time_column="timestamp",
+    )
+    peg_types = read_sql_frame(
+        db_config,
+        stables_table,
+        columns=["gecko_id", "peg_type"],
+        where="gecko_id IS NOT NULL",
+    )
+    pegs = {
+        coin: PEG_PRICES.get(peg_type, np.nan)
+        for coin, peg_type in zip(peg_types["gecko_id"], peg_types["peg_type"])
+    }
+    return prices, supplies, pegs
+
+
+def update_peg_state(
+    db_config: PostgresConfig,
+    state_path: str,
+    window: int = 30,
+    freq: str = "1D",
+    **tables,
+) -> PegUpdate:
+    """
+    Bring a stored peg state up to date with the price and supply tables.
+
+    Only points after the last evaluated grid row are read; the updated state is
+    written back to `state_path`.
+
+    Args:
+        db_config: PostgresConfig instance
+        state_path: Path of the .npz state
+        window: Rolling window of new states, in grid rows
+        freq: Time grid of new states
+        **tables: Table names and quote currency, see read_peg_inputs
+
+    Returns:
+        PegUpdate: New state and metrics of the new grid rows
+    """
+    if os.path.exists(state_path):
+        state = PegState.load(state_path)
+    else:
+        state = PegState(window=window, freq=freq)
+
+    after = state.last_timestamp
+    if after is not None:
+        after += pd.Timedelta(state.freq)
+    prices, supplies, pegs = read_peg_inputs(db_config, after=after, **tables)
+    update = update_peg_metrics(state, prices, supplies, pegs)
+    update.state.save(state_path)
+    return update
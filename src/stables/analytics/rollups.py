@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import math
+from decimal import Decimal
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from stables.config import PostgresConfig
+from stables.utils.postgres import read_sql_frame
+
+logger = logging.getLogger(__name__)
+
+# Must match the precision the daily rollup models were built with (macros/rollups.sql)
+HLL_PRECISION = 11
+SKETCH_COLUMNS = ["sender_hll", "receiver_hll"]
+COUNT_COLUMNS = ["transfer_count", "mint_count", "burn_count"]
+VOLUME_COLUMNS = ["volume", "mint_volume", "burn_volume"]
+
+
+def hll_sketch(addresses: Iterable[str], precision: int = HLL_PRECISION) -> np.ndarray:
+    """
+    HyperLogLog sketch of addresses, identical to the hll_sketches dbt macro.
+
+    An address is hashed to the first 64 bits of md5(lower(address)); the top
+    `precision` bits select a register, which keeps the highest rank (1-based position
+    of the first 1-bit in the remaining bits, or their count + 1 if all are 0).
+
+    Args:
+        addresses: Addresses to count
+        precision: Number of bits selecting the register (2^precision registers)
+
+    Returns:
+        np.ndarray: int16 registers
+    """
+    n_bits = 64 - precision
+    low_mask = (1 << n_bits) - 1
+    sketch = np.zeros(1 << precision, dtype=np.int16)
+    for address in set(addresses):
+        hashed = int(hashlib.md5(address.lower().encode()).hexdigest()[:16], 16)
+        register = hashed >> n_bits
+        rank = n_bits - (hashed & low_mask).bit_length() + 1
+        if rank > sketch[register]:
+            sketch[register] = rank
+    return sketch
+
+
+def hll_merge(sketches: Iterable[np.ndarray]) -> np.ndarray:
+    """Union of sketches of the same precision (elementwise maximum of the registers)."""
+    sketches = list(sketches)
+    if not sketches:
+        raise ValueError("No sketches to merge")
+    return np.maximum.reduce(sketches)
+
+
+def hll_estimate(sketch: np.ndarray) -> float:
+    """
+    Estimated number of distinct values of a sketch, same as the hll_estimate SQL function.
+
+    Linear counting is used while the raw estimate is small and some registers are
+    still empty.
+    """
+    m = float(len(sketch))
+    raw_estimate = (
+        (0.7213 / (1 + 1.079 / m)) * m * m / np.sum(np.exp2(-sketch.astype(float)))
+    )
+    zeros = int(np.count_nonzero(sketch == 0))
+    if raw_estimate <= 2.5 * m and zeros:
+        return m * math.log(m / zeros)
+    return float(raw_estimate)
+
+
+def _parse_sketch(value) -> np.ndarray:
+    """Registers of a smallint[] value, a list or its Postgres text form, e.g. "{0,3,1}"."""
+    if isinstance(value, str):
+        return np.array(value.strip("{}").split(","), dtype=np.int16)
+    return np.asarray(value, dtype=np.int16)
+
+
+def read_daily_rollup(
+    db_config: PostgresConfig,
+    chainid: Optional[int] = None,
+    token_address: Optional[str] = None,
+    time_range: Optional[Tuple] = None,
+    table: str = "ethena_marts.usde_erc20_transfers_daily",
+) -> pd.DataFrame:
+    """
+    Read a daily transfer rollup (see the daily_transfer_rollup dbt macro).
+
+    Args:
+        db_config: PostgresConfig instance
+        chainid: Only this chain, all if None
+        token_address: Only this token, all if None
+        time_range: (start, end) on `day`, start inclusive and end exclusive
+        table: Rollup table
+
+    Returns:
+        pd.DataFrame: One row per (chainid, token_address, day), sorted by day, with
+            the sketch columns as int16 register arrays and the volumes as Decimal
+    """
+    conditions, params = [], {}
+    if chainid is not None:
+        conditions.append("chainid = %(chainid)s")
+        params["chainid"] = chainid
+    if token_address is not None:
+        conditions.append("token_address = %(token_address)s")
+        params["token_address"] = token_address.lower()
+
+    daily = read_sql_frame(
+        db_config,
+        table,
+        where=" AND ".join(conditions) or None,
+        params=params,
+        time_range=time_range,
+        time_column="day",
+        order_by="chainid, token_address, day",
+    )
+    for column in SKETCH_COLUMNS:
+        daily[column] = daily[column].map(_parse_sketch).astype(object)
+    for column in VOLUME_COLUMNS:
+        daily[column] = daily[column].map(Decimal).astype(object)
+    return daily
+
+
+def rollup_periods(daily: pd.DataFrame, freq: str = "M") -> pd.DataFrame:
+    """
+    Roll daily aggregates up to longer periods, without rescanning transfers.
+
+    Counts and volumes are summed. Distinct senders and receivers are not additive
+    across days, so the daily sketches of each period are merged and estimated.
+
+    Args:
+        daily: Frame returned by read_daily_rollup
+        freq: pandas period alias, e.g. "W" (weeks starting on Monday) or "M"
+
+    Returns:
+        pd.DataFrame: One row per (chainid, token_address, period), with the count and
+            volume columns, first/last block, and estimated sender_count/receiver_count
+    """
+    days = pd.to_datetime(daily["day"].astype("datetime64[us, UTC]"), utc=True)
+    periods = days.dt.tz_localize(None).dt.to_period(freq).dt.start_time
+    frame = daily.assign(period=periods.dt.tz_localize("UTC").to_numpy(dtype=object))
+    rows = []
+    for (chainid, token_address, period), group in frame.groupby(
+        ["chainid", "token_address", "period"], sort=True
+    ):
+        row = {"chainid": chainid, "token_address": token_address, "period": period}
+        row.update({column: int(group[column].sum()) for column in COUNT_COLUMNS})
+        row.update(
+            {column: sum(group[column], Decimal(0)) for column in VOLUME_COLUMNS}
+        )
+        row["first_block"] = int(group["first_block"].min())
+        row["last_block"] = int(group["last_block"].max())
+        row["sender_count"] = hll_estimate(hll_merge(group["sender_hll"]))
+        row["receiver_count"] = hll_estimate(hll_merge(group["receiver_hll"]))
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,118 @@
+"""
+Exact uint256 arithmetic on NumPy arrays.
+
+A uint256 value is held as 8 little-endian 32-bit limbs in an int64 row, so sums of
+up to 2**31 values (e.g. a cumulative sum over a transfer stream) never overflow and
+stay exact. normalize_limbs propagates the carries afterwards; only the final values
+are converted to Python ints or Decimals.
+"""
+
+from decimal import Context, Decimal
+
+import numpy as np
+import pandas as pd
+
+N_LIMBS = 8
+LIMB_BITS = 32
+
+# Enough digits for any uint256 (78 digits), so scaling never rounds
+_DECIMAL_CONTEXT = Context(prec=100)
+
+_HEX_VALUES = np.full(256, -1, dtype=np.int64)
+for _i, _c in enumerate(b"0123456789abcdef"):
+    _HEX_VALUES[_c] = _i
+_HEX_VALUES[ord("A") : ord("F") + 1] = _HEX_VALUES[ord("a") : ord("f") + 1]
+_NIBBLE_WEIGHTS = 16 ** np.arange(7, -1, -1, dtype=np.int64)
+
+
+def hex_to_limbs(values) -> np.ndarray:
+    """
+    Parse hex strings (with or without "0x", None/"" as 0) into limbs.
+
+    Args:
+        values: Sequence or Series of hex strings of at most 64 digits
+
+    Returns:
+        np.ndarray: int64 array of shape (n, N_LIMBS), least significant limb first
+
+    Raises:
+        ValueError: If a value is longer than 64 digits or not hexadecimal
+    """
+    digits = pd.Series(values, dtype=object).fillna("").astype(str)
+    digits = digits.str.removeprefix("0x").str.removeprefix("0X")
+    if (digits.str.len() > 64).any():
+        raise ValueError("Hex value longer than 256 bits")
+
+    chars = digits.str.zfill(64).to_numpy(dtype="S64").view(np.uint8)
+    nibbles = _HEX_VALUES[chars.reshape(-1, 64)]
+    if (nibbles < 0).any():
+        raise ValueError("Invalid hex digit")
+    # 8 nibbles per limb, most significant limb first, then flipped
+    return (nibbles.reshape(-1, N_LIMBS, 8) @ _NIBBLE_WEIGHTS)[:, ::-1].copy()
+
+
+def int_to_limbs(values) -> np.ndarray:
+    """Split non-negative Python ints into limbs, see hex_to_limbs."""
+    return hex_to_limbs([f"{int(v):x}" for v in values])
+
+
+def normalize_limbs(limbs: np.ndarray) -> np.ndarray:
+    """
+    Propagate carries so limbs 0..6 are in [0, 2**32) and the sign is in the top limb.
+
+    Args:
+        limbs: int64 array of shape (n, N_LIMBS), e.g. a cumulative sum of limbs
+
+    Returns:
+        np.ndarray: Normalized copy representing the same values
+    """
+    limbs = limbs.copy()
+    for k in range(N_LIMBS - 1):
+        carry = limbs[:, k] >> LIMB_BITS
+        limbs[:, k] -= carry << LIMB_BITS
+        limbs[:, k + 1] += carry
+    return limbs
+
+
+def limbs_to_int(limbs: np.ndarray) -> np.ndarray:
+    """
+    Convert limbs to exact Python ints.
+
+    Returns:
+        np.ndarray: object array of ints, one per row
+    """
+    values = limbs[:, N_LIMBS - 1].astype(object)
+    for k in range(N_LIMBS - 2, -1, -1):
+        values = values * (1 << LIMB_BITS) + limbs[:, k].astype(object)
+    return values
+
+
+def limbs_to_decimal(limbs: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    Convert limbs of raw token units to exact Decimal token amounts.
+
+    Args:
+        limbs: int64 array of shape (n, N_LIMBS)
+        decimals: Token decimals, e.g. 18
+
+    Returns:
+        np.ndarray: object array of Decimals
+    """
+    return np.array(
+        [
+            Decimal(value).scaleb(-decimals, context=_DECIMAL_CONTEXT)
+            for value in limbs_to_int(limbs)
+        ],
+        dtype=object,
+    )
+
+
+def is_nonzero(limbs: np.ndarray) -> np.ndarray:
+    """Boolean mask of the non-zero values of normalized limbs."""
+    return (limbs != 0).any(axis=1)
+
+
+def sort_descending(limbs: np.ndarray) -> np.ndarray:
+    """Indices sorting normalized limbs by value, largest first."""
+    # lexsort uses the last key as the primary one: the most significant limb
+    return np.lexsort([limbs[:, k] for k in range(N_LIMBS)])[::-1]
@@ -13,13 +13,53 @@ ETHERSCAN_TRANSACTION_COLUMNS = {
     "time_stamp": {"data_type": "timestamp"},
 }
 
+# Integer fields of Etherscan txlist results, typed explicitly in Arrow output
+ETHERSCAN_TRANSACTION_INT_FIELDS = (
+    "blockNumber",
+    "timeStamp",
+    "nonce",
+    "transactionIndex",
+    "gas",
+    "gasPrice",
+    "cumulativeGasUsed",
+    "gasUsed",
+    "confirmations",
+)
+
+# Text fields of Etherscan txlist results, typed explicitly in Arrow output
+ETHERSCAN_TRANSACTION_TEXT_FIELDS = (
+    "hash",
+    "blockHash",
+    "from",
+    "to",
+    "value",
+    "input",
+    "methodId",
+    "functionName",
+    "contractAddress",
+    "txreceipt_status",
+    "isError",
+)
+
 COINGECKO_API_BASE_URL = "https://api.coingecko.com/api/v3"
+COINGECKO_PRO_API_BASE_URL = "https://pro-api.coingecko.com/api/v3"
 COINGECKO_API_KEY = os.getenv("COINGECKO_API_KEY")
+# "demo" (free key) or "pro" (paid key, served from COINGECKO_PRO_API_BASE_URL)
+COINGECKO_API_PLAN = os.getenv("COINGECKO_API_PLAN", "demo")
+# Sustained request budget per plan, "public" being the keyless API
+COINGECKO_CALLS_PER_MINUTE = {"public": 10, "demo": 30, "pro": 500}
 COINGECKO_PRICES_COLUMNS = {
     "timestamp": {"data_type": "timestamp", "timezone": False, "precision": 3},
     "price": {"data_type": "decimal"},
 }
 
+COINGECKO_MARKET_CHART_COLUMNS = {
+    "timestamp": {"data_type": "timestamp", "timezone": True, "precision": 3},
+    "price": {"data_type": "double"},
+    "market_cap": {"data_type": "double", "nullable": True},
+    "total_volume": {"data_type": "double", "nullable": True},
+}
+
 COINGECKO_OHLC_COLUMNS = {
     "timestamp": {"data_type": "timestamp", "timezone": False, "precision": 3},
     "open": {"data_type": "decimal"},
@@ -29,7 +69,10 @@ COINGECKO_OHLC_COLUMNS = {
 }
 
 ETHERSCAN_LOG_COLUMNS = {
-    "topics": {"data_type": "json"},
+    "topic0": {"data_type": "text", "nullable": True},
+    "topic1": {"data_type": "text", "nullable": True},
+    "topic2": {"data_type": "text", "nullable": True},
+    "topic3": {"data_type": "text", "nullable": True},
     "block_number": {"data_type": "bigint"},
     "time_stamp": {"data_type": "bigint"},
     "gas_price": {"data_type": "bigint"},
@@ -38,6 +81,30 @@ ETHERSCAN_LOG_COLUMNS = {
     "transaction_index": {"data_type": "bigint"},
 }
 
+# Hex-encoded numeric fields of Etherscan getLogs results
+ETHERSCAN_LOG_HEX_FIELDS = (
+    "blockNumber",
+    "timeStamp",
+    "gasPrice",
+    "gasUsed",
+    "logIndex",
+    "transactionIndex",
+)
+
+# On-disk HTTP response cache shared by the API sources, STABLES_HTTP_CACHE=0 disables it
+HTTP_CACHE_ENABLED = os.getenv("STABLES_HTTP_CACHE", "1") != "0"
+HTTP_CACHE_PATH = os.getenv("STABLES_HTTP_CACHE_PATH", "data/cache/http_cache.sqlite")
+# Entries stored longer ago than this (seconds), even those that never expire, and the
+# oldest entries beyond the size cap (bytes of response bodies) are pruned when the
+# cache is opened
+HTTP_CACHE_MAX_AGE = float(os.getenv("STABLES_HTTP_CACHE_MAX_AGE", 30 * 86400))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("STABLES_HTTP_CACHE_MAX_BYTES", 1 << 30))
+
+# Persistent store of contract creation transactions and ABIs
+CONTRACT_METADATA_PATH = os.getenv(
+    "STABLES_CONTRACT_METADATA_PATH", "data/cache/contract_metadata.sqlite"
+)
+
 
 class PostgresConfig:
     """PostgreSQL configuration manager that reads from environment variables."""
@@ -0,0 +1,12 @@
+from .abi import AbiType, EventIndex, EventSpec, event_specs
+from .events import decode_contract_events, decode_events, load_events
+
+__all__ = [
+    "AbiType",
+    "EventIndex",
+    "EventSpec",
+    "event_specs",
+    "decode_contract_events",
+    "decode_events",
+    "load_events",
+]
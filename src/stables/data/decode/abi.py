@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from stables.utils.keccak import selector
+
+logger = logging.getLogger(__name__)
+
+_ARRAY_SUFFIX = re.compile(r"^(.*)\[(\d*)\]$")
+
+
+@dataclass(frozen=True)
+class AbiType:
+    """A parameter type of an ABI entry, with the components of tuple types."""
+
+    type: str
+    components: Tuple["AbiType", ...] = ()
+
+    @classmethod
+    def from_abi(cls, entry: dict) -> "AbiType":
+        return cls(
+            entry["type"],
+            tuple(cls.from_abi(c) for c in entry.get("components", [])),
+        )
+
+    @property
+    def canonical(self) -> str:
+        """Type as written in signatures, tuples expanded: "(address,uint256)[]"."""
+        if self.type.startswith("tuple"):
+            inner = ",".join(c.canonical for c in self.components)
+            return f"({inner}){self.type[len('tuple'):]}"
+        return self.type
+
+    @property
+    def element(self) -> Optional[Tuple["AbiType", Optional[int]]]:
+        """(element type, length or None if dynamic) of an array type, None otherwise."""
+        match = _ARRAY_SUFFIX.match(self.type)
+        if not match:
+            return None
+        length = int(match.group(2)) if match.group(2) else None
+        return AbiType(match.group(1), self.components), length
+
+    @property
+    def is_dynamic(self) -> bool:
+        if self.type in ("string", "bytes"):
+            return True
+        element = self.element
+        if element is not None:
+            element_type, length = element
+            return length is None or element_type.is_dynamic
+        if self.type == "tuple":
+            return any(c.is_dynamic for c in self.components)
+        return False
+
+    @property
+    def head_words(self) -> int:
+        """32-byte words the type takes in the head of an encoding."""
+        if self.is_dynamic:
+            return 1
+        element = self.element
+        if element is not None:
+            element_type, length = element
+            return length * element_type.head_words
+        if self.type == "tuple":
+            return sum(c.head_words for c in self.components)
+        return 1
+
+
+@dataclass(frozen=True)
+class EventParam:
+    name: str
+    type: AbiType
+    indexed: bool
+
+
+@dataclass(frozen=True)
+class EventSpec:
+    """An event of a contract ABI."""
+
+    name: str
+    params: Tuple[EventParam, ...]
+    anonymous: bool = False
+
+    @classmethod
+    def from_abi(cls, entry: dict) -> "EventSpec":
+        params = tuple(
+            EventParam(
+                p.get("name") or f"arg{i}",
+                AbiType.from_abi(p),
+                bool(p.get("indexed")),
+            )
+            for i, p in enumerate(entry.get("inputs", []))
+        )
+        return cls(entry["name"], params, bool(entry.get("anonymous")))
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}({','.join(p.type.canonical for p in self.params)})"
+
+    @property
+    def topic0(self) -> str:
+        return selector(self.signature)
+
+    @property
+    def n_topics(self) -> int:
+        """Number of topics of a log of this event, topic0 included."""
+        return sum(p.indexed for p in self.params) + (0 if self.anonymous else 1)
+
+
+def event_specs(abi: List[dict]) -> List[EventSpec]:
+    """The events of a contract ABI."""
+    return [EventSpec.from_abi(entry) for entry in abi if entry.get("type") == "event"]
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+
+
+class EventIndex:
+    """
+    Lookup of event specs by (topic0, number of topics), built once from ABIs.
+
+    The topic count tells apart events sharing a signature hash but not their
+    indexing, e.g. ERC-20 Transfer (value in data) and ERC-721 Transfer (tokenId
+    indexed). Anonymous events have no topic0 and are not indexed.
+    """
+
+    def __init__(self, specs: Iterable[EventSpec] = ()):
+        self._specs: Dict[Tuple[str, int], EventSpec] = {}
+        self._table_names: Dict[EventSpec, str] = {}
+        for spec in specs:
+            self.add(spec)
+
+    @classmethod
+    def from_abis(cls, abis: Iterable[List[dict]]) -> "EventIndex":
+        return cls(spec for abi in abis for spec in event_specs(abi))
+
+    @classmethod
+    def from_abi_dir(cls, abi_dir: str = "data/abi") -> "EventIndex":
+        """Index the events of every ABI saved by get_contract_abi under `abi_dir`."""
+        abis = []
+        for directory, dir_names, file_names in os.walk(abi_dir):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.endswith(".json"):
+                    with open(os.path.join(directory, file_name)) as f:
+                        abis.append(json.load(f))
+        return cls.from_abis(abis)
+
+    def add(self, spec: EventSpec):
+        if spec.anonymous:
+            return
+        key = (spec.topic0, spec.n_topics)
+        if key in self._specs:
+            return
+        self._specs[key] = spec
+        names = set(self._table_names.values())
+        name = _snake_case(spec.name)
+        # Overloaded events get the start of their topic0 appended
+        self._table_names[spec] = (
+            name if name not in names else f"{name}_{spec.topic0[2:10]}"
+        )
+
+    def get(self, topic0: str, n_topics: int) -> Optional[EventSpec]:
+        return self._specs.get((topic0, n_topics))
+
+    def table_name(self, spec: EventSpec) -> str:
+        """snake_case event name, e.g. "role_granted" for RoleGranted."""
+        return self._table_names[spec]
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __iter__(self):
+        return iter(self._specs.values())
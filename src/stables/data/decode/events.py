@@ -0,0 +1,380 @@
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import dlt
+import numpy as np
+import pandas as pd
+
+from stables.analytics.uint256 import hex_to_limbs, limbs_to_int
+from stables.config import PostgresConfig
+from stables.data.decode.abi import AbiType, EventIndex, EventParam, EventSpec
+from stables.data.load.checkpoints import (
+    get_checkpoint,
+    get_loaded_ranges,
+    record_loaded_range,
+)
+from stables.data.load.log_tables import LOG_PRIMARY_KEY
+from stables.data.source import get_contract_resolver
+from stables.utils.postgres import read_sql_frame
+
+logger = logging.getLogger(__name__)
+
+# Raw log columns copied to every event table
+LOG_COLUMNS = [
+    "chainid",
+    "address",
+    "block_number",
+    "time_stamp",
+    "log_index",
+    "transaction_hash",
+    "transaction_index",
+]
+TOPIC_COLUMNS = ["topic0", "topic1", "topic2", "topic3"]
+_WORD = 64  # hex digits per 32-byte word
+
+
+def _int_bits(abi_type: AbiType) -> Optional[int]:
+    """Bit size of an (u)intN type, None for other types."""
+    for prefix in ("uint", "int"):
+        if abi_type.type.startswith(prefix) and abi_type.type[len(prefix) :].isdigit():
+            return int(abi_type.type[len(prefix) :])
+        if abi_type.type == prefix:
+            return 256
+    return None
+
+
+def is_big_int(abi_type: AbiType) -> bool:
+    """Whether values of the type may not fit a signed 64-bit integer."""
+    bits = _int_bits(abi_type)
+    if bits is None:
+        return False
+    return bits > (64 if abi_type.type.startswith("int") else 63)
+
+
+def _is_elementary(abi_type: AbiType) -> bool:
+    return (
+        abi_type.type in ("address", "bool")
+        or _int_bits(abi_type) is not None
+        or (abi_type.type.startswith("bytes") and abi_type.type[5:].isdigit())
+    )
+
+
+def decode_words(words: pd.Series, abi_type: AbiType) -> np.ndarray:
+    """
+    Decode a column of 32-byte words (64 hex digits, no prefix) of an elementary type.
+
+    Integers of up to 64 bits become int64, wider ones exact Python ints; addresses
+    and bytesN 0x-prefixed hex strings.
+
+    Args:
+        words: Hex words, one per log
+        abi_type: Elementary static ABI type
+
+    Returns:
+        np.ndarray: Decoded values
+    """
+    words = words.fillna("").astype(str)
+    if abi_type.type == "address":
+        return ("0x" + words.str.slice(24)).to_numpy(dtype=object)
+    if abi_type.type == "bool":
+        return (words.str.lstrip("0") != "").to_numpy()
+    if abi_type.type.startswith("bytes"):
+        n_bytes = int(abi_type.type[5:])
+        return ("0x" + words.str.slice(0, 2 * n_bytes)).to_numpy(dtype=object)
+
+    limbs = hex_to_limbs(words.to_numpy(dtype=object))
+    if not is_big_int(abi_type):
+        # The low 64 bits, sign-extended values of intN <= 64 come out right as int64
+        low = limbs[:, 0].astype(np.uint64) | (limbs[:, 1].astype(np.uint64) << 32)
+        return low.view(np.int64)
+    values = limbs_to_int(limbs)
+    if abi_type.type.startswith("int"):
+        negative = limbs[:, 7] >= 1 << 31
+        values[negative] -= 1 << 256
+    return values
+
+
+def _decode_elementary(word: bytes, abi_type: AbiType) -> Any:
+    if abi_type.type == "address":
+        return "0x" + word[12:].hex()
+    if abi_type.type == "bool":
+        return word != bytes(32)
+    if abi_type.type.startswith("bytes"):
+        return "0x" + word[: int(abi_type.type[5:])].hex()
+    value = int.from_bytes(word, "big")
+    if abi_type.type.startswith("int") and value >= 1 << 255:
+        value -= 1 << 256
+    return value
+
+
+def decode_value(data: bytes, position: int, base: int, abi_type: AbiType) -> Any:
+    """
+    Decode one value of any ABI type from an encoding (row by row, for the types
+    decode_words does not handle: string, bytes, arrays and tuples).
+
+    Args:
+        data: ABI-encoded bytes
+        position: Byte offset of the value's head
+        base: Byte offset of the enclosing tuple, which dynamic offsets are relative to
+        abi_type: ABI type of the value
+
+    Returns:
+        Decoded value: str for string, 0x hex for bytes and lists for arrays and tuples
+    """
+    if abi_type.is_dynamic:
+        position = base + int.from_bytes(data[position : position + 32], "big")
+
+    if abi_type.type in ("string", "bytes"):
+        length = int.from_bytes(data[position : position + 32], "big")
+        raw = data[position + 32 : position + 32 + length]
+        return (
+            raw.decode("utf-8", "replace")
+            if abi_type.type == "string"
+            else "0x" + raw.hex()
+        )
+
+    element = abi_type.element
+    if element is not None:
+        element_type, length = element
+        if length is None:
+            length = int.from_bytes(data[position : position + 32], "big")
+            position += 32
+        return [
+            decode_value(
+                data,
+                position + 32 * i * element_type.head_words,
+                position,
+                element_type,
+            )
+            for i in range(length)
+        ]
+
+    if abi_type.type == "tuple":
+        values = []
+        head = position
+        for component in abi_type.components:
+            values.append(decode_value(data, head, position, component))
+            head += 32 * component.head_words
+        return values
+
+    return _decode_elementary(data[position : position + 32], abi_type)
+
+
+def _column_name(param: EventParam) -> str:
+    """Column of a parameter, suffixed with "_" if it collides with a LOG_COLUMNS one."""
+    return f"{param.name}_" if param.name in LOG_COLUMNS else param.name
+
+
+def _decode_group(logs: pd.DataFrame, spec: EventSpec) -> pd.DataFrame:
+    """Decode the logs of one event, one vectorized pass per parameter."""
+    data = logs["data"].fillna("").astype(str).str.removeprefix("0x")
+    columns = {c: logs[c].to_numpy() for c in LOG_COLUMNS if c in logs}
+
+    topic = 1
+    head = 0  # word index of the next non-indexed parameter
+    raw_data = None
+    for param in spec.params:
+        name = _column_name(param)
+        if param.indexed:
+            words = logs[f"topic{topic}"].fillna("").astype(str).str.removeprefix("0x")
+            topic += 1
+            if _is_elementary(param.type):
+                columns[name] = decode_words(words, param.type)
+            else:
+                # Indexed strings, bytes, arrays and tuples are stored as their hash
+                columns[name] = ("0x" + words).to_numpy(dtype=object)
+            continue
+
+        if _is_elementary(param.type):
+            words = data.str.slice(_WORD * head, _WORD * (head + 1))
+            columns[name] = decode_words(words, param.type)
+        else:
+            if raw_data is None:
+                raw_data = [bytes.fromhex(d) for d in data]
+            values = [decode_value(d, 32 * head, 0, param.type) for d in raw_data]
+            if param.type.type not in ("string", "bytes"):
+                values = [json.dumps(v) for v in values]
+            columns[name] = np.array(values, dtype=object)
+        head += param.type.head_words
+    return pd.DataFrame(columns)
+
+
+def decode_events(
+    logs: pd.DataFrame, index: EventIndex
+) -> Dict[EventSpec, pd.DataFrame]:
+    """
+    Decode raw logs into one DataFrame per event.
+
+    Logs are grouped by (topic0, number of topics) and each group is looked up once in
+    the index; within a group every parameter is decoded for all logs at once. Logs of
+    events not in the index are skipped.
+
+    Args:
+        logs: Raw logs with topic0..topic3, data and the LOG_COLUMNS present
+        index: Events to decode
+
+    Returns:
+        dict[EventSpec, pd.DataFrame]: LOG_COLUMNS plus one column per event parameter
+            (array and tuple values as JSON), per event found in the logs
+    """
+    topics = [c for c in TOPIC_COLUMNS if c in logs]
+    n_topics = logs[topics].notna().sum(axis=1).to_numpy()
+    keys = logs["topic0"].fillna("").astype(str).str.lower().to_numpy(dtype=object)
+
+    decoded = {}
+    n_unknown = 0
+    frame = pd.DataFrame({"topic0": keys, "n_topics": n_topics})
+    for (topic0, count), rows in frame.groupby(
+        ["topic0", "n_topics"], sort=False
+    ).indices.items():
+        spec = index.get(topic0, int(count))
+        if spec is None:
+            n_unknown += len(rows)
+            continue
+        decoded[spec] = _decode_group(logs.iloc[rows], spec)
+
+    if n_unknown:
+        logger.info(f"Skipped {n_unknown} logs of events not in the ABI")
+    return decoded
+
+
+def _event_columns(spec: EventSpec) -> Dict[str, dict]:
+    """dlt column hints: wei for integers wider than bigint, text for JSON values."""
+    hints = {}
+    for param in spec.params:
+        if is_big_int(param.type):
+            hints[_column_name(param)] = {"data_type": "wei"}
+        elif not _is_elementary(param.type):
+            hints[_column_name(param)] = {"data_type": "text"}
+    return hints
+
+
+def _records(frame: pd.DataFrame, spec: EventSpec) -> List[dict]:
+    frame = frame.astype(object).where(frame.notna(), None)
+    for param in spec.params:
+        if is_big_int(param.type):
+            # dlt serializes ints as 64-bit, Decimals keep uint256 values exact
+            name = _column_name(param)
+            frame[name] = [None if v is None else Decimal(v) for v in frame[name]]
+    return frame.to_dict("records")
+
+
+def load_events(
+    pipeline,
+    decoded: Dict[EventSpec, pd.DataFrame],
+    index: EventIndex,
+    table_prefix: str,
+):
+    """
+    Merge decoded events into one table per event, `{table_prefix}{event_name}`.
+
+    Args:
+        pipeline: DLT pipeline of the destination schema
+        decoded: Output of decode_events
+        index: Index the events were decoded with, for the table names
+        table_prefix: Prefix of the event tables, e.g. "usde_evt_"
+    """
+    resources = [
+        dlt.resource(
+            _records(frame, spec),
+            name=f"{table_prefix}{index.table_name(spec)}",
+            write_disposition="merge",
+            primary_key=LOG_PRIMARY_KEY,
+            columns=_event_columns(spec),
+        )
+        for spec, frame in decoded.items()
+        if len(frame)
+    ]
+    if resources:
+        pipeline.run(resources)
+
+
+def decode_contract_events(
+    pipeline,
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    contract_address: str,
+    table_prefix: str,
+    index: Optional[EventIndex] = None,
+    from_block: Optional[int] = None,
+    to_block: Optional[int] = None,
+    block_chunk_size: int = 100_000,
+):
+    """
+    Decode the raw logs of a contract into event tables, window by window.
+
+    Raw logs are read from `table_schema.table_name` (see read_sql_frame), decoded
+    with decode_events and merged into the event tables of `pipeline` by load_events.
+    Decoded windows are checkpointed under `{table_name}__decoded`, so a run resumes
+    after the last decoded block and reruns are idempotent.
+
+    Args:
+        pipeline: DLT pipeline of the destination schema of the event tables
+        db_config: PostgresConfig instance
+        table_schema: Schema of the raw log table
+        table_name: Raw log table
+        chainid: Blockchain chain ID
+        contract_address: Contract address
+        table_prefix: Prefix of the event tables, e.g. "usde_evt_"
+        index: Events to decode, defaults to those of the contract's ABI
+        from_block: First block to decode, defaults to the decode checkpoint or the
+            first loaded block
+        to_block: Last block to decode, defaults to the end of the loaded block range
+            containing from_block
+        block_chunk_size: Blocks per window
+    """
+    contract_address = contract_address.lower()
+    if index is None:
+        index = EventIndex.from_abis(
+            [get_contract_resolver().abi(chainid, contract_address)]
+        )
+    logger.info(f"Decoding {len(index)} events of {contract_address}")
+
+    decoded_marker = f"{table_name}__decoded"
+    loaded = get_loaded_ranges(
+        db_config, table_schema, table_name, chainid, contract_address
+    )
+    if from_block is None:
+        from_block = get_checkpoint(
+            db_config, table_schema, decoded_marker, chainid, contract_address
+        )
+    if from_block is None:
+        from_block = loaded[0][0] if loaded else 0
+    if to_block is None:
+        # Stop at the first block not loaded yet, it is decoded once it is loaded
+        to_block = next((t for f, t in loaded if f <= from_block <= t), None)
+    if to_block is None or to_block < from_block:
+        logger.info(f"No new logs of {contract_address} to decode")
+        return
+
+    for window_start in range(from_block, to_block + 1, block_chunk_size):
+        window_end = min(window_start + block_chunk_size - 1, to_block)
+        logs = read_sql_frame(
+            db_config,
+            f"{table_schema}.{table_name}",
+            columns=LOG_COLUMNS + TOPIC_COLUMNS + ["data"],
+            block_range=(window_start, window_end),
+            where="chainid = %(chainid)s AND address = %(address)s",
+            params={"chainid": chainid, "address": contract_address},
+        )
+        decoded = decode_events(logs, index)
+        load_events(pipeline, decoded, index, table_prefix)
+        record_loaded_range(
+            db_config,
+            table_schema,
+            decoded_marker,
+            chainid,
+            contract_address,
+            window_start,
+            window_end,
+        )
+        counts = ", ".join(
+            f"{index.table_name(spec)}: {len(frame)}" for spec, frame in decoded.items()
+        )
+        logger.info(
+            f"Decoded {len(logs)} logs from {window_start} to {window_end} ({counts})"
+        )
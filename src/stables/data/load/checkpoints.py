@@ -0,0 +1,263 @@
+import logging
+import threading
+from typing import List, Optional, Set, Tuple
+
+from stables.config import PostgresConfig
+from stables.utils.postgres import get_postgres_connection
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_TABLE = "_stables_log_checkpoints"
+
+# Schemas whose checkpoint table is known to exist in this process
+_checkpoint_schemas: Set[str] = set()
+_checkpoint_schemas_lock = threading.Lock()
+
+
+def find_gaps(
+    ranges: List[Tuple[int, int]], start_block: int, end_block: int
+) -> List[Tuple[int, int]]:
+    """
+    Find the block ranges within [start_block, end_block] not covered by `ranges`.
+
+    Args:
+        ranges: Inclusive (from_block, to_block) ranges, in any order, possibly overlapping
+        start_block: First block of the range of interest (inclusive)
+        end_block: Last block of the range of interest (inclusive)
+
+    Returns:
+        list[tuple[int, int]]: Uncovered inclusive ranges, in block order
+    """
+    gaps = []
+    cursor = start_block
+    for from_block, to_block in sorted(ranges):
+        if to_block < cursor:
+            continue
+        if from_block > end_block:
+            break
+        if from_block > cursor:
+            gaps.append((cursor, from_block - 1))
+        cursor = max(cursor, to_block + 1)
+    if cursor <= end_block:
+        gaps.append((cursor, end_block))
+    return gaps
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping or adjacent inclusive ranges."""
+    merged = []
+    for from_block, to_block in sorted(ranges):
+        if merged and from_block <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], to_block))
+        else:
+            merged.append((from_block, to_block))
+    return merged
+
+
+def ensure_checkpoint_table(db_config: PostgresConfig, table_schema: str):
+    """
+    Create the checkpoint table in `table_schema` if it does not exist yet.
+
+    Runs once per schema per process, later calls return immediately, so only the
+    first write of a loader needs the CREATE privilege on the schema.
+    """
+    with _checkpoint_schemas_lock:
+        if table_schema in _checkpoint_schemas:
+            return
+
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {table_schema}")
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_schema}.{CHECKPOINT_TABLE} (
+                chainid BIGINT NOT NULL,
+                address TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                from_block BIGINT NOT NULL,
+                to_block BIGINT NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (chainid, address, table_name, from_block)
+            )
+            """
+        )
+        cursor.close()
+        conn.commit()
+
+    with _checkpoint_schemas_lock:
+        _checkpoint_schemas.add(table_schema)
+
+
+def _checkpoint_table_exists(cursor, table_schema: str) -> bool:
+    """Whether the checkpoint table exists, without creating it (for read-only callers)."""
+    with _checkpoint_schemas_lock:
+        if table_schema in _checkpoint_schemas:
+            return True
+    cursor.execute("SELECT to_regclass(%s)", (f"{table_schema}.{CHECKPOINT_TABLE}",))
+    if cursor.fetchone()[0] is None:
+        return False
+    with _checkpoint_schemas_lock:
+        _checkpoint_schemas.add(table_schema)
+    return True
+
+
+def record_loaded_range(
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    address: str,
+    from_block: int,
+    to_block: int,
+    conn=None,
+):
+    """
+    Record a block range as completely loaded for a (chainid, address, table) target.
+
+    The range is merged with any overlapping or adjacent completed ranges in a single
+    transaction, serialized per target by an advisory lock, so the table holds one row
+    per contiguous loaded stretch. Checkpoints are keyed by the lowercase contract
+    address, so the same contract passed in mixed case resumes from the same checkpoints.
+
+    Args:
+        db_config: PostgresConfig instance
+        table_schema: Schema of the loaded table (the checkpoint table lives there too)
+        table_name: Name of the loaded table
+        chainid: Blockchain chain ID
+        address: Contract address (any case)
+        from_block: First loaded block (inclusive)
+        to_block: Last loaded block (inclusive)
+        conn: Optional open connection; the caller then owns the transaction, which lets
+              the checkpoint commit together with the data it describes
+    """
+    ensure_checkpoint_table(db_config, table_schema)
+    if conn is not None:
+        _record_loaded_range(
+            conn.cursor(),
+            table_schema,
+            table_name,
+            chainid,
+            address,
+            from_block,
+            to_block,
+        )
+        return
+
+    with get_postgres_connection(db_config) as conn:
+        _record_loaded_range(
+            conn.cursor(),
+            table_schema,
+            table_name,
+            chainid,
+            address,
+            from_block,
+            to_block,
+        )
+        conn.commit()
+
+
+def _record_loaded_range(
+    cursor,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    address: str,
+    from_block: int,
+    to_block: int,
+):
+    address = address.lower()
+    cursor.execute(
+        "SELECT pg_advisory_xact_lock(hashtext(%s))",
+        (f"{table_schema}.{table_name}:{chainid}:{address}",),
+    )
+    cursor.execute(
+        f"""
+        DELETE FROM {table_schema}.{CHECKPOINT_TABLE}
+        WHERE chainid = %s AND address = %s AND table_name = %s
+            AND from_block <= %s AND to_block >= %s
+        RETURNING from_block, to_block
+        """,
+        (chainid, address, table_name, to_block + 1, from_block - 1),
+    )
+    merged = _merge_ranges(cursor.fetchall() + [(from_block, to_block)])
+    cursor.executemany(
+        f"""
+        INSERT INTO {table_schema}.{CHECKPOINT_TABLE}
+            (chainid, address, table_name, from_block, to_block)
+        VALUES (%s, %s, %s, %s, %s)
+        """,
+        [(chainid, address, table_name, f, t) for f, t in merged],
+    )
+    cursor.close()
+
+
+def get_loaded_ranges(
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    address: str,
+) -> List[Tuple[int, int]]:
+    """
+    Get the completed block ranges of a (chainid, address, table) target.
+
+    Returns:
+        list[tuple[int, int]]: Inclusive (from_block, to_block) ranges in block order,
+                               empty if nothing has been checkpointed yet
+    """
+    address = address.lower()
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        if not _checkpoint_table_exists(cursor, table_schema):
+            cursor.close()
+            conn.rollback()
+            return []
+        cursor.execute(
+            f"""
+            SELECT from_block, to_block
+            FROM {table_schema}.{CHECKPOINT_TABLE}
+            WHERE chainid = %s AND address = %s AND table_name = %s
+            ORDER BY from_block
+            """,
+            (chainid, address, table_name),
+        )
+        ranges = [(int(f), int(t)) for f, t in cursor.fetchall()]
+        cursor.close()
+        conn.commit()
+    return ranges
+
+
+def get_checkpoint(
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    address: str,
+) -> Optional[int]:
+    """
+    Get the block to resume loading from: one past the highest checkpointed block.
+
+    Returns:
+        int | None: Next block to load, or None if the target has no checkpoint
+    """
+    address = address.lower()
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        if not _checkpoint_table_exists(cursor, table_schema):
+            cursor.close()
+            conn.rollback()
+            return None
+        cursor.execute(
+            f"""
+            SELECT MAX(to_block)
+            FROM {table_schema}.{CHECKPOINT_TABLE}
+            WHERE chainid = %s AND address = %s AND table_name = %s
+            """,
+            (chainid, address, table_name),
+        )
+        result = cursor.fetchone()
+        cursor.close()
+        conn.commit()
+    if not result or result[0] is None:
+        return None
+    return int(result[0]) + 1
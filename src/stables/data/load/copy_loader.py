@@ -0,0 +1,193 @@
+import csv
+import io
+import logging
+import threading
+import time
+from typing import List, Optional, Set, Tuple
+
+from stables.config import PostgresConfig
+from stables.data.load.checkpoints import record_loaded_range
+from stables.data.load.log_tables import (
+    ensure_block_partitions,
+    ensure_log_indexes,
+    log_key_columns,
+)
+from stables.utils.postgres import get_postgres_connection
+
+logger = logging.getLogger(__name__)
+
+# (decoded Etherscan field, column, Postgres type), in the order rows are copied
+LOG_COPY_COLUMNS = [
+    ("address", "address", "varchar"),
+    ("topic0", "topic0", "varchar"),
+    ("topic1", "topic1", "varchar"),
+    ("topic2", "topic2", "varchar"),
+    ("topic3", "topic3", "varchar"),
+    ("data", "data", "varchar"),
+    ("blockNumber", "block_number", "bigint"),
+    ("blockHash", "block_hash", "varchar"),
+    ("timeStamp", "time_stamp", "bigint"),
+    ("gasPrice", "gas_price", "bigint"),
+    ("gasUsed", "gas_used", "bigint"),
+    ("logIndex", "log_index", "bigint"),
+    ("transactionHash", "transaction_hash", "varchar"),
+    ("transactionIndex", "transaction_index", "bigint"),
+    ("chainid", "chainid", "bigint"),
+]
+
+_NULL = "\\N"
+
+# Log tables whose log and stage tables are known to exist in this process, so later
+# windows run no DDL before loading
+_prepared_tables: Set[Tuple[str, str]] = set()
+_prepared_tables_lock = threading.Lock()
+
+
+def _stage_table(table_name: str) -> str:
+    return f"_{table_name}_copy_stage"
+
+
+def _logs_to_csv(logs: List[dict]) -> io.StringIO:
+    """Serialize decoded log items to CSV in LOG_COPY_COLUMNS order, NULL as \\N."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    fields = [field for field, _, _ in LOG_COPY_COLUMNS]
+    for item in logs:
+        writer.writerow(
+            [_NULL if (value := item.get(f)) is None else value for f in fields]
+        )
+    buffer.seek(0)
+    return buffer
+
+
+def _ensure_tables(cursor, table_schema: str, table_name: str):
+    """Create the log table (with dlt's bookkeeping columns) and the unlogged stage table."""
+    columns = ",\n".join(
+        f"{column} {pg_type}" for _, column, pg_type in LOG_COPY_COLUMNS
+    )
+    cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {table_schema}")
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {table_schema}.{table_name} (
+            {columns},
+            _dlt_load_id varchar NOT NULL,
+            _dlt_id varchar NOT NULL UNIQUE
+        )
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE UNLOGGED TABLE IF NOT EXISTS {table_schema}.{_stage_table(table_name)} (
+            {columns}
+        )
+        """
+    )
+
+
+def copy_logs(
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    contract_address: str,
+    from_block: int,
+    to_block: int,
+    logs: List[dict],
+    load_id: Optional[str] = None,
+) -> int:
+    """
+    Load a window of decoded logs with COPY and merge them into the log table.
+
+    The rows are streamed with `COPY ... FROM STDIN (FORMAT csv)` into an unlogged
+    stage table, then inserted into the log table with `INSERT ... ON CONFLICT` on
+    its unique key (see log_key_columns; duplicates within the window are dropped
+    first), so rows loaded again take the new values and `_dlt_load_id`. The window is
+    checkpointed in the same transaction, so data and checkpoint commit together.
+    Loads into the same table are serialized by an advisory lock on the stage table.
+
+    The log table is created if missing, with the columns dlt would create, and
+    rows get `_dlt_load_id`/`_dlt_id` values so the table stays usable by dlt loads.
+    Tables, indexes and partitions are checked once per table per process (partitions
+    again when a window moves past them), so a window is loaded in one transaction
+    without DDL or catalog queries.
+
+    Args:
+        db_config: PostgresConfig instance
+        table_schema: Schema of the log table
+        table_name: Name of the log table
+        chainid: Blockchain chain ID
+        contract_address: Contract address
+        from_block: First block of the window (inclusive)
+        to_block: Last block of the window (inclusive)
+        logs: Log items decoded by decode_log_batch
+        load_id: Value for `_dlt_load_id`, defaults to the current timestamp
+
+    Returns:
+        int: Number of logs inserted or updated
+    """
+    load_id = load_id or f"{time.time():.6f}"
+    stage = f"{table_schema}.{_stage_table(table_name)}"
+    column_list = ", ".join(column for _, column, _ in LOG_COPY_COLUMNS)
+
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        with _prepared_tables_lock:
+            prepared = (table_schema, table_name) in _prepared_tables
+        if not prepared:
+            _ensure_tables(cursor, table_schema, table_name)
+            conn.commit()
+            ensure_log_indexes(db_config, table_schema, table_name)
+            with _prepared_tables_lock:
+                _prepared_tables.add((table_schema, table_name))
+        ensure_block_partitions(
+            db_config, table_schema, table_name, from_block, to_block
+        )
+
+        key_columns = log_key_columns(cursor, table_schema, table_name)
+        key = ", ".join(key_columns)
+        # Rewritten rows get the new load id, as a dlt merge does, so the incremental
+        # dbt models (watermarked on _dlt_load_id) pick them up
+        update_columns = [column for _, column, _ in LOG_COPY_COLUMNS]
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}"
+            for column in update_columns + ["_dlt_load_id"]
+            if column not in key_columns
+        )
+
+        n_rows = 0
+        if logs:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (stage,))
+            cursor.execute(f"TRUNCATE {stage}")
+            cursor.copy_expert(
+                f"COPY {stage} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{_NULL}')",
+                _logs_to_csv(logs),
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {table_schema}.{table_name} ({column_list}, _dlt_load_id, _dlt_id)
+                SELECT DISTINCT ON ({key}) {column_list}, %s,
+                    substr(md5(chainid || ':' || transaction_hash || ':' || log_index), 1, 14)
+                FROM {stage}
+                ORDER BY {key}
+                ON CONFLICT ({key}) DO UPDATE SET {updates}
+                """,
+                (load_id,),
+            )
+            n_rows = cursor.rowcount
+            cursor.execute(f"TRUNCATE {stage}")
+
+        record_loaded_range(
+            db_config,
+            table_schema,
+            table_name,
+            chainid,
+            contract_address,
+            from_block,
+            to_block,
+            conn=conn,
+        )
+        cursor.close()
+        conn.commit()
+
+    logger.info(f"Copied {n_rows} logs from {from_block} to {to_block}")
+    return n_rows
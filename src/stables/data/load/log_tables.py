@@ -0,0 +1,625 @@
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from stables.config import PostgresConfig
+from stables.data.load.checkpoints import CHECKPOINT_TABLE, ensure_checkpoint_table
+from stables.utils.postgres import get_postgres_connection
+
+logger = logging.getLogger(__name__)
+
+# A log is identified by its chain, transaction and position in the block
+LOG_PRIMARY_KEY = ("chainid", "transaction_hash", "log_index")
+
+# Secondary indexes of raw log tables as (index name suffix, access method, columns).
+# BRIN fits block_number because logs are appended in roughly block order; the btree
+# indexes serve the per-contract range queries (resume block), the dbt incremental
+# models (rows loaded after a load id, see macros/incremental.sql) and event filters.
+LOG_INDEXES = [
+    ("block_brin", "brin", ("block_number",)),
+    ("address_block_idx", "btree", ("address", "block_number")),
+    ("load_id_idx", "btree", ("chainid", "_dlt_load_id")),
+    ("topic0_idx", "btree", ("topic0",)),
+]
+
+# Incremental dbt models built from each raw log table (dbt_subprojects, dev target), as
+# (relation, contract address column, day column of daily rollups or None). They only add
+# or replace rows loaded after their watermark (see macros/incremental.sql), so
+# rollback_blocks deletes the rolled back blocks from them as well.
+LOG_DOWNSTREAM_MODELS = {
+    "ethena_raw.usde_contract_logs": [
+        ("ethena_staging.stg_usde_contract_logs", "contract_address", None),
+        ("ethena_marts.usde_erc20_transfers", "token_address", None),
+        ("ethena_marts.usde_erc20_transfers_daily", "token_address", "day"),
+    ],
+}
+
+DEFAULT_PARTITION_SIZE = 1_000_000
+
+_indexed_tables: Set[Tuple[str, str]] = set()
+_maintained_tables: Set[Tuple[str, str]] = set()
+# Per partitioned table: (partition size, first covered block, first block not covered
+# past the last partition)
+_partition_bounds: Dict[Tuple[str, str], Tuple[int, int, int]] = {}
+# Unique key columns per log table, see log_key_columns
+_key_columns: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+# Tables found not to be partitioned (or not created yet, loads create them unpartitioned)
+_unpartitioned_tables: Set[Tuple[str, str]] = set()
+_indexed_tables_lock = threading.Lock()
+
+_PARTITION_BOUND = re.compile(r"FROM \('?(\d+)'?\) TO \('?(\d+)'?\)")
+
+
+def _unique_index_name(table_name: str) -> str:
+    return f"{table_name}_log_key_uidx"
+
+
+def _is_partitioned(cursor, table_schema: str, table_name: str) -> bool:
+    cursor.execute(
+        """
+        SELECT c.relkind = 'p' FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relname = %s
+        """,
+        (table_schema, table_name),
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def log_key_columns(cursor, table_schema: str, table_name: str) -> Tuple[str, ...]:
+    """
+    Columns of the unique index of a raw log table.
+
+    Unique indexes of a partitioned table must contain the partition column, so
+    block_number is appended to LOG_PRIMARY_KEY when the table is partitioned. Looked
+    up once per table per process.
+    """
+    key = (table_schema, table_name)
+    with _indexed_tables_lock:
+        if key in _key_columns:
+            return _key_columns[key]
+    columns = LOG_PRIMARY_KEY
+    if _is_partitioned(cursor, table_schema, table_name):
+        columns = LOG_PRIMARY_KEY + ("block_number",)
+    with _indexed_tables_lock:
+        _key_columns[key] = columns
+    return columns
+
+
+def ensure_log_unique_index(
+    db_config: PostgresConfig, table_schema: str, table_name: str
+) -> bool:
+    """
+    Create the unique index on LOG_PRIMARY_KEY of a raw log table (see log_key_columns),
+    removing duplicate rows first.
+
+    Tables loaded before the merge write path may hold the same log several times
+    (retried appends), which would make the index creation fail. Of each duplicate
+    group the first loaded row is kept. Rows whose `log_index` was "0x" (index 0)
+    ended up NULL with the value in dlt's `log_index__v_text` variant column; they
+    get log_index 0 so the key is complete.
+
+    Runs once per table per process, later calls return immediately.
+
+    Args:
+        db_config: PostgresConfig instance
+        table_schema: Schema of the log table
+        table_name: Name of the log table
+
+    Returns:
+        bool: True if the index exists, False if the table does not exist yet
+    """
+    with _indexed_tables_lock:
+        if (table_schema, table_name) in _indexed_tables:
+            return True
+
+    index_name = _unique_index_name(table_name)
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = %s AND table_name = %s",
+            (table_schema, table_name),
+        )
+        columns = {row[0] for row in cursor.fetchall()}
+        if not columns:
+            cursor.close()
+            conn.rollback()
+            return False
+
+        key = ", ".join(log_key_columns(cursor, table_schema, table_name))
+        cursor.execute(
+            "SELECT 1 FROM pg_indexes WHERE schemaname = %s AND indexname = %s",
+            (table_schema, index_name),
+        )
+        if cursor.fetchone() is None:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext(%s))",
+                (f"{table_schema}.{table_name}:unique_index",),
+            )
+            if "log_index__v_text" in columns:
+                cursor.execute(
+                    f"""
+                    UPDATE {table_schema}.{table_name}
+                    SET log_index = 0
+                    WHERE log_index IS NULL AND log_index__v_text = '0x'
+                    """
+                )
+            cursor.execute(
+                f"""
+                DELETE FROM {table_schema}.{table_name} AS t
+                USING (
+                    SELECT tableoid, ctid, row_number() OVER (
+                        PARTITION BY {key} ORDER BY _dlt_load_id, tableoid, ctid
+                    ) AS rn
+                    FROM {table_schema}.{table_name}
+                ) AS d
+                WHERE t.tableoid = d.tableoid AND t.ctid = d.ctid AND d.rn > 1
+                """
+            )
+            if cursor.rowcount:
+                logger.info(
+                    f"Removed {cursor.rowcount} duplicate logs from {table_schema}.{table_name}"
+                )
+            cursor.execute(
+                f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS {index_name}
+                ON {table_schema}.{table_name} ({key})
+                """
+            )
+            logger.info(f"Created unique index {index_name} on ({key})")
+        cursor.close()
+        conn.commit()
+
+    with _indexed_tables_lock:
+        _indexed_tables.add((table_schema, table_name))
+    return True
+
+
+def _create_secondary_indexes(cursor, table_schema: str, table_name: str):
+    for suffix, method, columns in LOG_INDEXES:
+        # New block ranges of a BRIN index are summarized by autovacuum
+        options = " WITH (autosummarize = on)" if method == "brin" else ""
+        cursor.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS {table_name}_{suffix}
+            ON {table_schema}.{table_name} USING {method} ({", ".join(columns)}){options}
+            """
+        )
+
+
+def ensure_log_indexes(
+    db_config: PostgresConfig, table_schema: str, table_name: str
+) -> bool:
+    """
+    Create the unique index and the LOG_INDEXES of a raw log table if they are missing.
+
+    Runs after a window is loaded; once the indexes exist (checked once per table per
+    process) later calls return immediately. Indexes created on a partitioned table
+    are inherited by every partition, including those added later.
+
+    Args:
+        db_config: PostgresConfig instance
+        table_schema: Schema of the log table
+        table_name: Name of the log table
+
+    Returns:
+        bool: True if the indexes exist, False if the table does not exist yet
+    """
+    with _indexed_tables_lock:
+        if (table_schema, table_name) in _maintained_tables:
+            return True
+
+    if not ensure_log_unique_index(db_config, table_schema, table_name):
+        return False
+
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        _create_secondary_indexes(cursor, table_schema, table_name)
+        cursor.close()
+        conn.commit()
+
+    with _indexed_tables_lock:
+        _maintained_tables.add((table_schema, table_name))
+    return True
+
+
+def partition_ranges(
+    from_block: int, to_block: int, partition_size: int
+) -> List[Tuple[int, int]]:
+    """
+    Aligned partition bounds covering a block range.
+
+    Args:
+        from_block: First block to cover (inclusive)
+        to_block: Last block to cover (inclusive)
+        partition_size: Number of blocks per partition
+
+    Returns:
+        list[tuple[int, int]]: (start, end) bounds, start inclusive and end exclusive as in
+                               `FOR VALUES FROM (start) TO (end)`, in block order
+    """
+    first = from_block - from_block % partition_size
+    return [
+        (start, start + partition_size)
+        for start in range(first, to_block + 1, partition_size)
+    ]
+
+
+def _partition_state(cursor, table_schema: str, table_name: str):
+    """
+    (partition size, first covered block, first uncovered block past the last partition)
+    of a partitioned table, None if it has no partitions.
+    """
+    cursor.execute(
+        """
+        SELECT pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        """,
+        (f"{table_schema}.{table_name}",),
+    )
+    bounds = [
+        (int(m.group(1)), int(m.group(2)))
+        for (expr,) in cursor.fetchall()
+        if (m := _PARTITION_BOUND.search(expr))
+    ]
+    if not bounds:
+        return None
+    start, end = max(bounds)
+    return end - start, min(bounds)[0], end
+
+
+def _create_partitions(
+    cursor,
+    table_schema: str,
+    table_name: str,
+    bounds: List[Tuple[int, int]],
+):
+    for start, end in bounds:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_schema}.{table_name}_p{start}
+            PARTITION OF {table_schema}.{table_name} FOR VALUES FROM ({start}) TO ({end})
+            """
+        )
+
+
+def ensure_block_partitions(
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    from_block: int,
+    to_block: int,
+):
+    """
+    Add the partitions a block_number range partitioned log table needs to hold
+    blocks `from_block` to `to_block`. Does nothing for tables that are not partitioned.
+
+    Partitions are added past the last one as loads move up, and below the first one
+    for windows loaded before it (an earlier start_block or a backfilled gap).
+    Partitioned tables have no default partition (rows falling into it would block
+    adding the matching range later), so this runs before every load.
+
+    Args:
+        db_config: PostgresConfig instance
+        table_schema: Schema of the log table
+        table_name: Name of the log table
+        from_block: First block about to be loaded
+        to_block: Last block about to be loaded
+    """
+    key = (table_schema, table_name)
+    with _indexed_tables_lock:
+        if key in _unpartitioned_tables:
+            return
+        if key in _partition_bounds:
+            _, first, covered = _partition_bounds[key]
+            if first <= from_block and to_block < covered:
+                return
+
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        state = None
+        if _is_partitioned(cursor, table_schema, table_name):
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext(%s))",
+                (f"{table_schema}.{table_name}:partitions",),
+            )
+            state = _partition_state(cursor, table_schema, table_name)
+        if state is None:
+            cursor.close()
+            conn.rollback()
+            with _indexed_tables_lock:
+                _unpartitioned_tables.add(key)
+            return
+
+        partition_size, first, covered = state
+        bounds = []
+        if from_block < first:
+            bounds += partition_ranges(from_block, first - 1, partition_size)
+            first = bounds[0][0]
+        if to_block >= covered:
+            bounds += partition_ranges(covered, to_block, partition_size)
+            covered = bounds[-1][1]
+        if bounds:
+            _create_partitions(cursor, table_schema, table_name, bounds)
+            logger.info(
+                f"Added {len(bounds)} partitions to {table_schema}.{table_name}, "
+                f"covering blocks {first} to {covered - 1}"
+            )
+        cursor.close()
+        conn.commit()
+
+    with _indexed_tables_lock:
+        _partition_bounds[key] = (partition_size, first, covered)
+
+
+def partition_log_table(
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    partition_size: int = DEFAULT_PARTITION_SIZE,
+) -> int:
+    """
+    Convert a raw log table into a table range-partitioned by block_number.
+
+    The rows are copied (deduplicated on LOG_PRIMARY_KEY) into a new partitioned table
+    with the same columns, one partition per `partition_size` aligned blocks, which
+    then replaces the original table, all in one transaction. Queries filtering on
+    block_number only scan the partitions of their range, and old partitions can be
+    vacuumed, detached or archived on their own. New partitions are added by
+    ensure_block_partitions as loads move past the first or last one.
+
+    Run it while nothing loads into the table. Views on the table (e.g. dbt models)
+    must be dropped first, dbt recreates them on its next run.
+
+    Args:
+        db_config: PostgresConfig instance
+        table_schema: Schema of the log table
+        table_name: Name of the log table
+        partition_size: Number of blocks per partition
+
+    Returns:
+        int: Number of partitions of the table
+    """
+    staging_name = f"{table_name}__partitioned"
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        if _is_partitioned(cursor, table_schema, table_name):
+            cursor.execute(
+                "SELECT count(*) FROM pg_inherits WHERE inhparent = %s::regclass",
+                (f"{table_schema}.{table_name}",),
+            )
+            n_partitions = cursor.fetchone()[0]
+            cursor.close()
+            conn.rollback()
+            logger.info(f"{table_schema}.{table_name} is already partitioned")
+            return n_partitions
+
+        cursor.execute(f"LOCK TABLE {table_schema}.{table_name} IN EXCLUSIVE MODE")
+        cursor.execute(
+            f"SELECT MIN(block_number), MAX(block_number) FROM {table_schema}.{table_name}"
+        )
+        min_block, max_block = cursor.fetchone()
+        bounds = partition_ranges(
+            min_block if min_block is not None else 0,
+            max_block if max_block is not None else 0,
+            partition_size,
+        )
+
+        cursor.execute(
+            f"""
+            CREATE TABLE {table_schema}.{staging_name}
+            (LIKE {table_schema}.{table_name} INCLUDING DEFAULTS)
+            PARTITION BY RANGE (block_number)
+            """
+        )
+        # Partitions get their final names right away, they do not follow the parent's
+        for start, end in bounds:
+            cursor.execute(
+                f"""
+                CREATE TABLE {table_schema}.{table_name}_p{start}
+                PARTITION OF {table_schema}.{staging_name} FOR VALUES FROM ({start}) TO ({end})
+                """
+            )
+        key = ", ".join(LOG_PRIMARY_KEY)
+        cursor.execute(
+            f"""
+            INSERT INTO {table_schema}.{staging_name}
+            SELECT DISTINCT ON ({key}) * FROM {table_schema}.{table_name}
+            ORDER BY {key}, _dlt_load_id
+            """
+        )
+        n_rows = cursor.rowcount
+        cursor.execute(f"DROP TABLE {table_schema}.{table_name}")
+        cursor.execute(
+            f"ALTER TABLE {table_schema}.{staging_name} RENAME TO {table_name}"
+        )
+        cursor.execute(
+            f"""
+            CREATE UNIQUE INDEX {_unique_index_name(table_name)}
+            ON {table_schema}.{table_name} ({key}, block_number)
+            """
+        )
+        _create_secondary_indexes(cursor, table_schema, table_name)
+        cursor.close()
+        conn.commit()
+
+    with _indexed_tables_lock:
+        _indexed_tables.add((table_schema, table_name))
+        _maintained_tables.add((table_schema, table_name))
+        _unpartitioned_tables.discard((table_schema, table_name))
+        _key_columns[(table_schema, table_name)] = LOG_PRIMARY_KEY + ("block_number",)
+        _partition_bounds[(table_schema, table_name)] = (
+            partition_size,
+            bounds[0][0],
+            bounds[-1][1],
+        )
+    logger.info(
+        f"Partitioned {table_schema}.{table_name}: {n_rows} logs in {len(bounds)} partitions of {partition_size} blocks"
+    )
+    return len(bounds)
+
+
+def _relation_exists(cursor, relation: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s)", (relation,))
+    return cursor.fetchone()[0] is not None
+
+
+def _first_block_of_day(
+    cursor, relation: str, chainid: int, address: str, from_block: int
+) -> Tuple[int, Optional[int]]:
+    """
+    First logged block of the UTC day of `from_block` for a target, and the start of that
+    day as a unix timestamp (None when nothing is logged from `from_block` on).
+    """
+    cursor.execute(
+        f"""
+        SELECT MIN(time_stamp) FROM {relation}
+        WHERE chainid = %s AND address = %s AND block_number >= %s
+        """,
+        (chainid, address, from_block),
+    )
+    first_timestamp = cursor.fetchone()[0]
+    if first_timestamp is None:
+        return from_block, None
+    day_start = int(first_timestamp) - int(first_timestamp) % 86400
+    cursor.execute(
+        f"""
+        SELECT MIN(block_number) FROM {relation}
+        WHERE chainid = %s AND address = %s AND time_stamp >= %s
+        """,
+        (chainid, address, day_start),
+    )
+    return min(from_block, int(cursor.fetchone()[0])), day_start
+
+
+def rollback_blocks(
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    address: str,
+    n_blocks: Optional[int] = None,
+    from_block: Optional[int] = None,
+    downstream_models: Optional[List[Tuple[str, str, Optional[str]]]] = None,
+) -> int:
+    """
+    Delete the logs of the most recent blocks of a target and un-checkpoint them, so
+    the next load fetches those blocks again (e.g. after a reorg).
+
+    The rolled back blocks are also deleted from the incremental dbt models built from
+    the table (LOG_DOWNSTREAM_MODELS), which would otherwise keep the reorged rows. Daily
+    rollups cannot drop part of a day, so when there are any, the rollback starts at the
+    first block of the UTC day of `from_block`: the days from there on are deleted, and
+    the next dbt run, after the blocks are loaded again, rebuilds them from all of their
+    transfers. Other models built from the table need a `dbt run --full-refresh`.
+
+    Logs, downstream rows and checkpoints are changed in one transaction, under the same
+    advisory lock as checkpoint updates.
+
+    Args:
+        db_config: PostgresConfig instance
+        table_schema: Schema of the log table
+        table_name: Name of the log table
+        chainid: Blockchain chain ID
+        address: Contract address
+        n_blocks: Number of blocks to roll back, counted back from the highest
+            checkpointed block
+        from_block: First block to roll back (inclusive), instead of n_blocks
+        downstream_models: (relation, address column, day column or None) of the models
+            to roll back too. Defaults to the table's LOG_DOWNSTREAM_MODELS; relations
+            that do not exist are skipped
+
+    Returns:
+        int: Number of deleted logs
+    """
+    if (n_blocks is None) == (from_block is None):
+        raise ValueError("Pass exactly one of n_blocks and from_block")
+    if downstream_models is None:
+        downstream_models = LOG_DOWNSTREAM_MODELS.get(
+            f"{table_schema}.{table_name}", []
+        )
+
+    address = address.lower()
+    relation = f"{table_schema}.{table_name}"
+    ensure_checkpoint_table(db_config, table_schema)
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s))",
+            (f"{table_schema}.{table_name}:{chainid}:{address}",),
+        )
+        if from_block is None:
+            cursor.execute(
+                f"""
+                SELECT MAX(to_block) FROM {table_schema}.{CHECKPOINT_TABLE}
+                WHERE chainid = %s AND address = %s AND table_name = %s
+                """,
+                (chainid, address, table_name),
+            )
+            tip = cursor.fetchone()[0]
+            if tip is None:
+                cursor.close()
+                conn.rollback()
+                logger.info(f"Nothing checkpointed for {address}, nothing to roll back")
+                return 0
+            from_block = int(tip) - n_blocks + 1
+
+        n_deleted = 0
+        if _relation_exists(cursor, relation):
+            day_start = None
+            if any(day_column for _, _, day_column in downstream_models):
+                from_block, day_start = _first_block_of_day(
+                    cursor, relation, chainid, address, from_block
+                )
+            cursor.execute(
+                f"""
+                DELETE FROM {relation}
+                WHERE chainid = %s AND address = %s AND block_number >= %s
+                """,
+                (chainid, address, from_block),
+            )
+            n_deleted = cursor.rowcount
+
+            for model, address_column, day_column in downstream_models:
+                if not _relation_exists(cursor, model):
+                    continue
+                if day_column is None:
+                    condition, bound = "block_number >= %s", from_block
+                elif day_start is not None:
+                    condition, bound = f"{day_column} >= to_timestamp(%s)", day_start
+                else:
+                    continue
+                cursor.execute(
+                    f"""
+                    DELETE FROM {model}
+                    WHERE chainid = %s AND {address_column} = %s AND {condition}
+                    """,
+                    (chainid, address, bound),
+                )
+                logger.info(f"Rolled back {cursor.rowcount} rows of {model}")
+        cursor.execute(
+            f"""
+            DELETE FROM {table_schema}.{CHECKPOINT_TABLE}
+            WHERE chainid = %s AND address = %s AND table_name = %s AND from_block >= %s
+            """,
+            (chainid, address, table_name, from_block),
+        )
+        cursor.execute(
+            f"""
+            UPDATE {table_schema}.{CHECKPOINT_TABLE}
+            SET to_block = %s, updated_at = now()
+            WHERE chainid = %s AND address = %s AND table_name = %s AND to_block >= %s
+            """,
+            (from_block - 1, chainid, address, table_name, from_block),
+        )
+        cursor.close()
+        conn.commit()
+
+    logger.info(
+        f"Rolled back {n_deleted} logs of {address} on chain {chainid} from block {from_block}"
+    )
+    return n_deleted
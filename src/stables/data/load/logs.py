@@ -1,10 +1,409 @@
-import time, logging
-from stables.utils.postgres import get_rows_count, get_loaded_block, PostgresConfig
-from stables.data.source import etherscan_logs, get_latest_block
+import time, logging, queue, threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from stables.utils.postgres import get_loaded_block, PostgresConfig
+from stables.data.source import etherscan_logs, get_contract_resolver
+from stables.data.load.ranges import BlockRangePlanner, ETHERSCAN_RESULT_CAP
+from stables.data.load.checkpoints import (
+    find_gaps,
+    get_loaded_ranges,
+    record_loaded_range,
+)
+from stables.data.load.log_tables import (
+    LOG_PRIMARY_KEY,
+    ensure_block_partitions,
+    ensure_log_indexes,
+)
+from stables.data.load.copy_loader import copy_logs
+from stables.config import ETHERSCAN_LOG_COLUMNS
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class LogChunkMetrics:
+    """Per-window metrics of a logs_loading run, taken from the fetched data and dlt's trace."""
+
+    from_block: int
+    to_block: int
+    n_fetched: int
+    n_loaded: int
+    fetch_seconds: float
+    load_seconds: float
+    load_id: Optional[str] = None
+
+
+def fetch_logs(chainid: int, contract_address: str, from_block: int, to_block: int):
+    """
+    Fetch the event logs of a contract in a block window, in one getLogs request.
+
+    Only the first page of ETHERSCAN_RESULT_CAP logs is requested, so a result of
+    that size may be truncated; BlockRangePlanner bisects such windows.
+
+    Args:
+        chainid (int): Blockchain network ID
+        contract_address (str): Contract address to fetch logs for
+        from_block (int): First block of the window (inclusive)
+        to_block (int): Last block of the window (inclusive)
+
+    Returns:
+        list: Log items as yielded by the etherscan_logs resource
+    """
+    return list(
+        etherscan_logs(
+            chainid=chainid,
+            address=contract_address,
+            fromBlock=from_block,
+            toBlock=to_block,
+            offset=ETHERSCAN_RESULT_CAP,
+            page=1,
+        )
+    )
+
+
+def split_block_range(start_block: int, end_block: int, n_segments: int):
+    """
+    Split an inclusive block range into at most n_segments disjoint, contiguous segments.
+
+    Returns:
+        list[tuple[int, int]]: (from_block, to_block) pairs covering the range in order
+    """
+    n_blocks = end_block - start_block + 1
+    if n_blocks <= 0:
+        return []
+    n_segments = max(1, min(n_segments, n_blocks))
+    size, remainder = divmod(n_blocks, n_segments)
+
+    segments = []
+    from_block = start_block
+    for i in range(n_segments):
+        to_block = from_block + size - 1 + (1 if i < remainder else 0)
+        segments.append((from_block, to_block))
+        from_block = to_block + 1
+    return segments
+
+
+def plan_segments(gaps, n_segments: int):
+    """
+    Split block gaps into roughly n_segments equally sized segments.
+
+    Args:
+        gaps: Inclusive (from_block, to_block) ranges still to be loaded
+        n_segments: Desired total number of segments
+
+    Returns:
+        list[tuple[int, int]]: Disjoint segments covering all gaps, in block order
+    """
+    total_blocks = sum(to_block - from_block + 1 for from_block, to_block in gaps)
+    if total_blocks <= 0:
+        return []
+    segment_size = -(-total_blocks // max(1, n_segments))
+
+    segments = []
+    for from_block, to_block in gaps:
+        n_blocks = to_block - from_block + 1
+        segments.extend(
+            split_block_range(from_block, to_block, -(-n_blocks // segment_size))
+        )
+    return segments
+
+
+def fetch_with_retries(
+    chainid: int,
+    contract_address: str,
+    from_block: int,
+    to_block: int,
+    max_retries: int = 2,
+) -> list:
+    """Fetch one block window, retrying on failure and raising once retries are exhausted."""
+    retries = max_retries
+    while True:
+        try:
+            return fetch_logs(chainid, contract_address, from_block, to_block)
+        except Exception as e:
+            retries -= 1
+            if retries <= 0:
+                logger.error(
+                    f"Failed to fetch logs for block range {from_block}-{to_block} after {max_retries} retries."
+                )
+                raise
+            logger.error(
+                f"Error fetching logs: {e}. Retrying... ({retries} retries left)"
+            )
+            time.sleep(3)
+
+
+def pending_block_ranges(
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    contract_address: str,
+    start_block: Optional[int],
+    end_block: int,
+) -> List[Tuple[int, int]]:
+    """
+    Get the block ranges of a (chainid, address, table) target still to be loaded.
+
+    Completed ranges are checkpointed per target (see stables.data.load.checkpoints),
+    so a resumed or interrupted backfill only fetches the gaps between them. Without
+    a start_block, loading starts at the first checkpoint, or else at the last loaded
+    block (or contract creation block) found by get_loaded_block.
+
+    Returns:
+        list[tuple[int, int]]: Inclusive (from_block, to_block) gaps, in block order
+    """
+    loaded_ranges = get_loaded_ranges(
+        db_config, table_schema, table_name, chainid, contract_address
+    )
+    if start_block is None:
+        if loaded_ranges:
+            start_block = loaded_ranges[0][0]
+        else:
+            start_block = get_loaded_block(
+                db_config,
+                table_schema,
+                table_name,
+                chainid,
+                contract_address,
+                column_name="block_number",
+            )
+    return find_gaps(loaded_ranges, start_block, end_block)
+
+
+def _fetch_segment(
+    chainid: int,
+    contract_address: str,
+    from_block: int,
+    to_block: int,
+    batches: queue.Queue,
+    stop: threading.Event,
+    block_chunk_size: int,
+    max_block_chunk_size: int,
+    max_retries: int = 2,
+):
+    """
+    Walk one block segment with an adaptive planner and put complete windows on the queue.
+
+    Runs in a worker thread; requests are throttled by the shared Etherscan token bucket.
+    """
+    planner = BlockRangePlanner(
+        from_block,
+        to_block,
+        initial_size=block_chunk_size,
+        max_size=max_block_chunk_size,
+        result_cap=ETHERSCAN_RESULT_CAP,
+    )
+
+    while not stop.is_set() and (window := planner.next_window()) is not None:
+        window_from, window_to = window
+
+        fetch_started = time.perf_counter()
+        logs = fetch_with_retries(
+            chainid, contract_address, window_from, window_to, max_retries
+        )
+
+        if planner.record(window_from, window_to, n_results=len(logs)):
+            fetch_seconds = time.perf_counter() - fetch_started
+            batches.put((window_from, window_to, logs, fetch_seconds))
+        else:
+            logger.info(
+                f"Fetched {len(logs)} logs from {window_from} to {window_to}, "
+                f"hit the result cap, splitting the window."
+            )
+
+    return planner.n_calls, planner.n_splits
+
+
+def _load_logs(
+    pipeline,
+    table_name: str,
+    from_block: int,
+    to_block: int,
+    logs: list,
+    fetch_seconds: float = 0.0,
+) -> LogChunkMetrics:
+    """
+    Load one fetched window via the DLT pipeline, retrying on failure.
+
+    Logs are merged on LOG_PRIMARY_KEY, so a window loaded again (a retry after a
+    partial load, or a refetch after a rollback) does not duplicate rows. The loaded row count is read from the normalize step of the pipeline trace, so
+    no query against the destination table is needed.
+    """
+    max_retries = 2
+    retries = max_retries
+    while True:
+        try:
+            load_started = time.perf_counter()
+            n_loaded, load_id = 0, None
+            if logs:
+                load_info = pipeline.run(
+                    logs,
+                    table_name=table_name,
+                    write_disposition="merge",
+                    primary_key=LOG_PRIMARY_KEY,
+                    columns=ETHERSCAN_LOG_COLUMNS,
+                )
+                n_loaded = _normalized_row_count(
+                    pipeline, table_name, default=len(logs)
+                )
+                load_id = load_info.loads_ids[-1] if load_info.loads_ids else None
+            metrics = LogChunkMetrics(
+                from_block=from_block,
+                to_block=to_block,
+                n_fetched=len(logs),
+                n_loaded=n_loaded,
+                fetch_seconds=fetch_seconds,
+                load_seconds=time.perf_counter() - load_started,
+                load_id=load_id,
+            )
+            logger.info(f"Loaded {n_loaded} logs from {from_block} to {to_block}")
+            return metrics
+        except Exception as e:
+            retries -= 1
+            if retries <= 0:
+                logger.error(
+                    f"Failed to load logs for block range {from_block}-{to_block} after {max_retries} retries."
+                )
+                raise
+            logger.error(
+                f"Error loading logs: {e}. Retrying... ({retries} retries left)"
+            )
+            time.sleep(3)
+
+
+def _copy_logs(
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    contract_address: str,
+    from_block: int,
+    to_block: int,
+    logs: list,
+    fetch_seconds: float = 0.0,
+) -> LogChunkMetrics:
+    """Load and checkpoint one fetched window with copy_logs, retrying on failure."""
+    max_retries = 2
+    retries = max_retries
+    while True:
+        try:
+            load_started = time.perf_counter()
+            n_loaded = copy_logs(
+                db_config,
+                table_schema,
+                table_name,
+                chainid,
+                contract_address,
+                from_block,
+                to_block,
+                logs,
+            )
+            return LogChunkMetrics(
+                from_block=from_block,
+                to_block=to_block,
+                n_fetched=len(logs),
+                n_loaded=n_loaded,
+                fetch_seconds=fetch_seconds,
+                load_seconds=time.perf_counter() - load_started,
+            )
+        except Exception as e:
+            retries -= 1
+            if retries <= 0:
+                logger.error(
+                    f"Failed to copy logs for block range {from_block}-{to_block} after {max_retries} retries."
+                )
+                raise
+            logger.error(
+                f"Error copying logs: {e}. Retrying... ({retries} retries left)"
+            )
+            time.sleep(3)
+
+
+def commit_window(
+    pipeline,
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    contract_address: str,
+    from_block: int,
+    to_block: int,
+    logs: list,
+    fetch_seconds: float = 0.0,
+    loader: str = "dlt",
+) -> LogChunkMetrics:
+    """
+    Load a fetched window, make sure the table has its indexes, and checkpoint the window.
+
+    With loader="copy" the window is written by copy_logs, which checkpoints it in the
+    same transaction; with loader="dlt" it is merged by the DLT pipeline. Partitioned
+    tables get the partitions of the window before it is loaded. Tables, indexes,
+    partitions and the checkpoint table are checked once per process (partitions again
+    when a window moves past them), so after the first window the only database work
+    is the load and the checkpoint write.
+    """
+    if loader == "copy":
+        return _copy_logs(
+            db_config,
+            table_schema,
+            table_name,
+            chainid,
+            contract_address,
+            from_block,
+            to_block,
+            logs,
+            fetch_seconds,
+        )
+    if loader != "dlt":
+        raise ValueError(f"Unknown loader {loader!r}, expected 'dlt' or 'copy'")
+
+    ensure_block_partitions(db_config, table_schema, table_name, from_block, to_block)
+    metrics = _load_logs(
+        pipeline, table_name, from_block, to_block, logs, fetch_seconds
+    )
+    ensure_log_indexes(db_config, table_schema, table_name)
+    record_loaded_range(
+        db_config,
+        table_schema,
+        table_name,
+        chainid,
+        contract_address,
+        from_block,
+        to_block,
+    )
+    return metrics
+
+
+def stop_workers(futures, batches: queue.Queue, stop: threading.Event):
+    """Stop fetch workers, unblocking those waiting on a full queue so the executor can shut down."""
+    stop.set()
+    for future in futures:
+        future.cancel()
+    while any(not f.done() for f in futures):
+        try:
+            batches.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+
+def _raise_worker_error(futures):
+    """Raise the exception of the first fetch worker that failed, if any."""
+    for future in futures:
+        if future.done() and not future.cancelled() and future.exception():
+            raise future.exception()
+
+
+def _normalized_row_count(pipeline, table_name: str, default: int) -> int:
+    """Rows written to `table_name` by the last pipeline run, according to dlt's normalize info."""
+    trace = pipeline.last_trace
+    normalize_info = trace.last_normalize_info if trace else None
+    if normalize_info is None:
+        return default
+    return normalize_info.row_counts.get(table_name, default)
+
+
 def logs_loading(
     pipeline,
     db_config: PostgresConfig,
@@ -15,15 +414,25 @@ def logs_loading(
     start_block=None,
     end_block=None,
     block_chunk_size=100000,
-):
+    max_block_chunk_size=1_000_000,
+    max_workers=1,
+    loader="dlt",
+) -> List[LogChunkMetrics]:
     """
     Load blockchain event logs for a specific contract address into PostgreSQL using DLT pipeline.
 
     This function performs incremental loading of blockchain logs by:
-    1. Determining the starting block (either from last loaded block or specified)
-    2. Fetching logs in configurable chunks to manage API rate limits
-    3. Loading data via DLT pipeline with retry logic for robustness
-    4. Tracking progress and warning about potential API limit hits
+    1. Determining the block ranges still to load from the checkpoint table, the last
+       loaded block, or the specified start block
+    2. Fetching logs in adaptive block windows (see BlockRangePlanner): windows that hit
+       the Etherscan result cap are bisected and refetched, sparse regions are widened
+    3. Loading each complete window via DLT pipeline with retry logic for robustness,
+       merged on (chainid, transaction_hash, log_index) so retries never duplicate logs
+    4. Checkpointing each loaded window (see stables.data.load.checkpoints)
+
+    Fetching runs in `max_workers` background threads over disjoint block segments, all
+    throttled by the process-wide Etherscan token bucket, while this thread loads the
+    fetched windows. Network I/O therefore continues while dlt normalizes and loads.
 
     Args:
         pipeline (dlt.Pipeline): Configured DLT pipeline instance for data loading
@@ -31,72 +440,236 @@ def logs_loading(
         table_name (str): Target table name in PostgreSQL database
 
         chainid (int): Blockchain network ID (1 for Ethereum mainnet)
-        contract_address (str): Ethereum contract address to fetch logs for (lowercase)
+        contract_address (str): Ethereum contract address to fetch logs for (any case)
 
         config (PostgresConfig): Database configuration object with connection parameters
 
-        start_block (int, optional): Starting block number. If None, continues from last loaded block
-        end_block (int, optional): Ending block number. If None, uses latest blockchain block
-        block_chunk_size (int, optional): Number of blocks to process per batch. Defaults to 100000
+        start_block (int, optional): Starting block number. If None, continues from the checkpoints
+            or the last loaded block. Checkpointed ranges after start_block are skipped either way
+        end_block (int, optional): Ending block number (inclusive). If None, uses latest blockchain block
+        block_chunk_size (int, optional): Size of the first block window. Defaults to 100000
+        max_block_chunk_size (int, optional): Upper bound for the adaptive window size. Defaults to 1000000
+        max_workers (int, optional): Number of concurrent fetch workers. Defaults to 1
+        loader (str, optional): "dlt" to load via `pipeline`, or "copy" to write with
+            COPY through an unlogged stage table (see stables.data.load.copy_loader),
+            for high-volume tables. Defaults to "dlt"
+
+    Returns:
+        List[LogChunkMetrics]: Row counts and timings for every loaded window, in load order
 
     Note:
-        - Uses exponential backoff and retry logic for API failures
-        - Warns when exactly 1000 logs are loaded (potential API limit)
-        - Includes 0.2 second delay between batches to respect rate limits
+        - Retries failed fetches and loads, and raises once retries are exhausted
+        - With more than one worker, windows are loaded out of block order
+        - A window is checkpointed right after its load commits; if the process dies in
+          between, only that window is fetched again on the next run
         - Automatically determines incremental loading start point
     """
-    if start_block is None:
-        start_block = get_loaded_block(
-            db_config,
-            table_schema,
-            table_name,
-            chainid,
-            contract_address,
-            column_name="block_number",
-        )
-
+    contract_address = contract_address.lower()
     if end_block is None:
-        end_block = get_latest_block(chainid=chainid)
-
-    for from_block in range(start_block, end_block, block_chunk_size):
-        to_block = str(min(from_block + block_chunk_size - 1, end_block))
-        logger.info(f"Loading logs from block {from_block} to {to_block}")
-
-        max_retries = 2
-        retries = max_retries
-        while retries > 0:
-            try:
-                n_before = get_rows_count(db_config, table_schema, table_name)
-                pipeline.run(
-                    etherscan_logs(
-                        chainid=chainid,
-                        address=contract_address,
-                        fromBlock=from_block,
-                        toBlock=to_block,
-                    ),
-                    table_name=table_name,
-                    write_disposition="append",
-                )
-                n_after = get_rows_count(db_config, table_schema, table_name)
+        end_block = get_contract_resolver().latest_block(chainid)
 
-                n = n_after - n_before
+    gaps = pending_block_ranges(
+        db_config,
+        table_schema,
+        table_name,
+        chainid,
+        contract_address,
+        start_block,
+        end_block,
+    )
+    logger.info(f"{len(gaps)} block range(s) to load up to block {end_block}")
 
-                if n >= 1000:
-                    logger.warning(
-                        f"Loaded {n} logs from {from_block} to {to_block}, smaller batch size may be needed."
+    # More segments than workers, so a dense segment does not leave the other workers idle
+    n_segments = 1 if max_workers <= 1 else max_workers * 4
+    segments = plan_segments(gaps, max(n_segments, len(gaps)))
+
+    batches = queue.Queue(maxsize=max(2, max_workers * 2))
+    stop = threading.Event()
+    chunk_metrics = []
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="logs-fetch"
+    ) as executor:
+        futures = [
+            executor.submit(
+                _fetch_segment,
+                chainid,
+                contract_address,
+                segment_from,
+                segment_to,
+                batches,
+                stop,
+                block_chunk_size,
+                max_block_chunk_size,
+            )
+            for segment_from, segment_to in segments
+        ]
+
+        try:
+            while True:
+                _raise_worker_error(futures)
+                try:
+                    from_block, to_block, logs, fetch_seconds = batches.get(timeout=0.5)
+                except queue.Empty:
+                    if all(f.done() for f in futures) and batches.empty():
+                        _raise_worker_error(futures)
+                        break
+                    continue
+
+                chunk_metrics.append(
+                    commit_window(
+                        pipeline,
+                        db_config,
+                        table_schema,
+                        table_name,
+                        chainid,
+                        contract_address,
+                        from_block,
+                        to_block,
+                        logs,
+                        fetch_seconds,
+                        loader,
                     )
-                else:
-                    logger.info(f"Loaded {n} logs from {from_block} to {to_block}")
-                break  # Succeeded
-            except Exception as e:
-                retries -= 1
-                logger.error(
-                    f"Error loading logs: {e}. Retrying... ({retries} retries left)"
                 )
-                if retries > 0:
-                    time.sleep(3)
-                else:
-                    logger.error(
-                        f"Failed to load logs for block range {from_block}-{to_block} after {max_retries} retries."
+        except BaseException:
+            stop_workers(futures, batches, stop)
+            raise
+
+    n_calls = sum(f.result()[0] for f in futures)
+    n_splits = sum(f.result()[1] for f in futures)
+    n_loaded = sum(m.n_loaded for m in chunk_metrics)
+    logger.info(
+        f"Finished loading {n_loaded} logs up to block {end_block} in {n_calls} getLogs requests "
+        f"({n_splits} window splits)"
+    )
+    return chunk_metrics
+
+
+def follow_logs(
+    pipeline,
+    db_config: PostgresConfig,
+    table_schema: str,
+    table_name: str,
+    chainid: int,
+    contract_address: str,
+    start_block=None,
+    confirmations: int = 12,
+    poll_interval: float = 12.0,
+    block_chunk_size=100000,
+    max_block_chunk_size=1_000_000,
+    max_workers=1,
+    loader="dlt",
+    stop: Optional[threading.Event] = None,
+    max_polls: Optional[int] = None,
+    max_backoff: float = 300.0,
+) -> List[LogChunkMetrics]:
+    """
+    Load a contract's event logs up to the chain head, then keep following the head.
+
+    The backlog is first loaded with logs_loading up to `confirmations` blocks behind
+    the head. After that, every `poll_interval` seconds the head is polled and only the
+    delta window since the last loaded block is fetched, loaded and checkpointed right
+    away, so new logs reach Postgres within seconds of being `confirmations` deep.
+    The next block is tracked in memory; the checkpoint table is not re-queried.
+
+    A poll that fails (Etherscan or Postgres errors left after the retries) is logged
+    and the next one is delayed by an exponential backoff; the next block only moves
+    past windows that were loaded, so the failed ones are fetched again.
+
+    Args:
+        pipeline (dlt.Pipeline): Configured DLT pipeline instance for data loading
+        db_config (PostgresConfig): Database configuration object
+        table_schema (str): PostgreSQL schema name for the target table
+        table_name (str): Target table name in PostgreSQL database
+        chainid (int): Blockchain network ID
+        contract_address (str): Contract address to fetch logs for (lowercase)
+        start_block (int, optional): Starting block of the backlog, see logs_loading
+        confirmations (int, optional): Blocks to stay behind the head, so reorgs near
+            the tip are not loaded. Defaults to 12
+        poll_interval (float, optional): Seconds between head polls. Defaults to 12 (one Ethereum slot)
+        block_chunk_size, max_block_chunk_size, max_workers: Passed to logs_loading for the backlog
+        loader (str, optional): "dlt" or "copy", see logs_loading
+        stop (threading.Event, optional): Set to stop following after the current poll
+        max_polls (int, optional): Stop after this many polls, follow forever if None
+        max_backoff (float, optional): Longest delay, in seconds, between failed polls.
+            Defaults to 300
+
+    Returns:
+        List[LogChunkMetrics]: Metrics of every loaded window, backlog included
+    """
+    stop = stop or threading.Event()
+    resolver = get_contract_resolver()
+
+    end_block = resolver.latest_block(chainid, max_age=0) - confirmations
+    chunk_metrics = logs_loading(
+        pipeline,
+        db_config,
+        table_schema,
+        table_name,
+        chainid,
+        contract_address,
+        start_block=start_block,
+        end_block=end_block,
+        block_chunk_size=block_chunk_size,
+        max_block_chunk_size=max_block_chunk_size,
+        max_workers=max_workers,
+        loader=loader,
+    )
+    next_block = end_block + 1
+    logger.info(
+        f"Caught up to block {end_block}, following {contract_address} on chain {chainid} "
+        f"{confirmations} blocks behind the head"
+    )
+
+    n_polls, n_failures = 0, 0
+    delay = poll_interval
+    while not stop.wait(delay):
+        delay = poll_interval
+        try:
+            safe_block = resolver.latest_block(chainid, max_age=0) - confirmations
+            if safe_block >= next_block:
+                planner = BlockRangePlanner(
+                    next_block,
+                    safe_block,
+                    initial_size=safe_block - next_block + 1,
+                    max_size=max_block_chunk_size,
+                    result_cap=ETHERSCAN_RESULT_CAP,
+                )
+                while (window := planner.next_window()) is not None:
+                    window_from, window_to = window
+                    fetch_started = time.perf_counter()
+                    logs = fetch_with_retries(
+                        chainid, contract_address, window_from, window_to
+                    )
+                    if not planner.record(window_from, window_to, n_results=len(logs)):
+                        continue
+                    chunk_metrics.append(
+                        commit_window(
+                            pipeline,
+                            db_config,
+                            table_schema,
+                            table_name,
+                            chainid,
+                            contract_address,
+                            window_from,
+                            window_to,
+                            logs,
+                            time.perf_counter() - fetch_started,
+                            loader,
+                        )
                     )
-        time.sleep(0.2)
+                    next_block = window_to + 1
+            n_failures = 0
+        except Exception:
+            n_failures += 1
+            delay = min(max_backoff, poll_interval * 2**n_failures)
+            logger.exception(
+                f"Poll of {contract_address} on chain {chainid} failed ({n_failures} in a row), "
+                f"retrying from block {next_block} in {delay:.0f}s"
+            )
+
+        n_polls += 1
+        if max_polls is not None and n_polls >= max_polls:
+            break
+
+    return chunk_metrics
@@ -0,0 +1,120 @@
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ETHERSCAN_RESULT_CAP = 1000
+
+
+class BlockRangePlanner:
+    """
+    Adaptive planner for block windows passed to Etherscan getLogs.
+
+    Each window is fetched as a single page of at most result_cap logs, so a full page
+    means the window may be truncated. The window size is adjusted after every fetch,
+    AIMD-style:
+    - a window that hits the result cap is bisected and fetched again, so logs are never dropped
+    - otherwise the next window is sized from the observed log density to land near
+      target_fill of the cap, widening by at most growth_factor across sparse regions
+
+    Usage:
+        planner = BlockRangePlanner(start_block, end_block)
+        while (window := planner.next_window()) is not None:
+            rows = fetch(*window)
+            if planner.record(*window, n_results=len(rows)):
+                load(rows)
+    """
+
+    def __init__(
+        self,
+        start_block: int,
+        end_block: int,
+        initial_size: int = 10_000,
+        min_size: int = 1,
+        max_size: int = 1_000_000,
+        result_cap: int = ETHERSCAN_RESULT_CAP,
+        target_fill: float = 0.5,
+        growth_factor: float = 2.0,
+    ):
+        """
+        Args:
+            start_block: First block to fetch (inclusive)
+            end_block: Last block to fetch (inclusive)
+            initial_size: Number of blocks in the first window
+            min_size: Smallest window the planner will bisect down to
+            max_size: Largest window the planner will widen up to
+            result_cap: Number of results at which a response is considered truncated
+            target_fill: Fraction of the cap the planner aims each window at
+            growth_factor: Maximum multiplier applied to the window size between fetches
+        """
+        if min_size < 1 or max_size < min_size:
+            raise ValueError(f"Invalid window bounds: min={min_size}, max={max_size}")
+
+        self.cursor = start_block
+        self.end_block = end_block
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = max(min_size, min(initial_size, max_size))
+        self.result_cap = result_cap
+        self.target_fill = target_fill
+        self.growth_factor = growth_factor
+
+        # getLogs requests made, one per recorded window
+        self.n_calls = 0
+        self.n_splits = 0
+
+    @property
+    def done(self) -> bool:
+        return self.cursor > self.end_block
+
+    def next_window(self) -> Optional[Tuple[int, int]]:
+        """Return the next (from_block, to_block) window, or None when the range is exhausted."""
+        if self.done:
+            return None
+        return self.cursor, min(self.cursor + self.size - 1, self.end_block)
+
+    def record(self, from_block: int, to_block: int, n_results: int) -> bool:
+        """
+        Record the result count of a fetched window and adapt the window size.
+
+        Args:
+            from_block: First block of the fetched window
+            to_block: Last block of the fetched window
+            n_results: Number of logs returned for the window
+
+        Returns:
+            bool: True if the window is complete and its results should be loaded,
+                  False if it was truncated and has been bisected for a refetch.
+        """
+        if from_block != self.cursor:
+            raise ValueError(
+                f"Window {from_block}-{to_block} does not start at cursor {self.cursor}"
+            )
+        self.n_calls += 1
+        span = to_block - from_block + 1
+
+        if n_results >= self.result_cap:
+            if span > self.min_size:
+                self.size = max(self.min_size, span // 2)
+                self.n_splits += 1
+                logger.debug(
+                    f"Window {from_block}-{to_block} hit the {self.result_cap} result cap, "
+                    f"bisecting to {self.size} blocks"
+                )
+                return False
+            logger.warning(
+                f"Window {from_block}-{to_block} returned {n_results} logs at the minimum window "
+                f"size of {self.min_size} blocks, results may be truncated."
+            )
+
+        # Aim the next window at target_fill of the cap given the observed log density,
+        # growing by at most growth_factor so a quiet stretch cannot overshoot a dense one.
+        target = self.result_cap * self.target_fill
+        if n_results == 0:
+            size = span * self.growth_factor
+        else:
+            size = min(span * target / n_results, span * self.growth_factor)
+        self.size = int(max(self.min_size, min(self.max_size, size)))
+
+        self.cursor = to_block + 1
+        return True
@@ -0,0 +1,424 @@
+import logging
+import queue
+import threading
+import time
+import tomllib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import dlt
+
+from stables.config import PostgresConfig
+from stables.data.load.logs import (
+    LogChunkMetrics,
+    commit_window,
+    fetch_with_retries,
+    pending_block_ranges,
+    stop_workers,
+)
+from stables.data.load.ranges import BlockRangePlanner, ETHERSCAN_RESULT_CAP
+from stables.data.source import get_contract_resolver
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LogTarget:
+    """A contract whose event logs are loaded into a table."""
+
+    chainid: int
+    address: str
+    table_schema: str
+    table_name: str
+    start_block: Optional[int] = None
+    end_block: Optional[int] = None
+
+    def __post_init__(self):
+        self.address = self.address.lower()
+
+    @property
+    def name(self) -> str:
+        return f"{self.table_schema}.{self.table_name}:{self.chainid}:{self.address}"
+
+
+def load_manifest(path: str) -> List[LogTarget]:
+    """
+    Read log targets from a TOML manifest.
+
+    Keys of the optional [defaults] table apply to every [[targets]] entry, e.g.:
+
+        [defaults]
+        table_schema = "ethena_raw"
+        table_name = "usde_contract_logs"
+
+        [[targets]]
+        chainid = 1
+        address = "0x4c9edd5852cd905f086c759e8383e09bff1e68b3"
+
+    Args:
+        path: Path of the manifest file
+
+    Returns:
+        list[LogTarget]: Targets in manifest order
+    """
+    with open(path, "rb") as f:
+        manifest = tomllib.load(f)
+    defaults = manifest.get("defaults", {})
+    return [LogTarget(**{**defaults, **target}) for target in manifest["targets"]]
+
+
+class _TargetState:
+    """Remaining block gaps of one target and the planner walking the current gap."""
+
+    def __init__(
+        self,
+        target: LogTarget,
+        gaps: List[Tuple[int, int]],
+        block_chunk_size: int,
+        max_block_chunk_size: int,
+    ):
+        self.target = target
+        self.gaps = deque(gaps)
+        self.end_block = gaps[-1][1] if gaps else None
+        self.block_chunk_size = block_chunk_size
+        self.max_block_chunk_size = max_block_chunk_size
+        self.planner: Optional[BlockRangePlanner] = None
+        self.fetching = False
+        # Set when a window of the target failed, its other windows wait for the next round
+        self.failed = False
+
+    def next_window(self) -> Optional[Tuple[int, int]]:
+        while (self.planner is None or self.planner.done) and self.gaps:
+            from_block, to_block = self.gaps.popleft()
+            # Keep the window size learned on the previous gap
+            size = self.planner.size if self.planner else self.block_chunk_size
+            self.planner = BlockRangePlanner(
+                from_block,
+                to_block,
+                initial_size=size,
+                max_size=self.max_block_chunk_size,
+                result_cap=ETHERSCAN_RESULT_CAP,
+            )
+        return self.planner.next_window() if self.planner else None
+
+    @property
+    def lag(self) -> int:
+        """Blocks between the next block to fetch and the end of the last gap."""
+        if self.end_block is None:
+            return 0
+        if self.planner is not None and not self.planner.done:
+            next_block = self.planner.cursor
+        elif self.gaps:
+            next_block = self.gaps[0][0]
+        else:
+            return 0
+        return self.end_block - next_block + 1
+
+
+class LogScheduler:
+    """
+    Load the event logs of many (chainid, address, table) targets with one worker pool.
+
+    Each round plans the block gaps of every target up to its chain head (minus
+    `confirmations`). Workers then repeatedly claim the next adaptive window of the
+    target furthest behind, with at most one fetch in flight per target, so windows
+    of all targets are interleaved and the laggards catch up first. All Etherscan
+    calls draw from the process-wide token bucket of the API key, so throughput is
+    bounded by the quota rather than by the number of targets. Fetched windows are
+    loaded and checkpointed on the calling thread, one dlt pipeline per schema.
+
+    A target whose planning, fetch (after its retries) or load fails is logged and
+    skipped for the rest of the round, and sits out the following rounds with an
+    exponential backoff; the other targets keep loading. A round that fails as a
+    whole (e.g. Postgres is down) is retried by run_forever with the same backoff.
+
+    Usage:
+        scheduler = LogScheduler(load_manifest("scripts/log_targets.toml"), PostgresConfig())
+        scheduler.run_forever()
+    """
+
+    def __init__(
+        self,
+        targets: List[LogTarget],
+        db_config: PostgresConfig,
+        max_workers: int = 4,
+        block_chunk_size: int = 10_000,
+        max_block_chunk_size: int = 1_000_000,
+        confirmations: int = 0,
+        poll_interval: float = 60.0,
+        loader: str = "dlt",
+        max_backoff: float = 900.0,
+    ):
+        """
+        Args:
+            targets: Targets to load
+            db_config: PostgresConfig instance
+            max_workers: Number of concurrent fetch workers
+            block_chunk_size: Size of the first block window of each target
+            max_block_chunk_size: Upper bound for the adaptive window size
+            confirmations: Blocks to stay behind the chain head
+            poll_interval: Seconds between rounds in run_forever, and the first
+                backoff after a failure
+            loader: "dlt" or "copy", see logs_loading
+            max_backoff: Longest backoff, in seconds, after repeated failures
+        """
+        self.targets = targets
+        self.db_config = db_config
+        self.max_workers = max_workers
+        self.block_chunk_size = block_chunk_size
+        self.max_block_chunk_size = max_block_chunk_size
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.loader = loader
+        self.max_backoff = max_backoff
+        # Failures of the last round by target name
+        self.errors: Dict[str, Exception] = {}
+
+        # Target name -> (consecutive failed rounds, monotonic time of the next attempt)
+        self._backoff: Dict[str, Tuple[int, float]] = {}
+        self._pipelines: Dict[str, dlt.Pipeline] = {}
+        self._states: List[_TargetState] = []
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    def _pipeline(self, table_schema: str) -> Optional[dlt.Pipeline]:
+        if self.loader == "copy":
+            return None
+        if table_schema not in self._pipelines:
+            self._pipelines[table_schema] = dlt.pipeline(
+                pipeline_name=f"stables_logs_{table_schema}",
+                destination=dlt.destinations.postgres(
+                    **self.db_config.get_dlt_connection_params()
+                ),
+                dataset_name=table_schema,
+            )
+        return self._pipelines[table_schema]
+
+    def _backoff_delay(self, n_failures: int) -> float:
+        return min(self.max_backoff, self.poll_interval * 2 ** (n_failures - 1))
+
+    def _record_failure(self, target: LogTarget, error: Exception):
+        """Log a failed target and back it off; called with self._cond held or before workers start."""
+        n_failures = self._backoff.get(target.name, (0, 0.0))[0] + 1
+        delay = self._backoff_delay(n_failures)
+        self._backoff[target.name] = (n_failures, time.monotonic() + delay)
+        self.errors[target.name] = error
+        logger.error(
+            f"{target.name} failed ({n_failures} in a row): {error!r}, "
+            f"retrying in {delay:.0f}s",
+            exc_info=error,
+        )
+
+    def _is_backing_off(self, target: LogTarget) -> bool:
+        backoff = self._backoff.get(target.name)
+        return backoff is not None and backoff[1] > time.monotonic()
+
+    def plan(self) -> List[_TargetState]:
+        """Compute the block gaps of every target not backing off up to its chain head."""
+        resolver = get_contract_resolver()
+        targets = [t for t in self.targets if not self._is_backing_off(t)]
+        if len(targets) < len(self.targets):
+            logger.info(f"{len(self.targets) - len(targets)} targets backing off")
+
+        heads = {}
+        for chainid in sorted({target.chainid for target in targets}):
+            try:
+                heads[chainid] = resolver.latest_block(chainid) - self.confirmations
+            except Exception as e:
+                for target in targets:
+                    if target.chainid == chainid:
+                        self._record_failure(target, e)
+        targets = [t for t in targets if t.chainid in heads]
+        chainids = sorted(heads)
+
+        # Creation blocks are the start of new targets, look them up in batches
+        for chainid in chainids:
+            addresses = [
+                t.address
+                for t in targets
+                if t.chainid == chainid and t.start_block is None
+            ]
+            try:
+                resolver.creation_blocks(chainid, addresses)
+            except Exception as e:
+                logger.warning(
+                    f"Batched creation lookup on chain {chainid} failed: {e}"
+                )
+
+        states = []
+        for target in targets:
+            end_block = heads[target.chainid]
+            if target.end_block is not None:
+                end_block = min(end_block, target.end_block)
+            try:
+                gaps = pending_block_ranges(
+                    self.db_config,
+                    target.table_schema,
+                    target.table_name,
+                    target.chainid,
+                    target.address,
+                    target.start_block,
+                    end_block,
+                )
+            except Exception as e:
+                self._record_failure(target, e)
+                continue
+            state = _TargetState(
+                target, gaps, self.block_chunk_size, self.max_block_chunk_size
+            )
+            logger.info(f"{target.name}: {state.lag} blocks behind block {end_block}")
+            states.append(state)
+        return states
+
+    def _claim_window(self):
+        """Claim the next window of the idle target furthest behind, None if there is none."""
+        candidates = [
+            state
+            for state in self._states
+            if not state.fetching
+            and not state.failed
+            and state.next_window() is not None
+        ]
+        if not candidates:
+            return None
+        state = max(candidates, key=lambda s: s.lag)
+        state.fetching = True
+        return state, state.next_window()
+
+    def _worker(self, batches: queue.Queue):
+        while not self._stop.is_set():
+            with self._cond:
+                claimed = self._claim_window()
+                if claimed is None:
+                    if not any(state.fetching for state in self._states):
+                        return
+                    # A fetch in flight may be bisected and add work
+                    self._cond.wait(timeout=0.5)
+                    continue
+            state, (from_block, to_block) = claimed
+            target = state.target
+
+            fetch_started = time.perf_counter()
+            try:
+                logs = fetch_with_retries(
+                    target.chainid, target.address, from_block, to_block
+                )
+            except Exception as e:
+                with self._cond:
+                    state.fetching = False
+                    state.failed = True
+                    self._record_failure(target, e)
+                    self._cond.notify_all()
+                continue
+            except BaseException:
+                with self._cond:
+                    state.fetching = False
+                    self._cond.notify_all()
+                raise
+
+            with self._cond:
+                complete = state.planner.record(from_block, to_block, len(logs))
+                state.fetching = False
+                self._cond.notify_all()
+            if complete:
+                fetch_seconds = time.perf_counter() - fetch_started
+                batches.put((state, from_block, to_block, logs, fetch_seconds))
+
+    def run_once(self) -> List[Tuple[LogTarget, LogChunkMetrics]]:
+        """
+        Catch every target up to its chain head.
+
+        Failed targets are logged and backed off rather than raised, see `errors`.
+
+        Returns:
+            list[tuple[LogTarget, LogChunkMetrics]]: Metrics of every loaded window, in load order
+        """
+        self.errors = {}
+        self._states = self.plan()
+        batches = queue.Queue(maxsize=max(2, self.max_workers * 2))
+        results = []
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="logs-scheduler"
+        ) as executor:
+            futures = [
+                executor.submit(self._worker, batches) for _ in range(self.max_workers)
+            ]
+            try:
+                while True:
+                    try:
+                        state, from_block, to_block, logs, fetch_seconds = batches.get(
+                            timeout=0.5
+                        )
+                    except queue.Empty:
+                        failed = [f for f in futures if f.done() and f.exception()]
+                        if failed:
+                            raise failed[0].exception()
+                        if all(f.done() for f in futures) and batches.empty():
+                            break
+                        continue
+
+                    target = state.target
+                    if state.failed:
+                        # Not checkpointed, fetched again once the target is retried
+                        continue
+                    try:
+                        metrics = commit_window(
+                            self._pipeline(target.table_schema),
+                            self.db_config,
+                            target.table_schema,
+                            target.table_name,
+                            target.chainid,
+                            target.address,
+                            from_block,
+                            to_block,
+                            logs,
+                            fetch_seconds,
+                            self.loader,
+                        )
+                    except Exception as e:
+                        with self._cond:
+                            state.failed = True
+                            self._record_failure(target, e)
+                        continue
+                    results.append((target, metrics))
+            except BaseException:
+                stop_workers(futures, batches, self._stop)
+                raise
+
+        for state in self._states:
+            if not state.failed:
+                self._backoff.pop(state.target.name, None)
+
+        n_loaded = sum(metrics.n_loaded for _, metrics in results)
+        logger.info(
+            f"Loaded {n_loaded} logs in {len(results)} windows across {len(self.targets)} targets"
+            + (f", {len(self.errors)} failed" if self.errors else "")
+        )
+        return results
+
+    def run_forever(self):
+        """
+        Catch all targets up, then poll for new blocks every poll_interval seconds until stopped.
+
+        A round that raises is logged and retried after an exponential backoff.
+        """
+        n_failures = 0
+        while not self._stop.is_set():
+            delay = self.poll_interval
+            try:
+                self.run_once()
+                n_failures = 0
+            except Exception:
+                n_failures += 1
+                delay = self._backoff_delay(n_failures)
+                logger.exception(
+                    f"Scheduler round failed ({n_failures} in a row), retrying in {delay:.0f}s"
+                )
+            self._stop.wait(delay)
+
+    def stop(self):
+        """Stop after the windows already fetched are loaded."""
+        self._stop.set()
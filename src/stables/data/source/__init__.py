@@ -1,4 +1,4 @@
-from .coingecko import coingecko_prices
+from .coingecko import CoinGeckoSession, coingecko_market_chart_range, coingecko_prices
 from .etherscan import (
     etherscan_transactions,
     etherscan_logs,
@@ -6,23 +6,32 @@ from .etherscan import (
     get_contract_abi,
     get_contract_creation_txn,
 )
+from .contracts import ContractMetadataResolver, get_contract_resolver
 import dlt
 from .defillama import (
     defillama_stables_base,
     defillama_stables_chain_circulating,
+    defillama_stablecoins,
     defillama_stablecoin_chain_tokens,
+    defillama_stablecoins_chain_tokens,
     defillama_yield_pools,
 )
 
 __all__ = [
     "coingecko_prices",
+    "coingecko_market_chart_range",
+    "CoinGeckoSession",
     "etherscan_transactions",
     "etherscan_logs",
     "get_latest_block",
     "get_contract_abi",
     "get_contract_creation_txn",
+    "ContractMetadataResolver",
+    "get_contract_resolver",
     "defillama_stables_base",
     "defillama_stables_chain_circulating",
+    "defillama_stablecoins",
     "defillama_stablecoin_chain_tokens",
+    "defillama_stablecoins_chain_tokens",
     "defillama_yield_pools",
 ]
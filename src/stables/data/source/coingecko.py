@@ -1,25 +1,186 @@
-from typing import Optional
-from datetime import datetime
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timezone
 import dlt
-from dlt.sources.rest_api import RESTAPIConfig, rest_api_resources
+import numpy as np
+import pandas as pd
+import requests
 from stables.config import *
+from stables.utils.arrow import require_pyarrow
+from stables.utils.http_cache import CachedSession
+from stables.utils.rate_limit import get_rate_limiter
+from stables.utils.state import resource_state
 
+logger = logging.getLogger(__name__)
 
-def map_market_chart(data):
-    return {
-        "timestamp": datetime.fromtimestamp(int(data[0]) / 1000),
-        "price": float(data[1]),
-    }
+MARKET_CHART_PRIMARY_KEY = ("coin_id", "vs_currency", "timestamp")
 
+# market_chart/range picks the granularity from the window length: more than 1 day
+# and up to 90 days is hourly, more than 90 days daily. (min, max) days per window
+RANGE_WINDOW_DAYS = {"hourly": (2, 90), "daily": (91, 365)}
+RANGE_STEP_SECONDS = {"hourly": 3600, "daily": 86400}
+# History reachable by the public and demo plans
+DEFAULT_HISTORY_DAYS = 365
 
-def map_ohlc(data):
-    return {
-        "timestamp": datetime.fromtimestamp(int(data[0]) / 1000),
-        "open": float(data[1]),
-        "high": float(data[2]),
-        "low": float(data[3]),
-        "close": float(data[4]),
-    }
+
+class CoinGeckoSession(CachedSession):
+    """
+    Rate-limited, cached session for the CoinGecko API.
+
+    With an API key, requests go to the base URL of the key's plan with the key in
+    the plan's header, and draw from the process-wide token bucket of the key at the
+    plan's budget (COINGECKO_CALLS_PER_MINUTE). Responses served from the HTTP cache
+    do not take a token.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = COINGECKO_API_KEY,
+        plan: str = COINGECKO_API_PLAN,
+        calls_per_minute: Optional[float] = None,
+        cache=None,
+    ):
+        """
+        Args:
+            api_key: CoinGecko API key, None for the keyless public API
+            plan: "demo" or "pro", the plan of api_key
+            calls_per_minute: Sustained request rate, defaults to the plan's budget
+            cache: HTTP cache, see CachedSession
+        """
+        super().__init__(cache=cache, max_retries=5)
+        self.plan = plan if api_key else "public"
+        if self.plan not in COINGECKO_CALLS_PER_MINUTE:
+            raise ValueError(f"Unknown CoinGecko plan {plan!r}")
+        self.base_url = (
+            COINGECKO_PRO_API_BASE_URL if self.plan == "pro" else COINGECKO_API_BASE_URL
+        )
+        self.headers["accept"] = "application/json"
+        if api_key:
+            self.headers[f"x-cg-{self.plan}-api-key"] = api_key
+        calls_per_minute = calls_per_minute or COINGECKO_CALLS_PER_MINUTE[self.plan]
+        self.rate_limiter = get_rate_limiter(
+            f"coingecko:{api_key}", calls_per_minute / 60
+        )
+        self.request_count = 0
+
+    def _send(self, request, **kwargs):
+        waited = self.rate_limiter.acquire()
+        if waited:
+            logger.debug(f"Rate limiting: slept for {waited:.3f}s")
+        self.request_count += 1
+        logger.info(f"API Call #{self.request_count}: {request.url.split('?', 1)[0]}")
+        return super()._send(request, **kwargs)
+
+
+def _points(values, width: int) -> np.ndarray:
+    """(n, width) float64 array of a JSON list of points, None becoming NaN."""
+    return np.array(values or [], dtype=np.float64).reshape(-1, width)
+
+
+def _last_by_timestamp(timestamps: np.ndarray) -> np.ndarray:
+    """Indices sorting timestamps ascending, keeping the last of duplicate timestamps."""
+    order = np.argsort(timestamps, kind="stable")
+    ordered = timestamps[order]
+    keep = np.ones(len(ordered), dtype=bool)
+    keep[:-1] = ordered[1:] != ordered[:-1]
+    return order[keep]
+
+
+def market_chart_columns(
+    data: dict, after_ms: Optional[int] = None, to_ms: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Columns of a market_chart (or market_chart/range) response, in one NumPy pass.
+
+    Points without a price and outside (after_ms, to_ms] are dropped; timestamps are
+    sorted and unique, a duplicate keeping its last point. Market caps and volumes are
+    aligned on the price timestamps, NaN where a series has no point.
+
+    Args:
+        data: Response with "prices", "market_caps" and "total_volumes" [epoch ms, value] lists
+        after_ms: Keep timestamps after this epoch ms
+        to_ms: Keep timestamps up to this epoch ms
+
+    Returns:
+        dict[str, np.ndarray]: int64 epoch ms "timestamp" and float64 "price",
+            "market_cap" and "total_volume"
+    """
+    prices = _points(data.get("prices"), 2)
+    timestamps = prices[:, 0].astype(np.int64)
+    keep = ~np.isnan(prices[:, 1])
+    if after_ms is not None:
+        keep &= timestamps > after_ms
+    if to_ms is not None:
+        keep &= timestamps <= to_ms
+    prices, timestamps = prices[keep], timestamps[keep]
+    index = _last_by_timestamp(timestamps)
+    columns = {"timestamp": timestamps[index], "price": prices[index, 1]}
+
+    for series, name in (
+        ("market_caps", "market_cap"),
+        ("total_volumes", "total_volume"),
+    ):
+        points = _points(data.get(series), 2)
+        points = points[_last_by_timestamp(points[:, 0].astype(np.int64))]
+        series_timestamps = points[:, 0].astype(np.int64)
+        position = np.searchsorted(series_timestamps, columns["timestamp"])
+        found = position < len(series_timestamps)
+        found[found] = series_timestamps[position[found]] == columns["timestamp"][found]
+        values = np.full(len(columns["timestamp"]), np.nan)
+        values[found] = points[position[found], 1]
+        columns[name] = values
+    return columns
+
+
+def ohlc_columns(data: list) -> Dict[str, np.ndarray]:
+    """Columns of an ohlc response ([epoch ms, open, high, low, close] lists), see market_chart_columns."""
+    points = _points(data, 5)
+    timestamps = points[:, 0].astype(np.int64)
+    index = _last_by_timestamp(timestamps)
+    columns = {"timestamp": timestamps[index]}
+    for i, name in enumerate(["open", "high", "low", "close"], start=1):
+        columns[name] = points[index, i]
+    return columns
+
+
+def coingecko_batch(columns: Dict[str, np.ndarray], arrow: bool = False, **constants):
+    """
+    Build the rows of a response from its columns.
+
+    Epoch ms timestamps become UTC timestamps and NaN values nulls.
+
+    Args:
+        columns: Columns of market_chart_columns or ohlc_columns
+        arrow: Return a pyarrow Table (timestamp[ms, UTC] and float64 columns) instead
+            of a list of dicts
+        **constants: Columns with the same value in every row, e.g. coin_id
+
+    Returns:
+        pyarrow.Table | list[dict]: Rows, constant columns first
+    """
+    n_rows = len(columns["timestamp"])
+    values = {name: column for name, column in columns.items() if name != "timestamp"}
+    if arrow:
+        pa = require_pyarrow()
+        arrays = {name: pa.array([value] * n_rows) for name, value in constants.items()}
+        arrays["timestamp"] = pa.array(
+            columns["timestamp"], type=pa.timestamp("ms", tz="UTC")
+        )
+        for name, column in values.items():
+            arrays[name] = pa.array(column, type=pa.float64(), from_pandas=True)
+        return pa.table(arrays)
+
+    timestamps = pd.to_datetime(
+        columns["timestamp"], unit="ms", utc=True
+    ).to_pydatetime()
+    lists = [
+        np.where(np.isnan(column), None, column).tolist() for column in values.values()
+    ]
+    return [
+        {**constants, "timestamp": timestamp, **dict(zip(values, row))}
+        for timestamp, *row in zip(timestamps, *lists)
+    ]
 
 
 @dlt.source()
@@ -27,50 +188,158 @@ def coingecko_prices(
     coin_id: str,
     vs_currency: str = "usd",
     days: Optional[int] = 30,
+    arrow: bool = False,
+    session: Optional[CoinGeckoSession] = None,
 ):
-    """Resource for CoinGecko price data only, volume, market cap is available but not used"""
-
-    config: RESTAPIConfig = {
-        "client": {
-            "base_url": f"{COINGECKO_API_BASE_URL}/coins/{coin_id}/",
-            "headers": {
-                "accept": "application/json",
-            },
-        },
-        "resource_defaults": {
-            "primary_key": "timestamp",
-            "endpoint": {
-                "params": {
-                    "vs_currency": vs_currency,
-                    "days": days,
-                },
-            },
-        },
-        "resources": [
-            {
-                "name": "market_chart",
-                "endpoint": {
-                    "path": "market_chart",
-                    # "data_selector": "prices",
-                },
-                "processing_steps": [
-                    {
-                        "map": map_market_chart,
-                    }
-                ],
-            },
-            {
-                "name": "ohlc",
-                "endpoint": {
-                    "path": "ohlc",
-                },
-                "processing_steps": [
-                    {
-                        "map": map_ohlc,
-                    }
-                ],
-            },
-        ],
-    }
-
-    yield from rest_api_resources(config)
+    """
+    Resource for CoinGecko price data only, volume, market cap is available but not used.
+
+    Each response is converted in one pass (see coingecko_batch), with UTC timestamps.
+
+    Args:
+        coin_id: CoinGecko coin id
+        vs_currency: Quote currency
+        days: Days of history, which also sets CoinGecko's automatic granularity
+        arrow: Yield pyarrow Tables instead of dicts
+        session: Session to use, a CoinGeckoSession with COINGECKO_API_KEY by default
+    """
+    session = session or CoinGeckoSession()
+
+    def get(path: str):
+        response = session.get(
+            f"{session.base_url}/coins/{coin_id}/{path}",
+            params={"vs_currency": vs_currency, "days": days},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @dlt.resource(name="market_chart", primary_key="timestamp")
+    def market_chart():
+        columns = market_chart_columns(get("market_chart"))
+        yield coingecko_batch(
+            {"timestamp": columns["timestamp"], "price": columns["price"]}, arrow
+        )
+
+    @dlt.resource(name="ohlc", primary_key="timestamp")
+    def ohlc():
+        yield coingecko_batch(ohlc_columns(get("ohlc")), arrow)
+
+    return market_chart, ohlc
+
+
+def market_chart_range_windows(
+    start: int, end: int, granularity: str = "daily"
+) -> List[Tuple[int, int]]:
+    """
+    Plan the market_chart/range requests covering (start, end].
+
+    Windows are at most the maximum length of the granularity. A window shorter than
+    its minimum length (typically the last one) starts earlier, so CoinGecko still
+    returns that granularity; the extra points are already stored and filtered out.
+
+    Args:
+        start: Unix seconds, exclusive
+        end: Unix seconds, inclusive
+        granularity: "daily" or "hourly"
+
+    Returns:
+        list[tuple[int, int]]: (from, to) request parameters in unix seconds
+    """
+    min_days, max_days = RANGE_WINDOW_DAYS[granularity]
+    windows = []
+    cursor = start
+    while cursor < end:
+        to = min(cursor + max_days * 86400, end)
+        windows.append((min(cursor, to - min_days * 86400), to))
+        cursor = to
+    return windows
+
+
+def _unix_seconds(value: Optional[datetime]) -> Optional[int]:
+    """Unix seconds of a datetime, naive ones being UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+@dlt.resource(
+    name="market_chart_range",
+    columns=COINGECKO_MARKET_CHART_COLUMNS,  # type: ignore[arg-type]
+    primary_key=MARKET_CHART_PRIMARY_KEY,
+    write_disposition="merge",
+)
+def coingecko_market_chart_range(
+    coin_ids: Iterable[str],
+    vs_currency: str = "usd",
+    granularity: str = "daily",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    arrow: bool = False,
+    session: Optional[CoinGeckoSession] = None,
+):
+    """
+    Backfill prices, market caps and volumes of many coins from market_chart/range.
+
+    Each coin is fetched over explicit windows (see market_chart_range_windows), so
+    the granularity is fixed instead of following the length of a `days` query. The
+    last loaded timestamp of every (coin, currency, granularity) is kept in the dlt
+    resource state, and later runs only request what comes after it: a daily refresh
+    is one call per coin. Windows that ended more than a day ago are cached without
+    expiry (see stables.utils.http_cache). Coins CoinGecko does not know are skipped
+    with a warning.
+
+    Load hourly and daily series into separate tables (pipeline.run(table_name=...)).
+
+    Args:
+        coin_ids: CoinGecko coin ids, e.g. the gecko_id values of the DefiLlama stables
+        vs_currency: Quote currency
+        granularity: "daily" or "hourly"
+        start: First timestamp of a coin without loaded data (naive datetimes are UTC),
+            defaults to DEFAULT_HISTORY_DAYS before end
+        end: Last timestamp to load, defaults to the start of the current day or hour,
+            so only settled points are loaded
+        arrow: Yield a pyarrow Table per response instead of dicts
+        session: Session to use, a CoinGeckoSession with COINGECKO_API_KEY by default
+    """
+    if granularity not in RANGE_WINDOW_DAYS:
+        raise ValueError(
+            f"Unknown granularity {granularity!r}, expected 'daily' or 'hourly'"
+        )
+    session = session or CoinGeckoSession()
+    step = RANGE_STEP_SECONDS[granularity]
+    end_ts = _unix_seconds(end) or int(time.time()) // step * step
+    start_ts = _unix_seconds(start) or end_ts - DEFAULT_HISTORY_DAYS * 86400
+
+    last_timestamps = resource_state().setdefault("last_timestamps", {})
+    for coin_id in dict.fromkeys(coin_ids):
+        key = f"{coin_id}:{vs_currency}:{granularity}"
+        after_ms = max(last_timestamps.get(key, -1), start_ts * 1000 - 1)
+        windows = market_chart_range_windows(after_ms // 1000, end_ts, granularity)
+        n_rows = 0
+        for from_ts, to_ts in windows:
+            try:
+                response = session.get(
+                    f"{session.base_url}/coins/{coin_id}/market_chart/range",
+                    params={"vs_currency": vs_currency, "from": from_ts, "to": to_ts},
+                )
+                response.raise_for_status()
+            except requests.HTTPError as e:
+                # Only unknown coins are skipped: auth, quota and server errors must not
+                # pass as a successful backfill with coins missing
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                logger.warning(f"Skipping unknown coin {coin_id}: {e}")
+                break
+            columns = market_chart_columns(response.json(), after_ms, to_ts * 1000)
+            if len(columns["timestamp"]):
+                yield coingecko_batch(
+                    columns, arrow, coin_id=coin_id, vs_currency=vs_currency
+                )
+                n_rows += len(columns["timestamp"])
+                after_ms = int(columns["timestamp"][-1])
+                last_timestamps[key] = after_ms
+        logger.info(
+            f"{coin_id}: {n_rows} {granularity} prices in {len(windows)} requests"
+        )
@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from stables.config import CONTRACT_METADATA_PATH
+from stables.data.source.etherscan import (
+    get_contract_abi,
+    get_contract_creation_txn,
+    get_latest_block,
+)
+
+logger = logging.getLogger(__name__)
+
+# getcontractcreation accepts at most 5 comma-separated addresses per call
+CREATION_BATCH_SIZE = 5
+LATEST_BLOCK_MAX_AGE = 12.0
+
+
+class ContractMetadataResolver:
+    """
+    Memoized lookups of contract creation transactions, ABIs and chain heads.
+
+    Creation data and ABIs never change, so they are kept in an in-process LRU backed
+    by a SQLite store and fetched from Etherscan at most once per (chainid, address).
+    ABIs previously written to `abi_dir`/{chainid} by get_contract_abi are read back as
+    well. Creation lookups are batched, CREATION_BATCH_SIZE addresses per call. The
+    latest block is only memoized in process, for `latest_block_max_age` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str = CONTRACT_METADATA_PATH,
+        abi_dir: str = "data/abi",
+        max_entries: int = 1024,
+        latest_block_max_age: float = LATEST_BLOCK_MAX_AGE,
+    ):
+        """
+        Args:
+            path: SQLite file of the persistent store, ":memory:" for none
+            abi_dir: Directory of per-chain ABI directories saved by get_contract_abi
+            max_entries: Size of the in-process LRU
+            latest_block_max_age: Seconds a fetched latest block is reused for
+        """
+        self.abi_dir = abi_dir
+        self.max_entries = max_entries
+        self.latest_block_max_age = latest_block_max_age
+        self._lru: OrderedDict = OrderedDict()
+        self._latest_blocks: Dict[int, Tuple[int, float]] = {}
+        self._lock = threading.RLock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS contract_metadata (
+                    chainid INTEGER NOT NULL,
+                    address TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    PRIMARY KEY (chainid, address, kind)
+                )
+                """
+            )
+
+    def _get(self, chainid: int, address: str, kind: str):
+        key = (int(chainid), address, kind)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+            row = self._conn.execute(
+                "SELECT value FROM contract_metadata "
+                "WHERE chainid = ? AND address = ? AND kind = ?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        self._remember(key, value)
+        return value
+
+    def _put(self, chainid: int, address: str, kind: str, value):
+        key = (int(chainid), address, kind)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO contract_metadata "
+                "(chainid, address, kind, value, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (*key, json.dumps(value), time.time()),
+            )
+        self._remember(key, value)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def creation_txns(self, chainid: int, addresses: Iterable[str]) -> Dict[str, dict]:
+        """
+        Get the creation transactions of several contracts, fetching only unknown ones.
+
+        Args:
+            chainid: Blockchain chain ID
+            addresses: Contract addresses
+
+        Returns:
+            dict[str, dict]: Lowercase address to getcontractcreation result item
+                (contractAddress, contractCreator, txHash, blockNumber, ...)
+
+        Raises:
+            KeyError: If Etherscan returns no creation transaction for an address
+        """
+        addresses = list(dict.fromkeys(address.lower() for address in addresses))
+        found = {}
+        missing = []
+        for address in addresses:
+            txn = self._get(chainid, address, "creation")
+            if txn is None:
+                missing.append(address)
+            else:
+                found[address] = txn
+
+        for i in range(0, len(missing), CREATION_BATCH_SIZE):
+            batch = missing[i : i + CREATION_BATCH_SIZE]
+            result = get_contract_creation_txn(chainid, batch)
+            for txn in [result] if isinstance(result, dict) else result:
+                address = txn["contractAddress"].lower()
+                self._put(chainid, address, "creation", txn)
+                found[address] = txn
+
+        not_found = [address for address in addresses if address not in found]
+        if not_found:
+            raise KeyError(
+                f"No creation transaction on chain {chainid} for {', '.join(not_found)}"
+            )
+        return found
+
+    def creation_txn(self, chainid: int, address: str) -> dict:
+        """Get the creation transaction of a contract (see creation_txns)."""
+        return self.creation_txns(chainid, [address])[address.lower()]
+
+    def creation_block(self, chainid: int, address: str) -> int:
+        """Get the block a contract was created in."""
+        return int(self.creation_txn(chainid, address)["blockNumber"])
+
+    def creation_blocks(self, chainid: int, addresses: Iterable[str]) -> Dict[str, int]:
+        """Get the creation blocks of several contracts, with batched lookups."""
+        return {
+            address: int(txn["blockNumber"])
+            for address, txn in self.creation_txns(chainid, addresses).items()
+        }
+
+    def abi(self, chainid: int, address: str) -> List[dict]:
+        """
+        Get the ABI of a verified contract: from memory, the store, a file saved in
+        `abi_dir`/{chainid}, or Etherscan (which saves it there), in that order.
+
+        Files are kept per chain because the same address often holds a different
+        contract on another chain.
+        """
+        address = address.lower()
+        abi = self._get(chainid, address, "abi")
+        if abi is not None:
+            return abi
+
+        chain_dir = os.path.join(self.abi_dir, str(int(chainid)))
+        path = os.path.join(chain_dir, f"{address}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                abi = json.load(f)
+            logger.info(f"ABI read from {path}")
+        else:
+            abi = get_contract_abi(chainid, address, save=True, save_dir=chain_dir)
+        self._put(chainid, address, "abi", abi)
+        return abi
+
+    def latest_block(self, chainid: int, max_age: Optional[float] = None) -> int:
+        """
+        Get the latest block of a chain, reusing a lookup younger than `max_age`
+        seconds (defaults to latest_block_max_age).
+        """
+        max_age = self.latest_block_max_age if max_age is None else max_age
+        now = time.monotonic()
+        with self._lock:
+            cached = self._latest_blocks.get(int(chainid))
+        if cached is not None and now - cached[1] < max_age:
+            return cached[0]
+
+        block = get_latest_block(chainid=chainid)
+        with self._lock:
+            self._latest_blocks[int(chainid)] = (block, now)
+        return block
+
+
+_resolver: Optional[ContractMetadataResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_contract_resolver() -> ContractMetadataResolver:
+    """Get the process-wide ContractMetadataResolver."""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = ContractMetadataResolver()
+        return _resolver
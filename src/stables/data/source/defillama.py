@@ -2,14 +2,19 @@ import dlt
 from dlt.sources.rest_api import rest_api_source
 from dlt.sources.helpers.rest_client import paginators
 from dlt.common.typing import TDataItems
-from typing import Iterable
+from typing import Iterable, List, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import json
 import logging
+from stables.utils.arrow import batched, require_pyarrow, rows_to_arrow
+from stables.utils.http_cache import CachedSession
+from stables.utils.state import resource_state
 
 logger = logging.getLogger(__name__)
 
 DEFILLAMA_STABLECOINS_API_URL = "https://stablecoins.llama.fi"
 DEFILLAMA_YIELDS_API_URL = "https://yields.llama.fi"
+ARROW_BATCH_SIZE = 10_000
 YIELDS_POOLS_COLUMNS = {
     "reward_tokens": {"data_type": "text", "nullable": True},
     "underlying_tokens": {"data_type": "text", "nullable": True},
@@ -28,8 +33,8 @@ STABLECOIN_CHAIN_BALANCES_COLUMNS = {
 }
 
 STABLECOIN_CHAIN_TOKENS_COLUMNS = {
-    "circulating": {"data_type": "float"},
-    "bridged_to": {"data_type": "float"},
+    "circulating": {"data_type": "double"},
+    "bridged_to": {"data_type": "double"},
 }
 
 
@@ -45,12 +50,14 @@ def _create_defillama_source(
 ) -> dlt.sources.DltResource:
     """
     Creates a dlt rest_api_source for a given set of API parameters.
+    Responses are cached on disk for DEFILLAMA_TTL (see stables.utils.http_cache).
     """
     source = rest_api_source(
         {
             "client": {
                 "base_url": base_url,
                 "paginator": paginators.SinglePagePaginator(),
+                "session": CachedSession(max_retries=5),
             },
             "resources": [
                 {
@@ -67,28 +74,85 @@ def _create_defillama_source(
 
 
 @dlt.resource(columns=YIELDS_POOLS_COLUMNS)  # type: ignore[arg-type]
-def defillama_yield_pools() -> Iterable[TDataItems]:
-    """Get the latest data for all yield pools."""
+def defillama_yield_pools(
+    arrow: bool = False, batch_size: int = ARROW_BATCH_SIZE
+) -> Iterable[TDataItems]:
+    """
+    Get the latest data for all yield pools.
+
+    With arrow=True, pools are yielded as pyarrow Tables of batch_size rows.
+    """
     resource = _create_defillama_source(
         DEFILLAMA_YIELDS_API_URL, "pools", data_selector="data"
     )
+    pools = (_normalize_yield_pool(pool) for pool in resource)
+    if not arrow:
+        yield from pools
+        return
+
+    schema = _yield_pools_arrow_schema()
+    for batch in batched(pools, batch_size):
+        yield rows_to_arrow(batch, schema)
+
+
+def _yield_pools_arrow_schema():
+    """Arrow schema of the /pools fields, so null metrics keep their type."""
+    pa = require_pyarrow()
+    text = ["chain", "project", "symbol", "pool", "exposure", "ilRisk", "poolMeta"]
+    double = [
+        "tvlUsd",
+        "apyBase",
+        "apyReward",
+        "apy",
+        "apyPct1D",
+        "apyPct7D",
+        "apyPct30D",
+        "mu",
+        "sigma",
+        "il7d",
+        "apyBase7d",
+        "apyMean30d",
+        "volumeUsd1d",
+        "volumeUsd7d",
+        "apyBaseInception",
+    ]
+    predictions = pa.struct(
+        [
+            ("predictedClass", pa.string()),
+            ("predictedProbability", pa.float64()),
+            ("binnedConfidence", pa.int64()),
+        ]
+    )
+    return pa.schema(
+        [(name, pa.string()) for name in text]
+        + [(name, pa.float64()) for name in double]
+        + [
+            ("stablecoin", pa.bool_()),
+            ("outlier", pa.bool_()),
+            ("count", pa.int64()),
+            ("predictions", predictions),
+            ("reward_tokens", pa.string()),
+            ("underlying_tokens", pa.string()),
+        ]
+    )
 
-    # Process each pool to ensure reward_tokens and underlying_tokens are always present
-    for pool in resource:
-        # Extract the original fields
-        reward_tokens = pool.get("rewardTokens", []) or []
-        underlying_tokens = pool.get("underlyingTokens", []) or []
 
-        # Remove the original camelCase fields to prevent DLT from creating separate tables
-        if "rewardTokens" in pool:
-            del pool["rewardTokens"]
-        if "underlyingTokens" in pool:
-            del pool["underlyingTokens"]
+def _normalize_yield_pool(pool: dict) -> dict:
+    """Ensure reward_tokens and underlying_tokens are always present, as JSON strings."""
+    # Extract the original fields
+    reward_tokens = pool.get("rewardTokens", []) or []
+    underlying_tokens = pool.get("underlyingTokens", []) or []
 
-        pool["reward_tokens"] = json.dumps(reward_tokens)
-        pool["underlying_tokens"] = json.dumps(underlying_tokens)
+    # Remove the original camelCase fields to prevent DLT from creating separate tables
+    if "rewardTokens" in pool:
+        del pool["rewardTokens"]
+    if "underlyingTokens" in pool:
+        del pool["underlyingTokens"]
 
-        yield pool
+    pool["reward_tokens"] = json.dumps(reward_tokens)
+    pool["underlying_tokens"] = json.dumps(underlying_tokens)
+
+    return pool
 
 
 @dlt.resource(columns=YIELDS_POOL_COLUMNS)  # type: ignore[arg-type]
@@ -100,87 +164,136 @@ def defillama_yield_pool(pool_id: str) -> dlt.sources.DltResource:
     return resource
 
 
-@dlt.resource()
-def defillama_stables_base() -> Iterable[TDataItems]:
-    """
-    Fetches stablecoin data from DefiLlama and yields data for the 'stables' table.
-    """
-    raw_data_resource = _create_defillama_source(
-        DEFILLAMA_STABLECOINS_API_URL, "stablecoins", data_selector="peggedAssets"
-    )
+def _stable_base_row(item: dict) -> dict | None:
+    """Build a 'stables' table row from a /stablecoins pegged asset."""
+    peg_type = item.get("pegType")
+    if not peg_type:
+        return None
+
+    circulating_keys = [
+        "circulating",
+        "circulatingPrevDay",
+        "circulatingPrevWeek",
+        "circulatingPrevMonth",
+    ]
+
+    circulating_data = {
+        c: _get_circulating_value(item.get(c), peg_type) for c in circulating_keys
+    }
+
+    return {
+        "id": int(item["id"]),
+        "name": item["name"],
+        "symbol": item["symbol"],
+        "gecko_id": item["gecko_id"] or None,
+        "peg_type": peg_type,
+        "peg_mechanism": item.get("pegMechanism"),
+        **circulating_data,
+    }
+
+
+def _chain_circulating_rows(item: dict) -> Iterable[dict]:
+    """Build the 'chain_circulating' table rows from a /stablecoins pegged asset."""
+    if not item.get("gecko_id"):
+        return
 
-    for item in raw_data_resource:
+    peg_type = item.get("pegType")
+    if not peg_type:
+        return
 
-        peg_type = item.get("pegType")
-        if not peg_type:
-            continue
+    chain_circulating = item.get("chainCirculating", {})
+    if not chain_circulating:
+        return
 
-        circulating_keys = [
-            "circulating",
-            "circulatingPrevDay",
-            "circulatingPrevWeek",
-            "circulatingPrevMonth",
-        ]
+    circulating_keys_map = {
+        "current": "circulating",
+        "circulatingPrevDay": "circulating_prev_day",
+        "circulatingPrevWeek": "circulating_prev_week",
+        "circulatingPrevMonth": "circulating_prev_month",
+    }
+
+    for chain, chain_data in chain_circulating.items():
+        if not chain_data:
+            continue
 
         circulating_data = {
-            c: _get_circulating_value(item.get(c), peg_type) for c in circulating_keys
+            target_key: _get_circulating_value(chain_data.get(source_key), peg_type)
+            for source_key, target_key in circulating_keys_map.items()
         }
 
-        stable = {
+        yield {
             "id": int(item["id"]),
-            "name": item["name"],
-            "symbol": item["symbol"],
-            "gecko_id": item["gecko_id"] or None,
-            "peg_type": peg_type,
-            "peg_mechanism": item.get("pegMechanism"),
+            "chain": chain,
             **circulating_data,
         }
-        yield stable
+
+
+def _pegged_assets() -> dlt.sources.DltResource:
+    """Resource over the pegged assets of the /stablecoins endpoint."""
+    return _create_defillama_source(
+        DEFILLAMA_STABLECOINS_API_URL, "stablecoins", data_selector="peggedAssets"
+    )
+
+
+@dlt.resource()
+def defillama_stables_base() -> Iterable[TDataItems]:
+    """
+    Fetches stablecoin data from DefiLlama and yields data for the 'stables' table.
+
+    Use defillama_stablecoins() to load it together with the chain circulating table
+    from a single /stablecoins request.
+    """
+    for item in _pegged_assets():
+        stable = _stable_base_row(item)
+        if stable:
+            yield stable
 
 
 @dlt.resource()
 def defillama_stables_chain_circulating() -> Iterable[TDataItems]:
     """
     Fetches stablecoin data from DefiLlama and yields data for the 'chain_circulating' table.
+
+    Use defillama_stablecoins() to load it together with the stables table from a
+    single /stablecoins request.
     """
-    raw_data_resource = _create_defillama_source(
-        DEFILLAMA_STABLECOINS_API_URL, "stablecoins", data_selector="peggedAssets"
-    )
+    for item in _pegged_assets():
+        yield from _chain_circulating_rows(item)
 
-    for item in raw_data_resource:
-        if not item.get("gecko_id"):
-            continue
 
-        peg_type = item.get("pegType")
-        if not peg_type:
-            continue
+def _as_items(data) -> list:
+    """Transformers receive whole pages from rest_api resources, or single items."""
+    return data if isinstance(data, list) else [data]
 
-        chain_circulating = item.get("chainCirculating", {})
-        if not chain_circulating:
-            continue
 
-        for chain, chain_data in chain_circulating.items():
-            if not chain_data:
-                continue
+@dlt.transformer(name="defillama_stables_base")
+def _stables_base_transformer(pegged_assets) -> Iterable[TDataItems]:
+    for item in _as_items(pegged_assets):
+        stable = _stable_base_row(item)
+        if stable:
+            yield stable
+
 
-            circulating_keys_map = {
-                "current": "circulating",
-                "circulatingPrevDay": "circulating_prev_day",
-                "circulatingPrevWeek": "circulating_prev_week",
-                "circulatingPrevMonth": "circulating_prev_month",
-            }
+@dlt.transformer(name="defillama_stables_chain_circulating")
+def _chain_circulating_transformer(pegged_assets) -> Iterable[TDataItems]:
+    for item in _as_items(pegged_assets):
+        yield from _chain_circulating_rows(item)
 
-            circulating_data = {
-                target_key: _get_circulating_value(chain_data.get(source_key), peg_type)
-                for source_key, target_key in circulating_keys_map.items()
-            }
 
-            chain_data_obj = {
-                "id": int(item["id"]),
-                "chain": chain,
-                **circulating_data,
-            }
-            yield chain_data_obj
+@dlt.source(name="defillama_stablecoins")
+def defillama_stablecoins():
+    """
+    Source loading the 'stables' and 'chain_circulating' tables from one /stablecoins request.
+
+    The pegged assets are fetched and parsed once per run and fanned out to both
+    tables, so they are built from the same snapshot. The resource names match the
+    standalone defillama_stables_base and defillama_stables_chain_circulating resources.
+    """
+    pegged_assets = _pegged_assets().with_name("defillama_pegged_assets")
+    return (
+        pegged_assets | _stables_base_transformer,
+        pegged_assets | _chain_circulating_transformer,
+    )
 
 
 @dlt.resource(columns=STABLECOIN_CHAIN_BALANCES_COLUMNS)  # type: ignore[arg-type]
@@ -195,9 +308,13 @@ def defillama_stablecoin_chain_balances(stablecoin_id: str) -> dlt.sources.DltRe
 
 
 @dlt.resource()
-def defillama_stablecoin_chain_tokens(stablecoin_id: str) -> Iterable[TDataItems]:
+def defillama_stablecoin_chain_tokens(
+    stablecoin_id: str, arrow: bool = False
+) -> Iterable[TDataItems]:
     """
     Fetches stablecoin chain token data from DefiLlama and yields normalized data.
+
+    With arrow=True, each chain's daily series is yielded as one pyarrow Table.
     """
     raw_data_resource = _create_defillama_source(
         DEFILLAMA_STABLECOINS_API_URL,
@@ -215,38 +332,173 @@ def defillama_stablecoin_chain_tokens(stablecoin_id: str) -> Iterable[TDataItems
     if not chain_balances:
         return
 
+    schema = _chain_tokens_arrow_schema() if arrow else None
     for chain_name, chain_data in chain_balances.items():
-        if not chain_data or not isinstance(chain_data, dict):
+        rows = list(
+            _chain_token_rows(int(stablecoin_id), chain_name, chain_data, peg_type)
+        )
+        if not rows:
+            continue
+        if arrow:
+            yield rows_to_arrow(rows, schema)
+        else:
+            yield from rows
+
+
+def _chain_token_rows(
+    stablecoin_id: int,
+    chain_name: str,
+    chain_data: dict,
+    peg_type: str,
+    since: int | None = None,
+) -> Iterable[dict]:
+    """Flatten the daily token entries of one chain into chain token rows, optionally from `since` on."""
+    if not chain_data or not isinstance(chain_data, dict):
+        return
+
+    tokens = chain_data.get("tokens", [])
+    if not tokens:
+        return
+
+    for token_data in tokens:
+        if not isinstance(token_data, dict):
             continue
 
-        tokens = chain_data.get("tokens", [])
-        if not tokens:
+        date = token_data.get("date")
+        if not date:
+            continue
+        if since is not None and int(date) < since:
             continue
 
-        for token_data in tokens:
-            if not isinstance(token_data, dict):
-                continue
-
-            date = token_data.get("date")
-            if not date:
-                continue
-
-            circulating_data = token_data.get("circulating", {})
-            bridged_to_data = token_data.get("bridgedTo", {})
-
-            # Extract peggedUSD values
-            circulating_value = _get_circulating_value(circulating_data, peg_type)
-            bridged_value = _get_circulating_value(bridged_to_data, peg_type)
-
-            # Extract bridge information
-            # bridges = bridged_to_data.get("bridges", {})
-
-            chain_token = {
-                "stablecoin_id": int(stablecoin_id),
-                "chain": chain_name,
-                "date": date,
-                "circulating": circulating_value,
-                "bridged_to": bridged_value,
-                # "bridges": bridges,
-            }
-            yield chain_token
+        circulating_data = token_data.get("circulating", {})
+        bridged_to_data = token_data.get("bridgedTo", {})
+
+        # Extract peggedUSD values
+        circulating_value = _get_circulating_value(circulating_data, peg_type)
+        bridged_value = _get_circulating_value(bridged_to_data, peg_type)
+
+        # Extract bridge information
+        # bridges = bridged_to_data.get("bridges", {})
+
+        chain_token = {
+            "stablecoin_id": stablecoin_id,
+            "chain": chain_name,
+            "date": date,
+            "circulating": circulating_value,
+            "bridged_to": bridged_value,
+            # "bridges": bridges,
+        }
+        yield chain_token
+
+
+def _chain_tokens_arrow_schema():
+    pa = require_pyarrow()
+    return pa.schema(
+        [
+            ("stablecoin_id", pa.int64()),
+            ("chain", pa.string()),
+            ("date", pa.int64()),
+            ("circulating", pa.float64()),
+            ("bridged_to", pa.float64()),
+        ]
+    )
+
+
+def _fetch_stablecoin(stablecoin_id: int) -> dict | None:
+    """Fetch the full /stablecoin/{id} payload (chain balances and peg type)."""
+    resource = _create_defillama_source(
+        DEFILLAMA_STABLECOINS_API_URL,
+        f"stablecoin/{stablecoin_id}",
+        data_selector="$",
+    )
+    return next(iter(resource), None)
+
+
+@dlt.resource(
+    columns=STABLECOIN_CHAIN_TOKENS_COLUMNS,  # type: ignore[arg-type]
+    primary_key=("stablecoin_id", "chain", "date"),
+    write_disposition="merge",
+)
+def defillama_stablecoins_chain_tokens(
+    stablecoin_ids: Union[str, List[int]] = "all",
+    max_concurrency: int = 8,
+    arrow: bool = False,
+) -> Iterable[TDataItems]:
+    """
+    Fetches chain token data for many stablecoins concurrently and yields normalized rows.
+
+    Up to max_concurrency /stablecoin/{id} requests are in flight at once, and the rows
+    of each response are streamed as soon as it arrives. The last loaded date of every
+    (stablecoin, chain) is kept in the dlt resource state, so later runs only emit that
+    date and newer ones. The last date is emitted again because DefiLlama's current-day
+    point is partial until the day closes; rows are merged on the primary key, so the
+    re-emitted point replaces the stored one. A stablecoin whose request fails is
+    logged and skipped; its chains resume from their stored dates on the next run.
+
+    Args:
+        stablecoin_ids: DefiLlama stablecoin IDs, or "all" for every pegged asset of /stablecoins
+        max_concurrency: Maximum number of concurrent requests
+        arrow: Yield each chain's daily series as a pyarrow Table instead of dicts
+    """
+    if stablecoin_ids == "all":
+        stablecoin_ids = [int(item["id"]) for item in _pegged_assets()]
+    stablecoin_ids = [int(stablecoin_id) for stablecoin_id in stablecoin_ids]
+    logger.info(
+        f"Fetching chain tokens for {len(stablecoin_ids)} stablecoins, "
+        f"{max_concurrency} at a time"
+    )
+
+    state = resource_state()
+    last_dates = state.setdefault("chain_last_dates", {})
+    schema = _chain_tokens_arrow_schema() if arrow else None
+
+    with ThreadPoolExecutor(
+        max_workers=max_concurrency, thread_name_prefix="defillama"
+    ) as executor:
+        pending_ids = iter(stablecoin_ids)
+        in_flight = {}
+
+        def submit_next():
+            stablecoin_id = next(pending_ids, None)
+            if stablecoin_id is not None:
+                future = executor.submit(_fetch_stablecoin, stablecoin_id)
+                in_flight[future] = stablecoin_id
+
+        for _ in range(max_concurrency):
+            submit_next()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stablecoin_id = in_flight.pop(future)
+                submit_next()
+
+                try:
+                    stablecoin = future.result()
+                except Exception as e:
+                    logger.warning(f"Skipping stablecoin {stablecoin_id}: {e}")
+                    continue
+                if not stablecoin:
+                    continue
+                peg_type = stablecoin.get("pegType") or "peggedUSD"
+
+                for chain_name, chain_data in (
+                    stablecoin.get("chainBalances") or {}
+                ).items():
+                    key = f"{stablecoin_id}:{chain_name}"
+                    rows = list(
+                        _chain_token_rows(
+                            stablecoin_id,
+                            chain_name,
+                            chain_data,
+                            peg_type,
+                            last_dates.get(key),
+                        )
+                    )
+                    if not rows:
+                        continue
+                    if arrow:
+                        yield rows_to_arrow(rows, schema)
+                    else:
+                        yield from rows
+                    last_dates[key] = max(int(row["date"]) for row in rows)
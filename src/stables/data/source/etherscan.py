@@ -1,6 +1,8 @@
 import os
+import threading
 import requests
 from datetime import datetime
+from typing import Optional
 import dlt
 from dlt.sources.helpers.rest_client import paginators
 from dlt.sources.rest_api import rest_api_source
@@ -8,64 +10,83 @@ from stables.config import (
     ETHERSCAN_API_BASE_URL,
     ETHERSCAN_API_KEY,
     ETHERSCAN_LOG_COLUMNS,
+    ETHERSCAN_LOG_HEX_FIELDS,
     ETHERSCAN_TRANSACTION_COLUMNS,
+    ETHERSCAN_TRANSACTION_INT_FIELDS,
+    ETHERSCAN_TRANSACTION_TEXT_FIELDS,
 )
+from stables.utils.arrow import batched, require_pyarrow, rows_to_arrow
+from stables.utils.http_cache import CachedSession, record_chain_head
+from stables.utils.rate_limit import get_rate_limiter
 import json
-import time
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 
-class RateLimitedSession(requests.Session):
-    """Simple rate-limited session for Etherscan API"""
+class RateLimitedSession(CachedSession):
+    """
+    Rate-limited, cached session for Etherscan API.
+
+    Sessions sharing a `rate_limit_key` draw from one process-wide token bucket,
+    so the per-key limit holds across sessions and worker threads. Responses served
+    from the HTTP cache (see stables.utils.http_cache) do not take a token.
+    """
 
-    def __init__(self, calls_per_second=5):
-        super().__init__()
+    def __init__(self, calls_per_second=5, rate_limit_key=None, cache=None):
+        super().__init__(cache=cache)
         self.calls_per_second = calls_per_second
-        self.last_request_time = 0
-        self.min_interval = 1.0 / calls_per_second
+        self.rate_limiter = get_rate_limiter(
+            rate_limit_key or f"etherscan:{ETHERSCAN_API_KEY}", calls_per_second
+        )
         self.request_count = 0
 
-    def request(self, method, url, **kwargs):
-        # Rate limiting
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_interval:
-            sleep_time = self.min_interval - time_since_last
-            logger.debug(f"Rate limiting: sleeping for {sleep_time:.3f}s")
-            time.sleep(sleep_time)
+    def _send(self, request, **kwargs):
+        # Rate limiting at the send level: dlt's RESTClient calls `send` directly,
+        # bypassing `request`
+        waited = self.rate_limiter.acquire()
+        if waited:
+            logger.debug(f"Rate limiting: slept for {waited:.3f}s")
 
-        self.last_request_time = time.time()
-        self.request_count += 1
+        # Worker threads share the session
+        with self.rate_limiter.lock:
+            self.request_count += 1
+            call_number = self.request_count
 
-        # Log API call
-        logger.info(f"API Call #{self.request_count}: {method} {url}")
+        # Log API call, without the query string that carries the API key
+        url = request.url.split("?", 1)[0]
+        logger.info(f"API Call #{call_number}: {request.method} {url}")
 
-        response = super().request(method, url, **kwargs)
+        response = super()._send(request, **kwargs)
 
         # Log response status
         logger.info(
-            f"Response #{self.request_count}: {response.status_code} - {response.reason}"
+            f"Response #{call_number}: {response.status_code} - {response.reason}"
         )
 
         return response
 
 
-def _create_etherscan_source(params: dict):
+def _create_etherscan_source(params: dict, paginate: bool = True):
     """
     Creates a dlt rest_api_source for a given set of Etherscan API parameters.
     It includes a rate-limited session for the client.
+
+    With paginate=False, only the page set in `params` is requested.
     """
     session = RateLimitedSession(calls_per_second=5)
+    if paginate:
+        paginator = paginators.PageNumberPaginator(
+            base_page=1, total_path=None, page_param="page"
+        )
+    else:
+        paginator = paginators.SinglePagePaginator()
     return rest_api_source(
         {
             "client": {
                 "base_url": ETHERSCAN_API_BASE_URL,
-                "paginator": paginators.PageNumberPaginator(
-                    base_page=1, total_path=None, page_param="page"
-                ),
+                "paginator": paginator,
                 "session": session,
             },
             "resources": [
@@ -88,8 +109,14 @@ def etherscan_transactions(
     endblock="latest",
     offset=1000,
     sort="asc",
+    arrow=False,
 ):
-    """dlt resource to get transactions for a given address."""
+    """
+    dlt resource to get transactions for a given address.
+
+    With arrow=True, each page is yielded as a pyarrow Table with typed integer and
+    timestamp columns, so dlt skips per-row normalization.
+    """
     params = {
         "chainid": chainid,
         "module": module,
@@ -102,7 +129,33 @@ def etherscan_transactions(
         "apikey": ETHERSCAN_API_KEY,
     }
     logger.info(f"Fetching transactions for address {address} from block {startblock}")
-    return _create_etherscan_source(params)
+    source = _create_etherscan_source(params)
+    if not arrow:
+        yield from source
+        return
+
+    schema = _transaction_arrow_schema()
+    for batch in batched(source, offset):
+        for field in ETHERSCAN_TRANSACTION_INT_FIELDS:
+            values = [_hex_to_int(item.get(field)) for item in batch]
+            for item, value in zip(batch, values):
+                item[field] = value
+        yield rows_to_arrow(batch, schema)
+
+
+def _transaction_arrow_schema():
+    """Arrow schema of txlist columns, with timeStamp as a UTC timestamp."""
+    pa = require_pyarrow()
+    return pa.schema(
+        [
+            (
+                field,
+                pa.timestamp("s", tz="UTC") if field == "timeStamp" else pa.int64(),
+            )
+            for field in ETHERSCAN_TRANSACTION_INT_FIELDS
+        ]
+        + [(field, pa.string()) for field in ETHERSCAN_TRANSACTION_TEXT_FIELDS]
+    )
 
 
 @dlt.resource(columns=ETHERSCAN_LOG_COLUMNS)
@@ -114,8 +167,20 @@ def etherscan_logs(
     fromBlock=0,
     toBlock="latest",
     offset=1000,
+    arrow=False,
+    page=None,
 ):
-    """dlt resource to get event logs for a given address."""
+    """
+    dlt resource to get event logs for a given address.
+
+    Logs are yielded in decoded batches (see decode_log_batch): topics split into
+    topic0..topic3 and numeric fields as integers, so no JSON or hex parsing is left
+    for the destination or downstream models. With arrow=True, each batch is yielded
+    as a pyarrow Table instead of a list of dicts.
+
+    All pages of the block range are fetched, unless `page` is given: then only that
+    page of `offset` logs is requested, in a single HTTP call.
+    """
     params = {
         "chainid": chainid,
         "module": module,
@@ -126,19 +191,86 @@ def etherscan_logs(
         "offset": offset,
         "apikey": ETHERSCAN_API_KEY,
     }
+    if page is not None:
+        params["page"] = page
     logger.info(
         f"Fetching logs for address {address} from block {fromBlock} to {toBlock}"
     )
-    
-    source = _create_etherscan_source(params)
-    for item in source:
+
+    source = _create_etherscan_source(params, paginate=page is None)
+    schema = _log_arrow_schema() if arrow else None
+    for batch in batched(source, offset):
+        batch = decode_log_batch(batch, chainid)
+        yield rows_to_arrow(batch, schema) if arrow else batch
+
+
+def _log_arrow_schema():
+    """Arrow schema of decoded log columns, so all-null topics keep a string type."""
+    pa = require_pyarrow()
+    return pa.schema(
+        [("address", pa.string())]
+        + [(f"topic{i}", pa.string()) for i in range(4)]
+        + [("data", pa.string()), ("blockHash", pa.string())]
+        + [(field, pa.int64()) for field in ETHERSCAN_LOG_HEX_FIELDS]
+        + [("transactionHash", pa.string()), ("chainid", pa.int64())]
+    )
+
+
+def _hex_to_int(value):
+    """Parse an Etherscan numeric field: hex ("0x1a", with "0x" meaning 0) or decimal."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value
+    if value[:2] in ("0x", "0X"):
+        return int(value[2:] or "0", 16)
+    return int(value)
+
+
+def decode_log_batch(items: list, chainid: int) -> list:
+    """
+    Decode a batch of raw getLogs items in place, one column at a time.
+
+    - the `topics` array is split into topic0..topic3 columns (None when absent)
+    - hex-encoded numeric fields (ETHERSCAN_LOG_HEX_FIELDS) are parsed into integers
+    - `chainid` is added to every item
+
+    Args:
+        items: Raw log items as returned by the Etherscan getLogs endpoint
+        chainid: Chain ID the logs were fetched from
+
+    Returns:
+        list: The same items, decoded
+    """
+    for field in ETHERSCAN_LOG_HEX_FIELDS:
+        values = [_hex_to_int(item.get(field)) for item in items]
+        for item, value in zip(items, values):
+            item[field] = value
+
+    topics = [item.pop("topics", None) or [] for item in items]
+    for i in range(4):
+        values = [t[i] if len(t) > i else None for t in topics]
+        for item, value in zip(items, values):
+            item[f"topic{i}"] = value
+
+    for item in items:
         item["chainid"] = chainid
-        yield item
+    return items
 
 
 # --- Refactored V2 API Calls ---
 
-_v2_session = RateLimitedSession(calls_per_second=5)
+_v2_session: Optional[RateLimitedSession] = None
+_v2_session_lock = threading.Lock()
+
+
+def _get_v2_session() -> RateLimitedSession:
+    """Get the shared session of the v2 calls, created (with its HTTP cache) on first use."""
+    global _v2_session
+    with _v2_session_lock:
+        if _v2_session is None:
+            _v2_session = RateLimitedSession(calls_per_second=5)
+        return _v2_session
 
 
 def _etherscan_v2_call(params: dict):
@@ -149,7 +281,7 @@ def _etherscan_v2_call(params: dict):
     base_url = "https://api.etherscan.io/v2/api"
     params["apikey"] = ETHERSCAN_API_KEY
 
-    response = _v2_session.get(base_url, params=params)
+    response = _get_v2_session().get(base_url, params=params)
     response.raise_for_status()
     data = response.json()
 
@@ -166,7 +298,8 @@ def _etherscan_v2_call(params: dict):
 
 def get_latest_block(chainid, timestamp: int = None, closest="before"):
     """Gets the latest block number, or the block number closest to a timestamp."""
-    if timestamp is None:
+    is_latest = timestamp is None
+    if is_latest:
         timestamp = int(datetime.now().timestamp())
 
     logger.info(f"Getting latest block for chain {chainid}")
@@ -181,6 +314,9 @@ def get_latest_block(chainid, timestamp: int = None, closest="before"):
     result = _etherscan_v2_call(params)
 
     latest_block = int(result)
+    if is_latest:
+        # Lets the HTTP cache keep block windows far enough behind the head forever
+        record_chain_head(chainid, latest_block)
     logger.info(f"Latest block: {latest_block}")
     return latest_block
 
@@ -0,0 +1,65 @@
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+def require_pyarrow():
+    """Import pyarrow, which is only needed for the Arrow output modes."""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Arrow output requires pyarrow, install it with `uv add pyarrow` "
+            "(or `pip install pyarrow`)"
+        ) from e
+    return pyarrow
+
+
+def has_pyarrow() -> bool:
+    """Whether pyarrow is installed, for readers that fall back to plain pandas without it."""
+    try:
+        require_pyarrow()
+    except ImportError:
+        return False
+    return True
+
+
+def rows_to_arrow(rows: List[Dict[str, Any]], schema=None):
+    """
+    Build a pyarrow Table from a list of row dicts, column by column.
+
+    Every batch of a resource should be built with the same schema: a type inferred
+    per batch changes with the values (a nullable column that is null in every row of
+    one batch comes out as the null type), and dlt then gets tables that do not match.
+
+    Args:
+        rows: Row dicts, keys may differ between rows (missing values become null)
+        schema: pyarrow Schema of the known columns, which come first, in schema order,
+            even when no row has them. Keys outside the schema are appended with
+            inferred types.
+
+    Returns:
+        pyarrow.Table: Table with the schema's columns, then any other keys in
+            first-seen order
+    """
+    pa = require_pyarrow()
+    columns = {field.name: field.type for field in schema} if schema else {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key, None)
+
+    arrays = {}
+    for name, type_ in columns.items():
+        values = [row.get(name) for row in rows]
+        arrays[name] = pa.array(values, type=type_)
+    return pa.table(arrays)
+
+
+def batched(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of at most batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,434 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.hooks import dispatch_hook
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from stables.config import (
+    HTTP_CACHE_ENABLED,
+    HTTP_CACHE_MAX_AGE,
+    HTTP_CACHE_MAX_BYTES,
+    HTTP_CACHE_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+# TTL values returned by a cache policy
+NO_CACHE = 0.0
+FOREVER = float("inf")
+
+DEFILLAMA_TTL = 3600
+COINGECKO_TTL = 600
+
+# Blocks behind the chain head after which Etherscan results are treated as final
+FINALITY_CONFIRMATIONS = 64
+# Timestamps older than this resolve to final blocks and settled price data
+FINALITY_SECONDS = 86400
+
+# Query parameters that carry credentials and must not be part of the cache key
+SECRET_PARAMS = ("apikey", "x_cg_demo_api_key", "x_cg_pro_api_key")
+
+# Response headers that describe the wire encoding, not the cached (decoded) body
+_HOP_HEADERS = ("content-encoding", "transfer-encoding", "content-length")
+
+
+class HTTPCache:
+    """
+    SQLite store of HTTP responses, keyed by a digest of the request.
+
+    Entries keep the response status, headers and body, the ETag/Last-Modified
+    validators, and an expiry time (NULL for entries that never expire). A single
+    connection is shared between threads behind a lock; WAL mode lets several
+    processes use the same file.
+    """
+
+    def __init__(self, path: str = HTTP_CACHE_PATH):
+        """
+        Args:
+            path: SQLite file, created with its parent directory if missing
+        """
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL
+                )
+                """
+            )
+
+    def get(self, key: str) -> Optional[dict]:
+        """Get a cache entry, expired or not, as a dict of its columns."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, etag, last_modified, expires_at "
+                "FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        url, status, headers, body, etag, last_modified, expires_at = row
+        return {
+            "url": url,
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expires_at": expires_at,
+        }
+
+    def put(
+        self,
+        key: str,
+        url: str,
+        status: int,
+        headers: Dict[str, str],
+        body: bytes,
+        ttl: float,
+    ):
+        """Store a response for `ttl` seconds (FOREVER for no expiry)."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, status, headers, body, etag, last_modified, stored_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    url,
+                    status,
+                    json.dumps(headers),
+                    body,
+                    headers.get("etag"),
+                    headers.get("last-modified"),
+                    now,
+                    _expires_at(now, ttl),
+                ),
+            )
+
+    def refresh(self, key: str, ttl: float):
+        """Extend an entry after the server confirmed it is still valid (304)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ? WHERE key = ?",
+                (_expires_at(time.time(), ttl), key),
+            )
+
+    def prune(
+        self, max_age: Optional[float] = None, max_bytes: Optional[int] = None
+    ) -> int:
+        """
+        Delete expired entries that cannot be revalidated (no ETag or Last-Modified),
+        then apply the age and size caps.
+
+        Args:
+            max_age: Also delete entries stored more than `max_age` seconds ago, including
+                those that never expire
+            max_bytes: Then delete the oldest entries until the response bodies take at
+                most `max_bytes`
+
+        Returns:
+            int: Number of deleted entries
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM responses WHERE expires_at < ? "
+                "AND etag IS NULL AND last_modified IS NULL",
+                (now,),
+            ).rowcount
+            if max_age is not None:
+                deleted += self._conn.execute(
+                    "DELETE FROM responses WHERE stored_at < ?", (now - max_age,)
+                ).rowcount
+            if max_bytes is not None:
+                # Keep the newest entries whose running size stays within the cap
+                deleted += self._conn.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(length(body)) OVER (
+                                ORDER BY stored_at DESC, key
+                            ) AS total
+                            FROM responses
+                        ) WHERE total > ?
+                    )
+                    """,
+                    (max_bytes,),
+                ).rowcount
+        if deleted:
+            logger.info(f"Pruned {deleted} entries from the HTTP cache {self.path}")
+        return deleted
+
+    def clear(self):
+        """Delete all entries."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+
+def _expires_at(now: float, ttl: float) -> Optional[float]:
+    return None if ttl == FOREVER else now + ttl
+
+
+_caches: Dict[str, HTTPCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_http_cache(path: str = HTTP_CACHE_PATH) -> Optional[HTTPCache]:
+    """
+    Get the process-wide cache for a file, or None if caching is disabled.
+
+    Caching is on by default and turned off with STABLES_HTTP_CACHE=0. The cache is
+    pruned to HTTP_CACHE_MAX_AGE and HTTP_CACHE_MAX_BYTES when it is first opened, so
+    the file does not grow without bound across runs; SQLite reuses the freed pages.
+    """
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = HTTPCache(path)
+            cache.prune(max_age=HTTP_CACHE_MAX_AGE, max_bytes=HTTP_CACHE_MAX_BYTES)
+            _caches[path] = cache
+        return cache
+
+
+def cache_key(request: requests.PreparedRequest) -> str:
+    """
+    Content address of a request: method, URL and sorted query parameters (minus
+    credentials), and the request body.
+    """
+    parts = urlsplit(request.url)
+    params = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in SECRET_PARAMS
+    )
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    digest = hashlib.sha256()
+    digest.update(
+        f"{request.method} {parts.scheme}://{parts.netloc}{parts.path}?{urlencode(params)}\n".encode()
+    )
+    digest.update(body)
+    return digest.hexdigest()
+
+
+_chain_heads: Dict[int, int] = {}
+_chain_heads_lock = threading.Lock()
+
+
+def record_chain_head(chainid: int, block_number: int):
+    """
+    Record the latest block seen for a chain, so block windows far enough behind it
+    can be cached without expiry.
+    """
+    with _chain_heads_lock:
+        _chain_heads[int(chainid)] = max(
+            block_number, _chain_heads.get(int(chainid), block_number)
+        )
+
+
+def _is_final_block(chainid, block) -> bool:
+    try:
+        chainid, block = int(chainid), int(block)
+    except (TypeError, ValueError):
+        return False  # "latest" and the like
+    with _chain_heads_lock:
+        head = _chain_heads.get(chainid)
+    return head is not None and block <= head - FINALITY_CONFIRMATIONS
+
+
+def _is_past_timestamp(timestamp, now: float) -> bool:
+    try:
+        return float(timestamp) <= now - FINALITY_SECONDS
+    except (TypeError, ValueError):
+        return False
+
+
+def _etherscan_ttl(params: Dict[str, str], now: float) -> float:
+    action = params.get("action")
+    chainid = params.get("chainid", 1)
+    if action in ("getabi", "getsourcecode", "getcontractcreation"):
+        return FOREVER
+    if action == "getLogs":
+        return FOREVER if _is_final_block(chainid, params.get("toBlock")) else NO_CACHE
+    if action in ("txlist", "txlistinternal", "tokentx"):
+        return FOREVER if _is_final_block(chainid, params.get("endblock")) else NO_CACHE
+    if action == "getblocknobytime":
+        return FOREVER if _is_past_timestamp(params.get("timestamp"), now) else NO_CACHE
+    return NO_CACHE
+
+
+def _coingecko_ttl(path: str, params: Dict[str, str], now: float) -> float:
+    if path.endswith("/range") and _is_past_timestamp(params.get("to"), now):
+        return FOREVER
+    return COINGECKO_TTL
+
+
+def default_ttl(request: requests.PreparedRequest) -> float:
+    """
+    Cache policy of the API sources: how long a response to `request` stays fresh.
+
+    - Etherscan: contract metadata and block windows at least FINALITY_CONFIRMATIONS
+      behind the recorded chain head never expire; anything ending at "latest" or
+      near the head is not cached
+    - DefiLlama: DEFILLAMA_TTL
+    - CoinGecko: settled `range` queries never expire, others last COINGECKO_TTL
+
+    Returns:
+        float: TTL in seconds, NO_CACHE or FOREVER
+    """
+    if request.method != "GET":
+        return NO_CACHE
+    parts = urlsplit(request.url)
+    params = dict(parse_qsl(parts.query))
+    host = parts.hostname or ""
+    now = time.time()
+    if host.endswith("etherscan.io"):
+        return _etherscan_ttl(params, now)
+    if host.endswith("llama.fi"):
+        return DEFILLAMA_TTL
+    if host.endswith("coingecko.com"):
+        return _coingecko_ttl(parts.path, params, now)
+    return NO_CACHE
+
+
+def is_cacheable_response(response: requests.Response) -> bool:
+    """
+    Only successful responses are cached. Etherscan reports errors (rate limits,
+    invalid parameters) with HTTP 200 and status "0"; of those only empty results
+    ("No records found") are kept.
+    """
+    if response.status_code != 200:
+        return False
+    if (urlsplit(response.url).hostname or "").endswith("etherscan.io"):
+        try:
+            data = response.json()
+        except ValueError:
+            return False
+        if isinstance(data, dict) and data.get("status") == "0":
+            return isinstance(data.get("result"), list)
+    return True
+
+
+class CachedSession(requests.Session):
+    """
+    requests Session that serves GET responses from an on-disk HTTPCache.
+
+    Fresh entries are returned without touching the network. Expired entries with an
+    ETag or Last-Modified are revalidated with a conditional request, and a 304 reply
+    refreshes the entry. Caching hooks `send`, which both `Session.request` and dlt's
+    RESTClient go through; subclasses put their network-side logic in `_send`, so
+    cache hits skip it.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[HTTPCache] = None,
+        ttl_policy=default_ttl,
+        timeout: float = 60,
+        max_retries: int = 0,
+    ):
+        """
+        Args:
+            cache: Cache to use. Defaults to the process-wide cache (see get_http_cache)
+            ttl_policy: Callable mapping a PreparedRequest to a TTL in seconds
+            timeout: Request timeout in seconds, when the caller does not pass one
+            max_retries: Retries on connection errors and 429/5xx replies, honouring
+                Retry-After
+        """
+        super().__init__()
+        self.cache = cache if cache is not None else get_http_cache()
+        self.ttl_policy = ttl_policy
+        self.timeout = timeout
+        self.cache_hits = 0
+        if max_retries:
+            adapter = HTTPAdapter(
+                max_retries=Retry(
+                    total=max_retries,
+                    backoff_factor=1,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=("GET",),
+                    raise_on_status=False,
+                )
+            )
+            self.mount("https://", adapter)
+            self.mount("http://", adapter)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        ttl = self.ttl_policy(request) if self.cache is not None else NO_CACHE
+        if ttl <= 0:
+            return self._send(request, **kwargs)
+
+        key = cache_key(request)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry["expires_at"] is None or entry["expires_at"] > time.time():
+                return self._cached_response(request, entry, **kwargs)
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._send(request, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.refresh(key, ttl)
+            logger.debug(f"Revalidated cached response for {entry['url']}")
+            return self._cached_response(request, entry, **kwargs)
+
+        if is_cacheable_response(response):
+            headers = {
+                k.lower(): v
+                for k, v in response.headers.items()
+                if k.lower() not in _HOP_HEADERS
+            }
+            self.cache.put(
+                key, response.url, response.status_code, headers, response.content, ttl
+            )
+        return response
+
+    def _send(self, request, **kwargs):
+        """Send a request over the network."""
+        return super().send(request, **kwargs)
+
+    def _cached_response(self, request, entry: dict, **kwargs) -> requests.Response:
+        self.cache_hits += 1
+        logger.debug(f"Cache hit for {entry['url']}")
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"]
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = entry["url"]
+        response.request = request
+        response.from_cache = True
+        return dispatch_hook("response", request.hooks, response, **kwargs)
@@ -0,0 +1,102 @@
+"""
+Keccak-256 as used by Ethereum (original Keccak padding, not NIST SHA3-256, so
+hashlib.sha3_256 gives different digests).
+
+Pure Python: it is only used for event and function signatures, a handful of short
+inputs per ABI, so no native dependency is needed.
+"""
+
+_ROUND_CONSTANTS = [
+    0x0000000000000001,
+    0x0000000000008082,
+    0x800000000000808A,
+    0x8000000080008000,
+    0x000000000000808B,
+    0x0000000080000001,
+    0x8000000080008081,
+    0x8000000000008009,
+    0x000000000000008A,
+    0x0000000000000088,
+    0x0000000080008009,
+    0x000000008000000A,
+    0x000000008000808B,
+    0x800000000000008B,
+    0x8000000000008089,
+    0x8000000000008003,
+    0x8000000000008002,
+    0x8000000000000080,
+    0x000000000000800A,
+    0x800000008000000A,
+    0x8000000080008081,
+    0x8000000000008080,
+    0x0000000080000001,
+    0x8000000080008008,
+]
+# Rotation offsets, indexed [x][y]
+_ROTATIONS = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+_MASK = (1 << 64) - 1
+_RATE = 136  # bytes, 1088 bits for a 256-bit digest
+
+
+def _rotl(value: int, shift: int) -> int:
+    return ((value << shift) | (value >> (64 - shift))) & _MASK if shift else value
+
+
+def _keccak_f(state):
+    for round_constant in _ROUND_CONSTANTS:
+        # theta
+        c = [
+            state[x][0] ^ state[x][1] ^ state[x][2] ^ state[x][3] ^ state[x][4]
+            for x in range(5)
+        ]
+        d = [c[(x - 1) % 5] ^ _rotl(c[(x + 1) % 5], 1) for x in range(5)]
+        for x in range(5):
+            for y in range(5):
+                state[x][y] ^= d[x]
+        # rho and pi
+        b = [[0] * 5 for _ in range(5)]
+        for x in range(5):
+            for y in range(5):
+                b[y][(2 * x + 3 * y) % 5] = _rotl(state[x][y], _ROTATIONS[x][y])
+        # chi
+        for x in range(5):
+            for y in range(5):
+                state[x][y] = b[x][y] ^ (~b[(x + 1) % 5][y] & b[(x + 2) % 5][y])
+        # iota
+        state[0][0] ^= round_constant
+
+
+def keccak256(data: bytes) -> bytes:
+    """Keccak-256 digest of `data`."""
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b"\x00" * (-len(padded) % _RATE))
+    padded[-1] |= 0x80
+
+    state = [[0] * 5 for _ in range(5)]
+    for offset in range(0, len(padded), _RATE):
+        block = padded[offset : offset + _RATE]
+        for i in range(_RATE // 8):
+            state[i % 5][i // 5] ^= int.from_bytes(block[8 * i : 8 * i + 8], "little")
+        _keccak_f(state)
+
+    return b"".join(state[i % 5][i // 5].to_bytes(8, "little") for i in range(4))
+
+
+def selector(signature: str) -> str:
+    """
+    0x-prefixed Keccak-256 hash of a canonical signature, e.g. the topic0 of an event.
+
+    Args:
+        signature: Canonical signature, e.g. "Transfer(address,address,uint256)"
+
+    Returns:
+        str: 66-character lowercase hex string
+    """
+    return "0x" + keccak256(signature.encode()).hex()
@@ -1,57 +1,195 @@
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Iterator, List, Sequence, Tuple
 
+import io
+import json
+import time
+import threading
+import uuid
 import psycopg2
 import pandas as pd
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, URL
 
-from stables.data.source import get_contract_creation_txn
+from stables.data.source import get_contract_resolver
 from stables.config import PostgresConfig
+from stables.utils.arrow import has_pyarrow, require_pyarrow
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+POOL_SIZE = 5
+POOL_MAX_OVERFLOW = 5
+POOL_IDLE_TIMEOUT = 300  # seconds a connection may sit idle in the pool before eviction
+POOL_RECYCLE = 1800  # seconds after which a connection is replaced regardless of use
+
+_engines: Dict[Tuple, Engine] = {}
+_idle_reapers: Dict[Tuple, threading.Event] = {}
+_engines_lock = threading.Lock()
+
+
+def _config_key(db_config: PostgresConfig) -> Tuple:
+    """Hashable key identifying a database by its connection parameters."""
+    return tuple(sorted(db_config.get_connection_params().items()))
+
+
+def _create_pooled_engine(db_config: PostgresConfig) -> Engine:
+    """
+    Create a SQLAlchemy engine backed by a QueuePool.
+
+    Connections are pinged on checkout (pool_pre_ping), replaced after POOL_RECYCLE
+    seconds, and evicted once they have been idle in the pool for longer than
+    POOL_IDLE_TIMEOUT seconds (see _track_idle_time). The pool hands out the most
+    recently returned connection first, so connections beyond the steady demand stay
+    idle and are evicted instead of being kept alive in rotation.
+    """
+    params = db_config.get_connection_params()
+    url = URL.create(
+        "postgresql+psycopg2",
+        username=params["user"],
+        password=params["password"],
+        host=params["host"],
+        port=params["port"],
+        database=params["database"],
+    )
+    engine = create_engine(
+        url,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=POOL_RECYCLE,
+        pool_use_lifo=True,
+    )
+    _track_idle_time(engine)
+    return engine
+
+
+def _track_idle_time(engine: Engine):
+    """
+    Record when each connection is returned to the pool of `engine`.
+
+    evict_idle_connections closes the connections idle for too long. As a backstop
+    between its sweeps, a connection checked out after idling too long is refused,
+    and the pool retries with a fresh one.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if (
+            checked_in_at is not None
+            and time.monotonic() - checked_in_at > POOL_IDLE_TIMEOUT
+        ):
+            # The pool invalidates the connection and retries with a fresh one
+            raise exc.DisconnectionError("Evicting idle pooled connection")
+
+
+def evict_idle_connections(engine: Engine) -> int:
+    """
+    Close the connections left idle in the pool for longer than POOL_IDLE_TIMEOUT.
+
+    The evicted connections keep their place in the pool and reconnect when they are
+    next checked out. The pool's queue is locked during the sweep, so a connection
+    cannot be handed out while it is being closed.
+
+    Returns:
+        int: Number of connections closed
+    """
+    now = time.monotonic()
+    queue = engine.pool._pool  # type: ignore[attr-defined]
+    evicted = 0
+    with queue.mutex:
+        for connection_record in queue.queue:
+            checked_in_at = connection_record.info.get("checked_in_at")
+            if (
+                connection_record.dbapi_connection is not None
+                and checked_in_at is not None
+                and now - checked_in_at > POOL_IDLE_TIMEOUT
+            ):
+                connection_record.invalidate()
+                evicted += 1
+    if evicted:
+        logger.debug(f"Closed {evicted} idle pooled connections")
+    return evicted
+
+
+def _start_idle_reaper(engine: Engine) -> threading.Event:
+    """Sweep the pool of `engine` for idle connections until the returned event is set."""
+    stop = threading.Event()
+
+    def reap():
+        while not stop.wait(POOL_IDLE_TIMEOUT / 2):
+            evict_idle_connections(engine)
+
+    threading.Thread(target=reap, name="pool-idle-reaper", daemon=True).start()
+    return stop
+
+
+def get_sqlalchemy_engine(db_config: PostgresConfig) -> Engine:
+    """
+    Get the pooled SQLAlchemy engine for a database.
+
+    Engines are created once per distinct set of connection parameters and shared
+    for the lifetime of the process, so repeated calls reuse pooled connections. A
+    background thread closes the connections left idle in each engine's pool.
+
+    Args:
+        db_config: PostgresConfig instance
+
+    Returns:
+        sqlalchemy.engine.Engine: SQLAlchemy engine
+    """
+    key = _config_key(db_config)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _create_pooled_engine(db_config)
+            _engines[key] = engine
+            _idle_reapers[key] = _start_idle_reaper(engine)
+        return engine
+
+
+def close_connection_pools():
+    """Close all pooled connections, e.g. before forking or at the end of a notebook session."""
+    with _engines_lock:
+        for stop in _idle_reapers.values():
+            stop.set()
+        for engine in _engines.values():
+            engine.dispose()
+        _idle_reapers.clear()
+        _engines.clear()
+
 
 @contextmanager
 def get_postgres_connection(db_config: PostgresConfig):
     """
-    Context manager for PostgreSQL database connections.
+    Context manager for pooled PostgreSQL database connections.
+
+    The connection is borrowed from the pool of get_sqlalchemy_engine and returned
+    (with any uncommitted transaction rolled back) when the context exits.
 
     Args:
         db_config: PostgresConfig instance.
 
     Yields:
-        psycopg2.connection: Database connection
+        psycopg2.connection: Database connection (proxied by the pool)
 
     Example:
-        with get_postgres_connection() as conn:
+        with get_postgres_connection(db_config) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM table")
             result = cursor.fetchone()
     """
-    conn = None
+    conn = get_sqlalchemy_engine(db_config).raw_connection()
     try:
-        conn = psycopg2.connect(**db_config.get_connection_params())
         yield conn
     finally:
-        if conn:
-            conn.close()
-
-
-def get_sqlalchemy_engine(db_config: PostgresConfig):
-    """
-    Create a SQLAlchemy engine for pandas operations.
-
-    Args:
-        db_config: PostgresConfig instance
-
-    Returns:
-        sqlalchemy.engine.Engine: SQLAlchemy engine
-    """
-    params = db_config.get_connection_params()
-    connection_string = f"postgresql://{params['user']}:{params['password']}@{params['host']}:{params['port']}/{params['database']}"
-    return create_engine(connection_string)
+        conn.close()
 
 
 def _fetch_one(
@@ -78,45 +216,6 @@ def _fetch_one(
         return result
 
 
-def get_rows_count(
-    db_config: PostgresConfig,
-    table_schema: str,
-    table_name: str,
-) -> int:
-    """
-    Get the row count for a specific table.
-
-    Args:
-        db_config: PostgresConfig instance
-        table_schema: Schema name
-        table_name: Table name
-
-
-    Returns:
-        Number of rows in the table, or 0 if table doesn't exist
-    """
-    try:
-        # Check if table exists first
-        check_query = """
-        SELECT EXISTS (
-            SELECT FROM information_schema.tables 
-            WHERE table_schema = %s AND table_name = %s
-        )
-        """
-        table_exists = _fetch_one(db_config, check_query, (table_schema, table_name))
-
-        if not table_exists or not table_exists[0]:
-            return 0
-
-        # If table exists, get row count
-        query = f"SELECT COUNT(*) FROM {table_schema}.{table_name}"
-        result = _fetch_one(db_config, query)
-        return result[0] if result else 0
-    except Exception as e:
-        logger.warning(f"Error getting row count for {table_schema}.{table_name}: {e}")
-        return 0
-
-
 def get_loaded_block(
     db_config: PostgresConfig,
     table_schema: str,
@@ -126,12 +225,15 @@ def get_loaded_block(
     column_name: str = "block_number",
 ) -> int:
     """
-    Get the last loaded block number for a specific address from PostgreSQL.
+    Get the next block to load for a specific address from PostgreSQL.
 
     This function determines the starting point for incremental data loading by finding
-    the highest block number already processed for a given contract address. If no data
-    exists for the address or the table doesn't exist, it falls back to the contract
-    creation block number to ensure complete data coverage.
+    the highest block number already processed for a given chain and contract address.
+    If the table doesn't exist or holds no data for the address, it falls back to the
+    contract creation block number to ensure complete data coverage.
+
+    Loaders that checkpoint their progress (see stables.data.load.checkpoints) should
+    prefer the checkpoint table, this scan is the fallback for tables without one.
 
     Args:
         db_config: PostgresConfig instance with database connection parameters
@@ -145,30 +247,371 @@ def get_loaded_block(
         int: The next block number to start loading from (last loaded block + 1),
              or the contract creation block number if no data exists.
 
-    Note:
-        - If the table doesn't exist or contains no data for the address,
-          returns the contract creation block number
-        - Used primarily for incremental data loading to avoid reprocessing existing data
+    Raises:
+        psycopg2.Error: On database errors other than a missing table, rather than
+            silently restarting the backfill from the contract creation block
+    """
+    query = f"""
+    SELECT MAX({column_name})
+    FROM {table_schema}.{table_name}
+    WHERE chainid = %s AND address = %s
     """
     try:
-        query = f"""
-        SELECT MAX(CAST({column_name} AS INTEGER)) 
-        FROM {table_schema}.{table_name} 
-        WHERE address = %s
-        """
-        result = _fetch_one(db_config, query, (address,))
-
-        if result and result[0] is not None:
-            return result[0]
+        result = _fetch_one(db_config, query, (chainid, address))
+    except psycopg2.errors.UndefinedTable:
+        logger.warning(
+            f"Table {table_schema}.{table_name} does not exist. Starting from contract creation block."
+        )
+        result = None
+
+    if result and result[0] is not None:
+        return int(result[0]) + 1
+
+    # No data found, start from contract creation block
+    return get_contract_resolver().creation_block(chainid, address)
+
+
+READ_CHUNK_SIZE = 100_000
+
+
+def build_select(
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    block_range: Optional[Tuple[Optional[int], Optional[int]]] = None,
+    time_range: Optional[Tuple[Any, Any]] = None,
+    where: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    order_by: Optional[str] = None,
+    block_column: str = "block_number",
+    time_column: str = "block_timestamp",
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build a SELECT with the column and range filters pushed down into SQL.
+
+    Args:
+        table: Table as "schema.table"
+        columns: Columns to read, all if None
+        block_range: Inclusive (from_block, to_block) on `block_column`, either bound may be None
+        time_range: (start, end) on `time_column`, start inclusive and end exclusive,
+            either bound may be None
+        where: Additional condition, with %(name)s placeholders
+        params: Values of the placeholders in `where`
+        order_by: ORDER BY clause, e.g. "block_number, log_index"
+        block_column: Column filtered by block_range
+        time_column: Column filtered by time_range
+
+    Returns:
+        tuple[str, dict]: Query and its parameters
+    """
+    conditions = []
+    params = dict(params or {})
+    if block_range is not None:
+        if block_range[0] is not None:
+            conditions.append(f"{block_column} >= %(_from_block)s")
+            params["_from_block"] = block_range[0]
+        if block_range[1] is not None:
+            conditions.append(f"{block_column} <= %(_to_block)s")
+            params["_to_block"] = block_range[1]
+    if time_range is not None:
+        if time_range[0] is not None:
+            conditions.append(f"{time_column} >= %(_start_time)s")
+            params["_start_time"] = time_range[0]
+        if time_range[1] is not None:
+            conditions.append(f"{time_column} < %(_end_time)s")
+            params["_end_time"] = time_range[1]
+    if where:
+        conditions.append(f"({where})")
+
+    query = f"SELECT {', '.join(columns) if columns else '*'} FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    if order_by:
+        query += f" ORDER BY {order_by}"
+    return query, params
+
+
+# Postgres type OIDs of json and jsonb, read as their JSON text
+_JSON_TYPES = (114, 3802)
+# Postgres array type OIDs and the OIDs of their elements
+_ARRAY_ELEMENT_TYPES = {
+    1000: 16,  # bool[]
+    1005: 21,  # int2[]
+    1007: 23,  # int4[]
+    1016: 20,  # int8[]
+    1021: 700,  # float4[]
+    1022: 701,  # float8[]
+    1231: 1700,  # numeric[]
+    1009: 25,  # text[]
+    1015: 1043,  # varchar[]
+}
+
+
+def _arrow_type(type_code: int):
+    """Arrow type of a Postgres type OID, string for types without a mapping."""
+    pa = require_pyarrow()
+    if type_code in _ARRAY_ELEMENT_TYPES:
+        return pa.list_(_arrow_type(_ARRAY_ELEMENT_TYPES[type_code]))
+    types = {
+        16: pa.bool_(),
+        20: pa.int64(),
+        21: pa.int16(),
+        23: pa.int32(),
+        700: pa.float32(),
+        701: pa.float64(),
+        # numeric holds up to uint256 values, kept exact as strings
+        1700: pa.string(),
+        1082: pa.date32(),
+        1114: pa.timestamp("us"),
+        1184: pa.timestamp("us", tz="UTC"),
+    }
+    return types.get(type_code, pa.string())
+
+
+def _arrow_schema(description):
+    """Arrow schema of a result from its cursor description (Postgres type OIDs)."""
+    pa = require_pyarrow()
+    return pa.schema(
+        [(column.name, _arrow_type(column.type_code)) for column in description]
+    )
+
+
+def _to_text(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _rows_to_arrow(rows: List[tuple], description):
+    """
+    Arrow table of rows fetched by psycopg2, typed from the cursor description.
+
+    json values (parsed by psycopg2) are dumped back to JSON text and arrays become
+    list arrays, as read_sql_arrow returns them.
+    """
+    pa = require_pyarrow()
+    schema = _arrow_schema(description)
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = []
+    for field, column, values in zip(schema, description, columns):
+        if column.type_code in _JSON_TYPES:
+            values = [None if v is None else json.dumps(v) for v in values]
+        elif field.type == pa.string():
+            values = [_to_text(v) for v in values]
+        elif pa.types.is_list(field.type) and field.type.value_type == pa.string():
+            values = [None if v is None else [_to_text(x) for x in v] for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _parse_arrays(column, type_code: int, list_type):
+    """
+    List array of a string column holding Postgres array literals, e.g. "{1,NULL,3}".
+
+    One-dimensional arrays of integers and floats are split and cast by Arrow; anything
+    else (other elements, NULL elements, empty or nested arrays) goes through psycopg2's
+    own array parser.
+    """
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+
+    value_type = list_type.value_type
+    if pa.types.is_integer(value_type) or pa.types.is_floating(value_type):
+        try:
+            return pc.split_pattern(pc.utf8_trim(column, "{}"), ",").cast(list_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    parse = psycopg2.extensions.string_types[type_code]
+    values = [None if v is None else parse(v, None) for v in column.to_pylist()]
+    if pa.types.is_string(value_type):
+        values = [None if v is None else [_to_text(x) for x in v] for v in values]
+    return pa.array(values, type=list_type)
+
+
+def _to_frame(table) -> pd.DataFrame:
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _rows_to_frame(rows: List[tuple], description) -> pd.DataFrame:
+    """
+    Plain pandas DataFrame of rows fetched by psycopg2, for when pyarrow is missing.
+
+    numeric and json values are turned into text, as the Arrow readers return them;
+    arrays stay Python lists.
+    """
+    frame = pd.DataFrame.from_records(
+        rows, columns=[column.name for column in description]
+    )
+    for column in description:
+        if column.type_code in _JSON_TYPES:
+            frame[column.name] = frame[column.name].map(
+                lambda v: None if v is None else json.dumps(v)
+            )
+        elif column.type_code == 1700:
+            frame[column.name] = frame[column.name].map(_to_text)
+    return frame
+
+
+def _read_row_chunks(
+    db_config: PostgresConfig, table: str, chunk_size: int, **filters
+) -> Iterator[Tuple[List[tuple], Any]]:
+    """(rows, cursor description) of at most chunk_size rows, a single empty one if there are no rows."""
+    query, params = build_select(table, **filters)
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor(name=f"read_{uuid.uuid4().hex}")
+        cursor.itersize = chunk_size
+        try:
+            cursor.execute(query, params)
+            n_chunks = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows and n_chunks:
+                    break
+                # A named cursor describes its result after the first fetch
+                yield rows, cursor.description
+                n_chunks += 1
+                if not rows:
+                    break
+        finally:
+            cursor.close()
+            conn.rollback()
+
+
+def _read_frame_chunks(
+    db_config: PostgresConfig, table: str, chunk_size: int, **filters
+) -> Iterator[pd.DataFrame]:
+    """DataFrames of _read_row_chunks, Arrow-backed if pyarrow is installed."""
+    arrow = has_pyarrow()
+    for rows, description in _read_row_chunks(db_config, table, chunk_size, **filters):
+        if arrow:
+            yield _to_frame(_rows_to_arrow(rows, description))
         else:
-            # No data found, start from contract creation block
-            creation_txn = get_contract_creation_txn(chainid, address)
-            return int(creation_txn["blockNumber"])
+            yield _rows_to_frame(rows, description)
 
-    except Exception as e:
-        logger.warning(
-            f"No result found querying loaded blocks: {e}. Starting from contract creation block."
+
+def read_sql_chunks(
+    db_config: PostgresConfig,
+    table: str,
+    chunk_size: int = READ_CHUNK_SIZE,
+    **filters,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a table in chunks of Arrow-backed DataFrames through a server-side cursor.
+
+    Only one chunk is held in memory at a time, so tables larger than memory can be
+    aggregated chunk by chunk. numeric columns come as exact strings (cast them in
+    the query, e.g. `amount::float8`, to get floats). Without pyarrow the chunks are
+    plain pandas DataFrames.
+
+    Args:
+        db_config: PostgresConfig instance
+        table: Table as "schema.table"
+        chunk_size: Rows per chunk
+        **filters: Column and range filters, see build_select
+
+    Yields:
+        pd.DataFrame: Chunks of at most chunk_size rows, with pyarrow dtypes if
+            pyarrow is installed
+
+    Example:
+        for chunk in read_sql_chunks(db_config, "ethena_marts.usde_erc20_transfers",
+                                     columns=["block_number", "amount_hex"],
+                                     block_range=(20_000_000, None)):
+            ...
+    """
+    for chunk in _read_frame_chunks(db_config, table, chunk_size, **filters):
+        if len(chunk):
+            yield chunk
+
+
+def read_sql_arrow(db_config: PostgresConfig, table: str, **filters):
+    """
+    Read a table into a pyarrow Table with `COPY ... TO STDOUT`.
+
+    Postgres writes the result as CSV, which pyarrow parses with the column types of
+    the query (see read_sql_chunks for numeric columns), avoiding a Python object per
+    value. The whole result is held in memory, in Arrow's compact layout. json columns
+    come as JSON text and arrays as list arrays.
+
+    Args:
+        db_config: PostgresConfig instance
+        table: Table as "schema.table"
+        **filters: Column and range filters, see build_select
+
+    Returns:
+        pyarrow.Table: Query result
+    """
+    require_pyarrow()
+    query, params = build_select(table, **filters)
+    buffer = io.BytesIO()
+    with get_postgres_connection(db_config) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM ({query}) AS q LIMIT 0", params)
+        description = cursor.description
+        cursor.copy_expert(
+            f"COPY ({cursor.mogrify(query, params).decode()}) TO STDOUT WITH (FORMAT csv)",
+            buffer,
         )
-        # Fall back to contract creation block on any error
-        creation_txn = get_contract_creation_txn(chainid, address)
-        return int(creation_txn["blockNumber"])
+        cursor.close()
+        conn.rollback()
+    return _copy_csv_to_arrow(buffer, description)
+
+
+def _copy_csv_to_arrow(buffer: io.BytesIO, description):
+    """Arrow table of the output of `COPY ... TO STDOUT WITH (FORMAT csv)`."""
+    pa = require_pyarrow()
+    from pyarrow import csv
+
+    schema = _arrow_schema(description)
+    if not buffer.getbuffer().nbytes:
+        return schema.empty_table()
+    # Arrays are written as Postgres array literals, parsed after the CSV
+    csv_types = [
+        pa.string() if pa.types.is_list(field.type) else field.type for field in schema
+    ]
+    buffer.seek(0)
+    table = csv.read_csv(
+        buffer,
+        read_options=csv.ReadOptions(column_names=schema.names),
+        convert_options=csv.ConvertOptions(
+            column_types=dict(zip(schema.names, csv_types)),
+            # COPY writes booleans as t/f
+            true_values=["t"],
+            false_values=["f"],
+            # COPY writes NULL unquoted and empty strings as ""
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    for i, (field, column) in enumerate(zip(schema, description)):
+        if pa.types.is_list(field.type):
+            table = table.set_column(
+                i,
+                field,
+                _parse_arrays(table.column(i), column.type_code, field.type),
+            )
+    return table
+
+
+def read_sql_frame(
+    db_config: PostgresConfig, table: str, method: str = "copy", **filters
+) -> pd.DataFrame:
+    """
+    Read a table into an Arrow-backed DataFrame.
+
+    Without pyarrow, the table is read through the cursor into a plain pandas
+    DataFrame, whatever the method.
+
+    Args:
+        db_config: PostgresConfig instance
+        table: Table as "schema.table"
+        method: "copy" (fastest, see read_sql_arrow) or "cursor" (bounded memory while
+            reading, see read_sql_chunks)
+        **filters: Column and range filters, see build_select
+
+    Returns:
+        pd.DataFrame: Query result with pyarrow dtypes if pyarrow is installed
+    """
+    if method not in ("copy", "cursor"):
+        raise ValueError(f"Unknown method {method!r}, expected 'copy' or 'cursor'")
+    if method == "copy" and has_pyarrow():
+        return _to_frame(read_sql_arrow(db_config, table, **filters))
+    chunks = _read_frame_chunks(db_config, table, READ_CHUNK_SIZE, **filters)
+    return pd.concat(list(chunks), ignore_index=True)
@@ -0,0 +1,89 @@
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; each call
+    takes one token, sleeping until one is available. With the default capacity of
+    one token, calls are spaced 1 / rate apart, so no one-second window ever holds
+    more than `rate` calls.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens added per second (the sustained calls/sec limit)
+            capacity: Maximum burst size. Defaults to 1: a larger bucket lets a burst
+                of `capacity` calls through on top of the refill, exceeding `rate`
+                calls in the first second
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else 1.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        # Also guards the call counters of the sessions drawing from this bucket
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until `tokens` are available and take them.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                sleep_time = (tokens - self.tokens) / self.rate
+            time.sleep(sleep_time)
+            waited += sleep_time
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, calls_per_second: float) -> TokenBucket:
+    """
+    Get the process-wide token bucket for a rate limit key (typically an API key).
+
+    All sessions sharing a key draw from the same bucket, so the limit holds across
+    sessions and threads. The first caller for a key sets its rate.
+
+    Args:
+        key: Identifier of the rate-limited budget, e.g. "etherscan:<api key>"
+        calls_per_second: Sustained rate for the bucket if it does not exist yet
+
+    Returns:
+        TokenBucket: Shared bucket for the key
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(calls_per_second)
+            _buckets[key] = bucket
+        elif bucket.rate != calls_per_second:
+            logger.debug(
+                f"Rate limiter already configured at {bucket.rate}/s, ignoring {calls_per_second}/s"
+            )
+        return bucket
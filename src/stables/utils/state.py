@@ -0,0 +1,9 @@
+import dlt
+
+
+def resource_state() -> dict:
+    """dlt resource state when running in a pipeline, a throwaway dict otherwise."""
+    try:
+        return dlt.current.resource_state()
+    except Exception:
+        return {}
@@ -0,0 +1,132 @@
+import pyarrow as pa
+import pytest
+
+from stables.data.source import defillama, etherscan
+from stables.data.source.defillama import (
+    defillama_stablecoins_chain_tokens,
+    defillama_yield_pools,
+)
+from stables.data.source.etherscan import etherscan_logs, etherscan_transactions
+from stables.utils.arrow import rows_to_arrow
+
+
+def _log(block: int, topics: list) -> dict:
+    return {
+        "address": "0xabc",
+        "topics": topics,
+        "data": "0x",
+        "blockNumber": hex(block),
+        "blockHash": "0x" + "1" * 64,
+        "timeStamp": "0x65f1b2c3",
+        "gasPrice": "0x3b9aca00",
+        "gasUsed": "0xc350",
+        "logIndex": "0x",
+        "transactionHash": "0x" + "2" * 64,
+        "transactionIndex": "0x1",
+    }
+
+
+def test_rows_to_arrow_keeps_the_schema_of_all_null_columns():
+    schema = pa.schema([("id", pa.int64()), ("note", pa.string())])
+    first = rows_to_arrow([{"id": 1, "note": None}], schema)
+    second = rows_to_arrow([{"id": 2}], schema)
+    assert first.schema == second.schema == schema
+
+    # Keys outside the schema are appended after its columns
+    table = rows_to_arrow([{"extra": 1.5, "id": 3}], schema)
+    assert table.column_names == ["id", "note", "extra"]
+    assert table.schema.field("extra").type == pa.float64()
+
+
+def test_log_batches_share_one_schema(monkeypatch):
+    items = [
+        _log(1, ["0xaa"]),
+        _log(2, ["0xaa"]),
+        _log(3, ["0xbb", "0x" + "3" * 64, "0x" + "4" * 64, "0x" + "5" * 64]),
+    ]
+    monkeypatch.setattr(
+        etherscan, "_create_etherscan_source", lambda params, paginate=True: items
+    )
+
+    tables = list(etherscan_logs(1, "0xabc", offset=2, arrow=True))
+    assert [table.num_rows for table in tables] == [2, 1]
+    assert tables[0].schema == tables[1].schema
+    assert tables[0].schema.field("topic3").type == pa.string()
+    assert tables[1].column("topic3").to_pylist() == ["0x" + "5" * 64]
+    assert tables[0].column("logIndex").to_pylist() == [0, 0]
+
+
+def test_transaction_batches_share_one_schema(monkeypatch):
+    transaction = {
+        "blockNumber": "19530226",
+        "timeStamp": "1710338755",
+        "hash": "0x" + "1" * 64,
+        "from": "0xabc",
+        "value": "1000000000000000000000",
+    }
+    items = [dict(transaction), dict(transaction, to="0xdef", nonce="7")]
+    monkeypatch.setattr(
+        etherscan, "_create_etherscan_source", lambda params, paginate=True: items
+    )
+
+    tables = list(etherscan_transactions(1, "0xabc", offset=1, arrow=True))
+    assert tables[0].schema == tables[1].schema
+    assert tables[0].schema.field("timeStamp").type == pa.timestamp("s", tz="UTC")
+    assert tables[0].schema.field("to").type == pa.string()
+    assert tables[1].column("nonce").to_pylist() == [7]
+
+
+def test_yield_pool_batches_share_one_schema(monkeypatch):
+    pools = [
+        {"pool": "a", "chain": "Ethereum", "tvlUsd": 10, "apyReward": None},
+        {
+            "pool": "b",
+            "chain": "Ethereum",
+            "tvlUsd": 20.5,
+            "apyReward": 1.25,
+            "rewardTokens": ["0xabc"],
+            "predictions": {"predictedClass": "Stable/Up", "binnedConfidence": 3},
+        },
+    ]
+    monkeypatch.setattr(
+        defillama,
+        "_create_defillama_source",
+        lambda base_url, endpoint, data_selector: [dict(pool) for pool in pools],
+    )
+
+    tables = list(defillama_yield_pools(arrow=True, batch_size=1))
+    assert tables[0].schema == tables[1].schema
+    assert tables[0].column("apyReward").to_pylist() == [None]
+    assert tables[1].column("reward_tokens").to_pylist() == ['["0xabc"]']
+    assert tables[1].column("predictions").to_pylist()[0]["binnedConfidence"] == 3
+
+
+def test_chain_token_tables_share_one_schema(monkeypatch):
+    stablecoin = {
+        "pegType": "peggedUSD",
+        "chainBalances": {
+            "Ethereum": {"tokens": [{"date": 100, "circulating": {"peggedUSD": 1}}]},
+            "Tron": {"tokens": [{"date": 100, "circulating": {}}]},
+        },
+    }
+    monkeypatch.setattr(defillama, "resource_state", lambda: {})
+    monkeypatch.setattr(
+        defillama, "_fetch_stablecoin", lambda stablecoin_id: stablecoin
+    )
+
+    tables = list(defillama_stablecoins_chain_tokens([1], arrow=True))
+    assert len(tables) == 2
+    assert tables[0].schema == tables[1].schema
+    assert tables[1].column("circulating").to_pylist() == [None]
+
+
+if __name__ == "__main__":
+    test_rows_to_arrow_keeps_the_schema_of_all_null_columns()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_log_batches_share_one_schema(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_transaction_batches_share_one_schema(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_yield_pool_batches_share_one_schema(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_chain_token_tables_share_one_schema(monkeypatch)
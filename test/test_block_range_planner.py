@@ -0,0 +1,95 @@
+import queue
+import threading
+
+import pytest
+
+from stables.data.load import logs
+from stables.data.load.ranges import BlockRangePlanner
+from stables.data.load.logs import _fetch_segment, split_block_range
+
+
+def _simulate(planner: BlockRangePlanner, logs_per_block):
+    """Run the planner against a synthetic chain, returning the loaded windows."""
+    loaded = []
+    while (window := planner.next_window()) is not None:
+        from_block, to_block = window
+        n = sum(logs_per_block(b) for b in range(from_block, to_block + 1))
+        n_returned = min(n, planner.result_cap)
+        if planner.record(from_block, to_block, n_results=n_returned):
+            assert n < planner.result_cap
+            loaded.append((from_block, to_block))
+    return loaded
+
+
+def test_windows_cover_range_without_gaps():
+    planner = BlockRangePlanner(100, 50_000, initial_size=1_000)
+    loaded = _simulate(planner, lambda b: 3 if 20_000 <= b < 21_000 else 0)
+
+    assert loaded[0][0] == 100
+    assert loaded[-1][1] == 50_000
+    for (_, prev_to), (next_from, _) in zip(loaded, loaded[1:]):
+        assert next_from == prev_to + 1
+
+
+def test_dense_region_is_bisected():
+    planner = BlockRangePlanner(0, 9_999, initial_size=10_000)
+    _simulate(planner, lambda b: 1)
+
+    assert planner.n_splits > 0
+    assert planner.done
+
+
+def test_sparse_region_widens_window():
+    planner = BlockRangePlanner(0, 2_000_000, initial_size=1_000, max_size=200_000)
+    _simulate(planner, lambda b: 0)
+
+    assert planner.size == 200_000
+    assert planner.n_calls < 30
+
+
+def test_split_block_range_is_disjoint_and_complete():
+    segments = split_block_range(10, 109, 7)
+
+    assert len(segments) == 7
+    assert segments[0][0] == 10 and segments[-1][1] == 109
+    for (_, prev_to), (next_from, _) in zip(segments, segments[1:]):
+        assert next_from == prev_to + 1
+    assert split_block_range(5, 6, 4) == [(5, 5), (6, 6)]
+
+
+def test_windows_past_the_result_cap_are_bisected_and_refetched(monkeypatch):
+    requests = []
+
+    def etherscan_logs(chainid, address, fromBlock, toBlock, offset, page):
+        # One log per block; getLogs returns at most `offset` logs per page
+        requests.append((fromBlock, toBlock, offset, page))
+        n_logs = min(toBlock - fromBlock + 1, offset)
+        return [{"blockNumber": b} for b in range(fromBlock, fromBlock + n_logs)]
+
+    monkeypatch.setattr(logs, "etherscan_logs", etherscan_logs)
+    batches = queue.Queue()
+    n_calls, n_splits = _fetch_segment(
+        1, "0xabc", 0, 4_999, batches, threading.Event(), 5_000, 5_000
+    )
+
+    # Every window is a single page of at most 1000 logs
+    assert {(offset, page) for _, _, offset, page in requests} == {(1000, 1)}
+    assert n_calls == len(requests) and n_splits > 0
+
+    windows = []
+    while not batches.empty():
+        from_block, to_block, fetched, _ = batches.get()
+        assert len(fetched) == to_block - from_block + 1 < 1000
+        windows.append((from_block, to_block))
+    assert windows[0][0] == 0 and windows[-1][1] == 4_999
+    for (_, prev_to), (next_from, _) in zip(windows, windows[1:]):
+        assert next_from == prev_to + 1
+
+
+if __name__ == "__main__":
+    test_windows_cover_range_without_gaps()
+    test_dense_region_is_bisected()
+    test_sparse_region_widens_window()
+    test_split_block_range_is_disjoint_and_complete()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_windows_past_the_result_cap_are_bisected_and_refetched(monkeypatch)
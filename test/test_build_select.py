@@ -0,0 +1,31 @@
+from stables.utils.postgres import build_select
+
+
+def test_filters_are_pushed_down_as_parameters():
+    query, params = build_select(
+        "ethena_marts.usde_erc20_transfers",
+        columns=["block_number", "amount_hex"],
+        block_range=(100, None),
+        time_range=("2024-01-01", "2024-02-01"),
+        where="to_address = %(to)s",
+        params={"to": "0xabc"},
+        order_by="block_number",
+    )
+
+    assert query == (
+        "SELECT block_number, amount_hex FROM ethena_marts.usde_erc20_transfers"
+        " WHERE block_number >= %(_from_block)s AND block_timestamp >= %(_start_time)s"
+        " AND block_timestamp < %(_end_time)s AND (to_address = %(to)s)"
+        " ORDER BY block_number"
+    )
+    assert params == {
+        "to": "0xabc",
+        "_from_block": 100,
+        "_start_time": "2024-01-01",
+        "_end_time": "2024-02-01",
+    }
+    assert build_select("s.t") == ("SELECT * FROM s.t", {})
+
+
+if __name__ == "__main__":
+    test_filters_are_pushed_down_as_parameters()
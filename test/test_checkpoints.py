@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+
+import pytest
+
+from stables.data.load import checkpoints
+from stables.data.load.checkpoints import (
+    find_gaps,
+    _merge_ranges,
+    get_loaded_ranges,
+    record_loaded_range,
+)
+
+
+class FakeCursor:
+    def __init__(self):
+        self.queries = []
+        self.params = []
+
+    def execute(self, query, params=None):
+        self.queries.append(" ".join(query.split()))
+        self.params.append(params)
+
+    def executemany(self, query, params):
+        self.params.extend(params)
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return (None,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursor_ = FakeCursor()
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_find_gaps_between_and_around_loaded_ranges():
+    ranges = [(300, 399), (100, 199), (150, 250)]
+
+    assert find_gaps(ranges, 0, 500) == [(0, 99), (251, 299), (400, 500)]
+    assert find_gaps(ranges, 100, 399) == [(251, 299)]
+    assert find_gaps([], 10, 20) == [(10, 20)]
+    assert find_gaps([(0, 1000)], 10, 20) == []
+
+
+def test_merge_ranges_joins_overlapping_and_adjacent():
+    assert _merge_ranges([(10, 19), (0, 9), (30, 40), (35, 50)]) == [(0, 19), (30, 50)]
+
+
+def test_checkpoints_are_keyed_by_the_lowercase_address(monkeypatch):
+    monkeypatch.setattr(checkpoints, "_checkpoint_schemas", {"raw"})
+    conn = FakeConnection()
+    record_loaded_range(None, "raw", "logs", 1, "0xAbC", 10, 20, conn=conn)
+
+    assert conn.cursor_.params[-1] == (1, "0xabc", "logs", 10, 20)
+    assert all("0xAbC" not in str(params) for params in conn.cursor_.params)
+
+
+def test_checkpoint_table_is_created_once_and_never_by_readers(monkeypatch):
+    conn = FakeConnection()
+
+    @contextmanager
+    def connection(db_config):
+        yield conn
+
+    monkeypatch.setattr(checkpoints, "get_postgres_connection", connection)
+    monkeypatch.setattr(checkpoints, "_checkpoint_schemas", set())
+
+    # Reading a missing checkpoint table needs no CREATE privilege
+    assert get_loaded_ranges(None, "raw", "logs", 1, "0xabc") == []
+    assert not any(q.startswith("CREATE") for q in conn.cursor_.queries)
+
+    for from_block in (0, 100):
+        record_loaded_range(
+            None, "raw", "logs", 1, "0xabc", from_block, from_block + 99
+        )
+    creates = [q for q in conn.cursor_.queries if q.startswith("CREATE")]
+    assert len(creates) == 2  # schema and table, on the first write only
+
+
+if __name__ == "__main__":
+    test_find_gaps_between_and_around_loaded_ranges()
+    test_merge_ranges_joins_overlapping_and_adjacent()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_checkpoints_are_keyed_by_the_lowercase_address(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_checkpoint_table_is_created_once_and_never_by_readers(monkeypatch)
@@ -0,0 +1,148 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+import requests
+from dlt.extract.exceptions import ResourceExtractionError
+
+from stables.data.source import coingecko
+from stables.data.source.coingecko import (
+    coingecko_batch,
+    coingecko_market_chart_range,
+    market_chart_columns,
+    market_chart_range_windows,
+    ohlc_columns,
+)
+
+DAY = 86400
+
+
+def _utc(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise requests.HTTPError(f"{self.status_code} Client Error", response=self)
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    """market_chart/range with CoinGecko's automatic granularity and a live last point."""
+
+    base_url = "https://api.coingecko.com/api/v3"
+
+    def __init__(self, now: int):
+        self.now = now
+        self.calls = []
+
+    def get(self, url, params):
+        coin_id = url.split("/coins/")[1].split("/")[0]
+        from_ts, to_ts = params["from"], params["to"]
+        self.calls.append((coin_id, from_ts, to_ts))
+        if coin_id == "unknown":
+            return FakeResponse(404)
+        if coin_id == "forbidden":
+            return FakeResponse(401)
+        step = DAY if to_ts - from_ts > 90 * DAY else 3600
+        points = list(range(-(-from_ts // step) * step, min(to_ts, self.now) + 1, step))
+        if to_ts >= self.now:
+            points.append(self.now)
+        prices = [[t * 1000, 1 + t / 1e12] for t in points]
+        return FakeResponse(
+            200,
+            {"prices": prices, "market_caps": prices, "total_volumes": prices[:-1]},
+        )
+
+
+def test_windows_fix_the_granularity():
+    assert market_chart_range_windows(0, 400 * DAY, "daily") == [
+        (0, 365 * DAY),
+        (309 * DAY, 400 * DAY),
+    ]
+    assert market_chart_range_windows(0, DAY, "hourly") == [(-DAY, DAY)]
+    assert market_chart_range_windows(DAY, DAY, "daily") == []
+
+
+def test_backfill_resumes_after_the_last_loaded_timestamp(monkeypatch):
+    state = {}
+    monkeypatch.setattr(coingecko, "resource_state", lambda: state)
+
+    now = int(time.time())
+    today = now // DAY * DAY
+    session = FakeSession(now)
+    rows = list(
+        coingecko_market_chart_range(
+            ["usd-coin", "unknown", "usd-coin"],
+            start=datetime.fromtimestamp(today - 300 * DAY, tz=timezone.utc),
+            end=datetime.fromtimestamp(today - 10 * DAY, tz=timezone.utc),
+            session=session,
+        )
+    )
+    days = [row["timestamp"] for row in rows]
+    assert days[0] == _utc(today - 300 * DAY)
+    assert days[-1] == _utc(today - 10 * DAY)
+    assert len(days) == len(set(days)) == 291
+    # Duplicate coin ids are fetched once, unknown ones skipped
+    assert [call[0] for call in session.calls] == ["usd-coin", "unknown"]
+
+    # The next run only asks for the days after the last loaded one, up to
+    # today's settled point and not the live one
+    session.calls.clear()
+    rows = list(coingecko_market_chart_range(["usd-coin"], session=session))
+    assert len(session.calls) == 1
+    assert [row["timestamp"] for row in rows] == [
+        _utc(today - i * DAY) for i in range(9, -1, -1)
+    ]
+    # A timestamp missing from one of the series is NULL there
+    assert rows[-2]["total_volume"] is not None
+    assert rows[-1]["total_volume"] is None
+
+    # Any other error fails the backfill instead of skipping the coin
+    with pytest.raises(ResourceExtractionError) as excinfo:
+        list(coingecko_market_chart_range(["forbidden"], session=session))
+    assert isinstance(excinfo.value.__cause__, requests.HTTPError)
+    assert excinfo.value.__cause__.response.status_code == 401
+
+
+def test_responses_are_converted_column_wise_in_utc():
+    data = {
+        "prices": [[3000, 1.01], [1000, 1.0], [2000, None], [3000, 1.02]],
+        "market_caps": [[1000, 5e9], [3000, 6e9]],
+        "total_volumes": [[3000, 7e6]],
+    }
+    columns = market_chart_columns(data, after_ms=0)
+    assert columns["timestamp"].tolist() == [1000, 3000]
+    # A duplicate keeps its last point, missing points are NaN
+    assert columns["price"].tolist() == [1.0, 1.02]
+    assert columns["market_cap"].tolist() == [5e9, 6e9]
+    assert columns["total_volume"][0] != columns["total_volume"][0]
+
+    rows = coingecko_batch(columns, coin_id="usd-coin")
+    assert rows[0] == {
+        "coin_id": "usd-coin",
+        "timestamp": datetime(1970, 1, 1, 0, 0, 1, tzinfo=timezone.utc),
+        "price": 1.0,
+        "market_cap": 5e9,
+        "total_volume": None,
+    }
+
+    table = coingecko_batch(ohlc_columns([[0, 1, 2, 0.5, 1.5]]), arrow=True)
+    assert str(table.schema.field("timestamp").type) == "timestamp[ms, tz=UTC]"
+    assert table.column_names == ["timestamp", "open", "high", "low", "close"]
+    assert table.to_pylist()[0]["close"] == 1.5
+    assert market_chart_columns({"prices": []})["timestamp"].tolist() == []
+
+
+if __name__ == "__main__":
+    test_windows_fix_the_granularity()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_backfill_resumes_after_the_last_loaded_timestamp(monkeypatch)
+    test_responses_are_converted_column_wise_in_utc()
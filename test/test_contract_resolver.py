@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from stables.data.source import contracts
+from stables.data.source.contracts import ContractMetadataResolver
+
+
+def test_creation_lookups_are_batched_and_persisted(monkeypatch):
+    calls = []
+
+    def fake_creation_txn(chainid, addresses):
+        calls.append(list(addresses))
+        return [
+            {"contractAddress": a, "blockNumber": str(int(a[-2:], 16))}
+            for a in addresses
+        ]
+
+    addresses = [f"0x{i:040x}" for i in range(7)]
+    monkeypatch.setattr(contracts, "get_contract_creation_txn", fake_creation_txn)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metadata.sqlite")
+        resolver = ContractMetadataResolver(path=path, max_entries=2)
+        assert resolver.creation_blocks(1, addresses) == {
+            a: i for i, a in enumerate(addresses)
+        }
+        assert [len(batch) for batch in calls] == [5, 2]
+
+        # Evicted from the LRU and a fresh process: both served from the store
+        assert resolver.creation_block(1, addresses[0].upper()) == 0
+        assert ContractMetadataResolver(path=path).creation_block(1, addresses[6]) == 6
+        assert len(calls) == 2
+
+
+def test_abis_are_kept_per_chain(monkeypatch):
+    calls = []
+
+    def fake_get_contract_abi(chainid, address, save=True, save_dir="data/abi"):
+        calls.append((chainid, address))
+        abi = [{"type": "event", "name": f"Chain{chainid}", "inputs": []}]
+        os.makedirs(save_dir, exist_ok=True)
+        with open(os.path.join(save_dir, f"{address}.json"), "w") as f:
+            json.dump(abi, f)
+        return abi
+
+    address = "0x" + "ab" * 20
+    monkeypatch.setattr(contracts, "get_contract_abi", fake_get_contract_abi)
+    with tempfile.TemporaryDirectory() as tmp:
+        resolver = ContractMetadataResolver(path=":memory:", abi_dir=tmp)
+        assert resolver.abi(1, address)[0]["name"] == "Chain1"
+        assert resolver.abi(8453, address)[0]["name"] == "Chain8453"
+        assert calls == [(1, address), (8453, address)]
+
+        # A fresh resolver reads each chain's saved file instead of refetching
+        resolver = ContractMetadataResolver(path=":memory:", abi_dir=tmp)
+        assert resolver.abi(8453, address)[0]["name"] == "Chain8453"
+        assert resolver.abi(1, address)[0]["name"] == "Chain1"
+        assert len(calls) == 2
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_creation_lookups_are_batched_and_persisted(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_abis_are_kept_per_chain(monkeypatch)
@@ -0,0 +1,46 @@
+from stables.data.source.etherscan import decode_log_batch
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+def test_decode_log_batch():
+    items = [
+        {
+            "topics": [TRANSFER_TOPIC, "0x" + "1" * 64, "0x" + "2" * 64],
+            "blockNumber": "0x12a01f2",
+            "timeStamp": "0x65f1b2c3",
+            "gasPrice": "0x3b9aca00",
+            "gasUsed": "0xc350",
+            "logIndex": "0x",  # Etherscan encodes index 0 as a bare prefix
+            "transactionIndex": "0x1f",
+        },
+        {
+            "topics": ["0x" + "a" * 64],
+            "blockNumber": "19530226",
+            "timeStamp": "0x65f1b2c3",
+            "gasPrice": "",
+            "gasUsed": "0x0",
+            "logIndex": "0x3",
+            "transactionIndex": "0x",
+        },
+    ]
+
+    decoded = decode_log_batch(items, chainid=1)
+
+    assert decoded[0]["blockNumber"] == 19530226
+    assert decoded[1]["blockNumber"] == 19530226
+    assert decoded[0]["gasPrice"] == 1_000_000_000
+    assert decoded[1]["gasPrice"] is None
+    assert [d["logIndex"] for d in decoded] == [0, 3]
+    assert [d["transactionIndex"] for d in decoded] == [31, 0]
+
+    assert "topics" not in decoded[0]
+    assert decoded[0]["topic0"] == TRANSFER_TOPIC
+    assert decoded[0]["topic2"] == "0x" + "2" * 64
+    assert decoded[0]["topic3"] is None
+    assert decoded[1]["topic1"] is None
+    assert all(d["chainid"] == 1 for d in decoded)
+
+
+if __name__ == "__main__":
+    test_decode_log_batch()
@@ -0,0 +1,75 @@
+import pytest
+
+from stables.data.source import defillama
+from stables.data.source.defillama import defillama_stablecoins_chain_tokens
+
+
+def _stablecoin(series: dict) -> dict:
+    return {
+        "pegType": "peggedUSD",
+        "chainBalances": {
+            chain: {
+                "tokens": [
+                    {"date": date, "circulating": {"peggedUSD": value}}
+                    for date, value in points
+                ]
+            }
+            for chain, points in series.items()
+        },
+    }
+
+
+def test_each_chain_resumes_from_its_own_last_date(monkeypatch):
+    state = {}
+    responses = {}
+    monkeypatch.setattr(defillama, "resource_state", lambda: state)
+    monkeypatch.setattr(
+        defillama, "_fetch_stablecoin", lambda stablecoin_id: responses[stablecoin_id]
+    )
+
+    responses[1] = _stablecoin(
+        {"Ethereum": [(100, 1.0), (200, 2.0)], "Tron": [(100, 5.0)]}
+    )
+    rows = list(defillama_stablecoins_chain_tokens([1], max_concurrency=1))
+    assert len(rows) == 3
+    assert state["chain_last_dates"] == {"1:Ethereum": 200, "1:Tron": 100}
+
+    # Tron catches up on day 200 after Ethereum moved on, and Ethereum's partial
+    # day 200 point is emitted again with its final value
+    responses[1] = _stablecoin(
+        {
+            "Ethereum": [(100, 1.0), (200, 2.5), (300, 3.0)],
+            "Tron": [(100, 5.0), (200, 6.0)],
+        }
+    )
+    rows = list(defillama_stablecoins_chain_tokens([1], max_concurrency=1))
+    assert sorted((row["chain"], row["date"], row["circulating"]) for row in rows) == [
+        ("Ethereum", 200, 2.5),
+        ("Ethereum", 300, 3.0),
+        ("Tron", 100, 5.0),
+        ("Tron", 200, 6.0),
+    ]
+    assert state["chain_last_dates"] == {"1:Ethereum": 300, "1:Tron": 200}
+
+
+def test_a_failed_stablecoin_is_skipped(monkeypatch):
+    state = {}
+
+    def fetch(stablecoin_id):
+        if stablecoin_id == 2:
+            raise ConnectionError("connection reset")
+        return _stablecoin({"Ethereum": [(100, float(stablecoin_id))]})
+
+    monkeypatch.setattr(defillama, "resource_state", lambda: state)
+    monkeypatch.setattr(defillama, "_fetch_stablecoin", fetch)
+
+    rows = list(defillama_stablecoins_chain_tokens([1, 2, 3], max_concurrency=2))
+    assert sorted(row["stablecoin_id"] for row in rows) == [1, 3]
+    assert state["chain_last_dates"] == {"1:Ethereum": 100, "3:Ethereum": 100}
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_each_chain_resumes_from_its_own_last_date(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_a_failed_stablecoin_is_skipped(monkeypatch)
@@ -0,0 +1,64 @@
+import tempfile
+
+import dlt
+import pytest
+
+from stables.data.source import defillama
+from stables.data.source.defillama import defillama_stablecoins
+
+PEGGED_ASSETS = [
+    {
+        "id": "1",
+        "name": "Tether",
+        "symbol": "USDT",
+        "gecko_id": "tether",
+        "pegType": "peggedUSD",
+        "pegMechanism": "fiat-backed",
+        "circulating": {"peggedUSD": 10.0},
+        "chainCirculating": {
+            "Ethereum": {"current": {"peggedUSD": 6.0}},
+            "Tron": {"current": {"peggedUSD": 4.0}},
+        },
+    },
+    {
+        "id": "2",
+        "name": "Unlisted",
+        "symbol": "UNL",
+        "gecko_id": None,
+        "pegType": "peggedUSD",
+        "circulating": {"peggedUSD": 1.0},
+        "chainCirculating": {"Ethereum": {"current": {"peggedUSD": 1.0}}},
+    },
+]
+
+
+def test_stablecoins_are_fetched_once_for_both_tables(monkeypatch):
+    requests = []
+
+    @dlt.resource
+    def response(endpoint):
+        # The request is made when the resource is iterated
+        requests.append(endpoint)
+        yield from PEGGED_ASSETS
+
+    def create_source(base_url, endpoint, data_selector):
+        return response(endpoint)
+
+    monkeypatch.setattr(defillama, "_create_defillama_source", create_source)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = dlt.pipeline(pipeline_name="stablecoins", pipelines_dir=tmp)
+        info = pipeline.extract(defillama_stablecoins())
+        table_metrics = info.metrics[info.loads_ids[0]][0]["table_metrics"]
+
+    assert requests == ["stablecoins"]
+    assert {name: metrics.items_count for name, metrics in table_metrics.items()} == {
+        "defillama_stables_base": 2,
+        # Assets without a gecko_id have no chain circulating rows
+        "defillama_stables_chain_circulating": 2,
+    }
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_stablecoins_are_fetched_once_for_both_tables(monkeypatch)
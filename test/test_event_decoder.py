@@ -0,0 +1,118 @@
+import json
+
+import pandas as pd
+
+from stables.data.decode import EventIndex, decode_events
+from stables.utils.keccak import keccak256, selector
+
+ABI = [
+    {
+        "type": "event",
+        "name": "Transfer",
+        "inputs": [
+            {"name": "from", "type": "address", "indexed": True},
+            {"name": "to", "type": "address", "indexed": True},
+            {"name": "value", "type": "uint256", "indexed": False},
+        ],
+    },
+    {
+        "type": "event",
+        "name": "Mint",
+        "inputs": [
+            {"name": "order_id", "type": "string", "indexed": True},
+            {"name": "delta", "type": "int256", "indexed": False},
+            {"name": "note", "type": "string", "indexed": False},
+            {"name": "amounts", "type": "uint256[]", "indexed": False},
+            {
+                "name": "route",
+                "type": "tuple",
+                "indexed": False,
+                "components": [
+                    {"name": "addr", "type": "address"},
+                    {"name": "ratio", "type": "uint16"},
+                ],
+            },
+        ],
+    },
+    {"type": "function", "name": "transfer", "inputs": []},
+]
+
+
+def _word(value: int) -> str:
+    return f"{value % 2**256:064x}"
+
+
+def test_keccak_matches_known_digests():
+    assert keccak256(b"").hex() == (
+        "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    )
+    assert selector("Transfer(address,address,uint256)") == (
+        "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+    )
+
+
+def test_decode_events_by_topic0_and_topic_count():
+    index = EventIndex.from_abis([ABI])
+    transfer, mint = list(index)
+    assert mint.signature == "Mint(string,int256,string,uint256[],(address,uint16))"
+
+    alice, bob = "0x" + "a" * 40, "0x" + "b" * 40
+    note = b"hello"
+    # Head: delta, offset of note, offset of amounts, route (2 words inline)
+    mint_data = "0x" + "".join(
+        [
+            _word(-5),
+            _word(5 * 32),
+            _word(7 * 32),
+            _word(int(bob, 16)),
+            _word(3),
+            _word(len(note)),
+            note.hex().ljust(64, "0"),
+            _word(2),
+            _word(2**256 - 1),
+            _word(7),
+        ]
+    )
+    logs = pd.DataFrame(
+        {
+            "chainid": [1, 1, 1, 1],
+            "block_number": [10, 10, 11, 12],
+            "log_index": [0, 1, 0, 0],
+            "topic0": [transfer.topic0, mint.topic0, transfer.topic0, "0x" + "0" * 64],
+            "topic1": [
+                "0x" + _word(int(alice, 16)),
+                "0x" + "c" * 64,
+                "0x" + _word(int(bob, 16)),
+                None,
+            ],
+            "topic2": [
+                "0x" + _word(int(bob, 16)),
+                None,
+                "0x" + _word(int(alice, 16)),
+                None,
+            ],
+            "topic3": [None, None, None, None],
+            "data": ["0x" + _word(2**256 - 1), mint_data, "0x" + _word(10**18), "0x"],
+        }
+    )
+
+    decoded = decode_events(logs, index)
+
+    transfers = decoded[transfer]
+    assert list(transfers["from"]) == [alice, bob]
+    assert list(transfers["to"]) == [bob, alice]
+    assert list(transfers["value"]) == [2**256 - 1, 10**18]
+    assert list(transfers["block_number"]) == [10, 11]
+
+    row = decoded[mint].iloc[0]
+    assert row["order_id"] == "0x" + "c" * 64
+    assert row["delta"] == -5
+    assert row["note"] == "hello"
+    assert json.loads(row["amounts"]) == [2**256 - 1, 7]
+    assert json.loads(row["route"]) == [bob, 3]
+    assert index.table_name(mint) == "mint"
+
+
+if __name__ == "__main__":
+    test_keccak_matches_known_digests()
+    test_decode_events_by_topic0_and_topic_count()
@@ -0,0 +1,58 @@
+import pytest
+
+from stables.data.load import logs as logs_module
+from stables.data.load.logs import LogChunkMetrics, follow_logs
+
+
+class FakeResolver:
+    def __init__(self, heads):
+        self.heads = iter(heads)
+
+    def latest_block(self, chainid, max_age=None):
+        head = next(self.heads)
+        if isinstance(head, Exception):
+            raise head
+        return head
+
+
+def test_failed_polls_are_retried_from_the_last_loaded_block(monkeypatch):
+    fetched, committed = [], []
+    failures = {(101, 120)}
+
+    def fetch(chainid, address, from_block, to_block, max_retries=2):
+        fetched.append((from_block, to_block))
+        if (from_block, to_block) in failures:
+            failures.remove((from_block, to_block))
+            raise ConnectionError("Etherscan is down")
+        return []
+
+    def commit(pipeline, db_config, schema, table, chainid, address, f, t, *args):
+        committed.append((f, t))
+        return LogChunkMetrics(f, t, 0, 0, 0.0, 0.0)
+
+    # Head 100 for the backlog, then a failed head poll, a failed fetch and two good polls
+    resolver = FakeResolver([100, TimeoutError("no head"), 120, 120, 130])
+    monkeypatch.setattr(logs_module, "get_contract_resolver", lambda: resolver)
+    monkeypatch.setattr(logs_module, "logs_loading", lambda *args, **kwargs: [])
+    monkeypatch.setattr(logs_module, "fetch_with_retries", fetch)
+    monkeypatch.setattr(logs_module, "commit_window", commit)
+
+    follow_logs(
+        None,
+        None,
+        "raw",
+        "logs",
+        1,
+        "0xabc",
+        confirmations=0,
+        poll_interval=0.001,
+        max_polls=4,
+    )
+
+    assert fetched == [(101, 120), (101, 120), (121, 130)]
+    assert committed == [(101, 120), (121, 130)]
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_failed_polls_are_retried_from_the_last_loaded_block(monkeypatch)
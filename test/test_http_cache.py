@@ -0,0 +1,131 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+from stables.utils.http_cache import (
+    FOREVER,
+    NO_CACHE,
+    CachedSession,
+    HTTPCache,
+    cache_key,
+    default_ttl,
+    record_chain_head,
+)
+
+
+class FakeAdapter(BaseAdapter):
+    """Transport answering every request with a fixed body and ETag."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        if request.headers.get("If-None-Match") == '"v1"':
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response.headers["ETag"] = '"v1"'
+            response._content = b'{"status": "1", "result": []}'
+        return response
+
+    def close(self):
+        pass
+
+
+def _prepare(url, params):
+    return requests.Request("GET", url, params=params).prepare()
+
+
+def test_cache_key_ignores_param_order_and_api_key():
+    a = _prepare("https://api.etherscan.io/v2/api", {"a": 1, "b": 2, "apikey": "x"})
+    b = _prepare("https://api.etherscan.io/v2/api", {"b": 2, "a": 1, "apikey": "y"})
+    c = _prepare("https://api.etherscan.io/v2/api", {"a": 1, "b": 3})
+    assert cache_key(a) == cache_key(b)
+    assert cache_key(a) != cache_key(c)
+
+
+def test_etherscan_block_windows_cached_only_when_final():
+    record_chain_head(1, 1_000_000)
+    url = "https://api.etherscan.io/v2/api"
+    logs = {"chainid": 1, "action": "getLogs", "fromBlock": 0}
+    assert default_ttl(_prepare(url, {**logs, "toBlock": 900_000})) == FOREVER
+    assert default_ttl(_prepare(url, {**logs, "toBlock": 999_990})) == NO_CACHE
+    assert default_ttl(_prepare(url, {**logs, "toBlock": "latest"})) == NO_CACHE
+    assert default_ttl(_prepare(url, {"chainid": 1, "action": "getabi"})) == FOREVER
+    now = int(time.time())
+    block_by_time = {"chainid": 1, "action": "getblocknobytime"}
+    assert default_ttl(_prepare(url, {**block_by_time, "timestamp": now})) == NO_CACHE
+
+
+def test_cached_session_serves_hits_and_revalidates():
+    adapter = FakeAdapter()
+    session = CachedSession(cache=HTTPCache(":memory:"), ttl_policy=lambda r: 60.0)
+    session.mount("https://", adapter)
+    url = "https://stablecoins.llama.fi/stablecoins"
+
+    first = session.get(url)
+    second = session.get(url)
+    assert len(adapter.requests) == 1
+    assert second.json() == first.json()
+    assert getattr(second, "from_cache", False)
+
+    # Expired entries are revalidated with their ETag, a 304 serves the cached body
+    session.cache.refresh(cache_key(adapter.requests[0]), -1.0)
+    third = session.get(url)
+    assert len(adapter.requests) == 2
+    assert adapter.requests[1].headers["If-None-Match"] == '"v1"'
+    assert third.status_code == 200 and third.json() == first.json()
+
+
+def test_prune_drops_expired_old_and_oldest_entries():
+    cache = HTTPCache(":memory:")
+    url = "https://api.etherscan.io/v2/api"
+    cache.put("expired", url, 200, {}, b"x", ttl=-1.0)
+    cache.put("revalidatable", url, 200, {"etag": '"v1"'}, b"x", ttl=-1.0)
+    cache.put("final", url, 200, {}, b"x" * 10, ttl=FOREVER)
+    cache.put("fresh", url, 200, {}, b"x" * 10, ttl=60.0)
+
+    assert cache.prune() == 1
+    assert cache.get("expired") is None
+    assert cache.get("revalidatable") is not None
+
+    # The size cap keeps the newest entries
+    assert cache.prune(max_bytes=15) == 2
+    assert cache.get("fresh") is not None and cache.get("final") is None
+
+    # The age cap also removes entries that never expire
+    cache.put("final", url, 200, {}, b"x", ttl=FOREVER)
+    time.sleep(0.01)
+    assert cache.prune(max_age=0.0) == 2
+    assert cache.get("final") is None
+
+
+def test_importing_the_sources_opens_no_cache():
+    # The cache is opened (and pruned) by the first session, not at import time
+    with tempfile.TemporaryDirectory() as cwd:
+        subprocess.run(
+            [sys.executable, "-c", "import stables.data.source, stables.data.load"],
+            cwd=cwd,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+            check=True,
+        )
+        assert os.listdir(cwd) == []
+
+
+if __name__ == "__main__":
+    test_cache_key_ignores_param_order_and_api_key()
+    test_etherscan_block_windows_cached_only_when_final()
+    test_cached_session_serves_hits_and_revalidates()
+    test_prune_drops_expired_old_and_oldest_entries()
+    test_importing_the_sources_opens_no_cache()
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+from stables.data.load.logs import LogChunkMetrics, _load_logs, _normalized_row_count
+
+
+class FakePipeline:
+    """Pipeline whose runs report row counts in the trace, as dlt's normalize step does."""
+
+    def __init__(self, row_counts):
+        self.row_counts = row_counts
+        self.last_trace = None
+        self.runs = []
+
+    def run(self, data, **kwargs):
+        self.runs.append((data, kwargs))
+        self.last_trace = SimpleNamespace(
+            last_normalize_info=SimpleNamespace(row_counts=self.row_counts)
+        )
+        return SimpleNamespace(loads_ids=["1718000000.123456"])
+
+
+def test_loaded_rows_come_from_the_normalize_trace():
+    # Two of the three fetched logs were already loaded, normalize writes one new row
+    pipeline = FakePipeline({"logs": 1, "_dlt_pipeline_state": 1})
+    metrics = _load_logs(pipeline, "logs", 100, 199, [{}, {}, {}], fetch_seconds=0.5)
+
+    assert isinstance(metrics, LogChunkMetrics)
+    assert (metrics.from_block, metrics.to_block) == (100, 199)
+    assert (metrics.n_fetched, metrics.n_loaded) == (3, 1)
+    assert metrics.fetch_seconds == 0.5 and metrics.load_seconds >= 0
+    assert metrics.load_id == "1718000000.123456"
+    assert pipeline.runs[0][1]["write_disposition"] == "merge"
+
+
+def test_empty_window_is_not_loaded():
+    pipeline = FakePipeline({})
+    metrics = _load_logs(pipeline, "logs", 100, 199, [])
+
+    assert pipeline.runs == []
+    assert (metrics.n_fetched, metrics.n_loaded, metrics.load_id) == (0, 0, None)
+
+
+def test_row_count_defaults_without_normalize_info():
+    pipeline = FakePipeline({})
+    assert _normalized_row_count(pipeline, "logs", default=7) == 7
+
+    pipeline.last_trace = SimpleNamespace(last_normalize_info=None)
+    assert _normalized_row_count(pipeline, "logs", default=7) == 7
+
+    pipeline.last_trace = SimpleNamespace(
+        last_normalize_info=SimpleNamespace(row_counts={"other": 3})
+    )
+    assert _normalized_row_count(pipeline, "logs", default=7) == 7
+
+
+if __name__ == "__main__":
+    test_loaded_rows_come_from_the_normalize_trace()
+    test_empty_window_is_not_loaded()
+    test_row_count_defaults_without_normalize_info()
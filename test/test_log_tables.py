@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+
+import pytest
+
+from stables.data.load import checkpoints, log_tables
+from stables.data.load.log_tables import (
+    _PARTITION_BOUND,
+    partition_ranges,
+    ensure_block_partitions,
+    rollback_blocks,
+)
+
+
+class ScriptedCursor:
+    """Records statements; answers the lookups of rollback_blocks from `results`."""
+
+    def __init__(self, results):
+        self.results = results
+        self.statements = []
+        self.rowcount = 0
+        self.result = None
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        self.statements.append((query, params))
+        self.result = next(
+            (value for match, value in self.results.items() if match in query), None
+        )
+
+    def fetchone(self):
+        return (self.result,)
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class ScriptedConnection:
+    def __init__(self, cursor):
+        self.cursor_ = cursor
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_partition_ranges_are_aligned_and_cover_the_range():
+    assert partition_ranges(1_500, 3_000, 1_000) == [
+        (1_000, 2_000),
+        (2_000, 3_000),
+        (3_000, 4_000),
+    ]
+    assert partition_ranges(0, 999, 1_000) == [(0, 1_000)]
+
+
+def test_partition_bound_is_parsed_from_postgres_expression():
+    match = _PARTITION_BOUND.search("FOR VALUES FROM ('19000000') TO ('20000000')")
+    assert (int(match.group(1)), int(match.group(2))) == (19_000_000, 20_000_000)
+
+
+def test_rollback_deletes_downstream_rows_from_the_start_of_the_day(monkeypatch):
+    # The first log from block 1500 on is at 1700180000, in the UTC day starting at
+    # 1700179200, whose first logged block is 1494
+    cursor = ScriptedCursor(
+        {
+            "to_regclass": "exists",
+            "MIN(time_stamp)": 1_700_180_000,
+            "MIN(block_number)": 1494,
+        }
+    )
+
+    @contextmanager
+    def connection(db_config):
+        yield ScriptedConnection(cursor)
+
+    monkeypatch.setattr(log_tables, "get_postgres_connection", connection)
+    monkeypatch.setattr(checkpoints, "_checkpoint_schemas", {"raw"})
+    rollback_blocks(
+        None,
+        "raw",
+        "logs",
+        1,
+        "0xABC",
+        from_block=1500,
+        downstream_models=[
+            ("stg.logs", "contract_address", None),
+            ("marts.daily", "token_address", "day"),
+        ],
+    )
+
+    deletes = [(q, p) for q, p in cursor.statements if q.startswith("DELETE")]
+    assert deletes == [
+        (
+            "DELETE FROM raw.logs WHERE chainid = %s AND address = %s AND block_number >= %s",
+            (1, "0xabc", 1494),
+        ),
+        (
+            "DELETE FROM stg.logs WHERE chainid = %s AND contract_address = %s AND block_number >= %s",
+            (1, "0xabc", 1494),
+        ),
+        (
+            "DELETE FROM marts.daily WHERE chainid = %s AND token_address = %s AND day >= to_timestamp(%s)",
+            (1, "0xabc", 1_700_179_200),
+        ),
+        (
+            f"DELETE FROM raw.{log_tables.CHECKPOINT_TABLE} WHERE chainid = %s AND address = %s "
+            "AND table_name = %s AND from_block >= %s",
+            (1, "0xabc", "logs", 1494),
+        ),
+    ]
+
+
+def test_partitions_are_added_below_the_first_and_past_the_last(monkeypatch):
+    cursor = ScriptedCursor(
+        {
+            "relkind": True,
+            "pg_get_expr": [
+                ("FOR VALUES FROM ('2000') TO ('3000')",),
+                ("FOR VALUES FROM ('3000') TO ('4000')",),
+            ],
+        }
+    )
+
+    @contextmanager
+    def connection(db_config):
+        yield ScriptedConnection(cursor)
+
+    monkeypatch.setattr(log_tables, "get_postgres_connection", connection)
+    monkeypatch.setattr(log_tables, "_partition_bounds", {})
+    monkeypatch.setattr(log_tables, "_unpartitioned_tables", set())
+    ensure_block_partitions(None, "raw", "logs", 500, 4500)
+
+    created = [q for q, _ in cursor.statements if q.startswith("CREATE TABLE")]
+    assert created == [
+        f"CREATE TABLE IF NOT EXISTS raw.logs_p{start} PARTITION OF raw.logs "
+        f"FOR VALUES FROM ({start}) TO ({start + 1000})"
+        for start in (0, 1000, 4000)
+    ]
+    assert log_tables._partition_bounds[("raw", "logs")] == (1000, 0, 5000)
+
+    # Covered windows need no query
+    n_statements = len(cursor.statements)
+    ensure_block_partitions(None, "raw", "logs", 0, 4999)
+    assert len(cursor.statements) == n_statements
+
+
+if __name__ == "__main__":
+    test_partition_ranges_are_aligned_and_cover_the_range()
+    test_partition_bound_is_parsed_from_postgres_expression()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_rollback_deletes_downstream_rows_from_the_start_of_the_day(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_partitions_are_added_below_the_first_and_past_the_last(monkeypatch)
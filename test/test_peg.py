@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from stables.analytics.peg import PegState, peg_metrics, update_peg_metrics
+
+
+def _long(matrix: np.ndarray, days, coins, column: str) -> pd.DataFrame:
+    frame = pd.DataFrame(
+        {
+            "coin_id": np.tile(coins, len(days)),
+            "timestamp": np.repeat(days, len(coins)),
+            column: matrix.ravel(),
+        }
+    )
+    return frame.dropna()
+
+
+def test_metrics_match_pandas_rolling():
+    rng = np.random.default_rng(1)
+    prices = 1 + rng.normal(0, 0.002, (60, 3))
+    prices[10:13, 1] = np.nan
+    supplies = np.exp(np.cumsum(rng.normal(0, 0.01, (60, 3)), axis=0))
+    metrics = peg_metrics(prices, supplies, np.array([1.0, 1.0, 0.9]), window=10)
+
+    frame = pd.DataFrame(prices)
+    returns = np.log(frame).diff()
+    expected = returns.rolling(10, min_periods=5).std()
+    assert np.allclose(metrics["volatility"], expected, equal_nan=True)
+    deviation = (frame / [1.0, 1.0, 0.9] - 1).abs()
+    assert np.allclose(
+        metrics["max_abs_deviation"],
+        deviation.rolling(10, min_periods=1).max(),
+        equal_nan=True,
+    )
+    changes = np.log(pd.DataFrame(supplies)).diff()
+    baseline = changes.rolling(10, min_periods=5)
+    z = (changes - baseline.mean().shift()) / baseline.std().shift()
+    assert np.allclose(metrics["supply_z"], z, equal_nan=True)
+
+
+def test_incremental_updates_match_a_full_update():
+    rng = np.random.default_rng(2)
+    days = pd.date_range("2024-01-01", periods=80, freq="D", tz="UTC")
+    coins = ["usd-coin", "tether", "ethena-usde"]
+    prices = 1 + rng.normal(0, 0.001, (80, 3))
+    prices[50:53, 2] = 0.97
+    supplies = np.exp(np.cumsum(rng.normal(0, 0.01, (80, 3)), axis=0)) * 1e9
+    supplies[60, 0] *= 0.5
+    # The third coin is only listed from day 20, days without supply carry it forward
+    prices[:20, 2] = supplies[:20, 2] = np.nan
+    supplies[30:33, 1] = np.nan
+    prices = _long(prices, days, coins, "price")
+    supplies = _long(supplies, days, coins, "supply")
+
+    full = update_peg_metrics(PegState(window=14), prices, supplies).metrics
+
+    state, parts = PegState(window=14), []
+    with tempfile.TemporaryDirectory() as tmp:
+        for start, end in [(0, 10), (10, 45), (45, 80)]:
+            period = days[start : end + 1]
+            # A point of an already evaluated day is ignored
+            select = lambda f: f[f["timestamp"].isin(period)]
+            update = update_peg_metrics(state, select(prices), select(supplies))
+            parts.append(update.metrics)
+            update.state.save(os.path.join(tmp, "peg.npz"))
+            state = PegState.load(os.path.join(tmp, "peg.npz"))
+    incremental = pd.concat(parts, ignore_index=True)
+
+    key = ["timestamp", "coin_id"]
+    full = full.sort_values(key).reset_index(drop=True)
+    incremental = incremental.sort_values(key).reset_index(drop=True)
+    assert full[key].equals(incremental[key]) and len(full) == 80 * 3 - 20
+    for column in ["deviation", "max_abs_deviation", "volatility", "supply_z"]:
+        assert np.allclose(full[column], incremental[column], equal_nan=True)
+
+    flagged = full[full["depeg"]]
+    assert set(flagged["coin_id"]) == {"ethena-usde"} and len(flagged) == 3
+    shocks = full[full["supply_shock"]]
+    assert (shocks["coin_id"] == "usd-coin").any()
+    assert shocks["timestamp"].min() >= days[60]
+
+
+if __name__ == "__main__":
+    test_metrics_match_pandas_rolling()
+    test_incremental_updates_match_a_full_update()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from stables.config import PostgresConfig
+from stables.utils import postgres
+from stables.utils.postgres import (
+    _start_idle_reaper,
+    _track_idle_time,
+    close_connection_pools,
+    evict_idle_connections,
+    get_sqlalchemy_engine,
+)
+
+
+def _engine(path: str):
+    # A file-backed SQLite QueuePool, configured like the pooled Postgres engine
+    engine = create_engine(
+        f"sqlite:///{path}",
+        poolclass=QueuePool,
+        pool_size=2,
+        max_overflow=0,
+        pool_use_lifo=True,
+    )
+    _track_idle_time(engine)
+    return engine
+
+
+def _pool_is_closed(engine) -> bool:
+    """Whether no connection idling in the pool holds an open DBAPI connection."""
+    return all(record.dbapi_connection is None for record in engine.pool._pool.queue)
+
+
+def _config(database: str) -> PostgresConfig:
+    config = PostgresConfig()
+    config.database = database
+    return config
+
+
+def test_engines_are_shared_per_database():
+    engine = get_sqlalchemy_engine(_config("stables"))
+    assert get_sqlalchemy_engine(_config("stables")) is engine
+    assert get_sqlalchemy_engine(_config("other")) is not engine
+
+    close_connection_pools()
+    assert get_sqlalchemy_engine(_config("stables")) is not engine
+    close_connection_pools()
+
+
+def test_returned_connections_are_reused():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(os.path.join(tmp, "pool.db"))
+        connection = engine.raw_connection()
+        dbapi_connection = connection.dbapi_connection
+        connection.close()
+
+        connection = engine.raw_connection()
+        assert connection.dbapi_connection is dbapi_connection
+        connection.close()
+        assert evict_idle_connections(engine) == 0
+        engine.dispose()
+
+
+def test_idle_connections_are_evicted(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(os.path.join(tmp, "pool.db"))
+        busy, idle = engine.raw_connection(), engine.raw_connection()
+        busy_dbapi, idle_dbapi = busy.dbapi_connection, idle.dbapi_connection
+        idle.close()
+        time.sleep(0.01)
+
+        monkeypatch.setattr(postgres, "POOL_IDLE_TIMEOUT", 0.005)
+        # Only the connection sitting in the pool is closed, not the checked out one
+        assert evict_idle_connections(engine) == 1
+        assert evict_idle_connections(engine) == 0
+        busy.cursor().execute("SELECT 1")
+
+        # The evicted connection reconnects when it is next checked out
+        connection = engine.raw_connection()
+        assert connection.dbapi_connection not in (busy_dbapi, idle_dbapi)
+        connection.cursor().execute("SELECT 1")
+        connection.close()
+        busy.close()
+        engine.dispose()
+
+
+def test_the_reaper_evicts_without_a_checkout(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(os.path.join(tmp, "pool.db"))
+        engine.raw_connection().close()
+
+        monkeypatch.setattr(postgres, "POOL_IDLE_TIMEOUT", 0.02)
+        stop = _start_idle_reaper(engine)
+        try:
+            deadline = time.monotonic() + 5
+            while not _pool_is_closed(engine) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert _pool_is_closed(engine)
+        finally:
+            stop.set()
+        engine.dispose()
+
+
+def test_idle_connection_is_replaced_on_checkout(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(os.path.join(tmp, "pool.db"))
+        connection = engine.raw_connection()
+        dbapi_connection = connection.dbapi_connection
+        connection.close()
+        time.sleep(0.01)
+
+        # Idle for longer than the timeout but not swept yet
+        monkeypatch.setattr(postgres, "POOL_IDLE_TIMEOUT", 0.005)
+        connection = engine.raw_connection()
+        assert connection.dbapi_connection is not dbapi_connection
+        connection.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_engines_are_shared_per_database()
+    test_returned_connections_are_reused()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_idle_connections_are_evicted(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_the_reaper_evicts_without_a_checkout(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_idle_connection_is_replaced_on_checkout(monkeypatch)
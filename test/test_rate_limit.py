@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import BaseAdapter
+
+from stables.data.source.etherscan import RateLimitedSession
+from stables.utils.http_cache import HTTPCache
+from stables.utils.rate_limit import TokenBucket, get_rate_limiter
+
+
+def test_token_bucket_enforces_rate_across_threads():
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: bucket.acquire(), range(11)))
+    elapsed = time.monotonic() - start
+
+    # First token is available immediately, the remaining 10 refill at 20/s
+    assert elapsed >= 0.45
+
+
+def test_no_second_holds_more_calls_than_the_rate():
+    bucket = TokenBucket(rate=10)
+    times = []
+
+    def call(_):
+        bucket.acquire()
+        times.append(time.monotonic())
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(call, range(25)))
+
+    times.sort()
+    for start in times:
+        assert sum(start <= t < start + 1 for t in times) <= 10
+
+
+def test_rate_limiter_is_shared_per_key():
+    assert get_rate_limiter("test:key", 5) is get_rate_limiter("test:key", 5)
+    assert get_rate_limiter("test:key", 5) is not get_rate_limiter("test:other", 5)
+
+
+class EmptyResultAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = request.url
+        response._content = b'{"status": "1", "result": []}'
+        return response
+
+    def close(self):
+        pass
+
+
+def test_session_send_is_rate_limited_across_threads():
+    session = RateLimitedSession(
+        calls_per_second=20, rate_limit_key="test:send", cache=HTTPCache(":memory:")
+    )
+    session.mount("https://", EmptyResultAdapter())
+    # dlt's RESTClient sends prepared requests with `send`, not `request`
+    url = "https://api.etherscan.io/v2/api?module=logs&action=getLogs&toBlock=latest"
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(
+            executor.map(
+                lambda _: session.send(requests.Request("GET", url).prepare()),
+                range(11),
+            )
+        )
+    elapsed = time.monotonic() - start
+
+    assert session.request_count == 11
+    assert elapsed >= 0.45
+
+
+if __name__ == "__main__":
+    test_token_bucket_enforces_rate_across_threads()
+    test_no_second_holds_more_calls_than_the_rate()
+    test_rate_limiter_is_shared_per_key()
+    test_session_send_is_rate_limited_across_threads()
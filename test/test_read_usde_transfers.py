@@ -1,24 +1,35 @@
 import pandas as pd
-from stables.utils.postgres import get_sqlalchemy_engine
+from stables.utils.postgres import read_sql_chunks, read_sql_frame
 from stables.config import PostgresConfig
 
+TRANSFERS_TABLE = "ethena_marts.usde_erc20_transfers"
 
-def read_usde_erc20_transfers(db_config: PostgresConfig) -> pd.DataFrame:
+
+def read_usde_erc20_transfers(db_config: PostgresConfig, **filters) -> pd.DataFrame:
     """
-    Read ethena_marts.usde_erc20_transfers table into a pandas DataFrame.
+    Read ethena_marts.usde_erc20_transfers table into an Arrow-backed pandas DataFrame.
     
     Args:
         db_config: PostgresConfig instance with database connection parameters
+        **filters: Column and range filters pushed down into SQL, see build_select
         
     Returns:
-        pd.DataFrame: DataFrame containing all rows from ethena_marts.usde_erc20_transfers
+        pd.DataFrame: DataFrame containing the matching rows from ethena_marts.usde_erc20_transfers
         
     Raises:
         Exception: If the table doesn't exist or there's a database connection error
     """
-    engine = get_sqlalchemy_engine(db_config)
-    query = "SELECT * FROM ethena_marts.usde_erc20_transfers"
-    return pd.read_sql(query, engine)
+    return read_sql_frame(db_config, TRANSFERS_TABLE, **filters)
+
+
+def count_usde_erc20_transfers_by_day(db_config: PostgresConfig) -> pd.Series:
+    """Count transfers per day, streaming the table in chunks with bounded memory."""
+    counts = []
+    for chunk in read_sql_chunks(db_config, TRANSFERS_TABLE, columns=["block_timestamp"]):
+        counts.append(chunk["block_timestamp"].dt.floor("D").value_counts())
+    if not counts:
+        return pd.Series(dtype="int64")
+    return pd.concat(counts).groupby(level=0).sum().sort_index()
 
 
 def test_read_usde_erc20_transfers():
@@ -31,6 +42,14 @@ def test_read_usde_erc20_transfers():
         print(f"Columns: {list(df.columns)}")
         if not df.empty:
             print(f"Sample data:\n{df.head()}")
+            last_block = int(df["block_number"].max())
+            recent = read_usde_erc20_transfers(
+                db_config,
+                columns=["block_number", "from_address", "to_address", "amount"],
+                block_range=(last_block - 1000, None),
+            )
+            print(f"{len(recent)} transfers in the last 1000 blocks")
+            print(f"Transfers per day:\n{count_usde_erc20_transfers_by_day(db_config).tail()}")
         return df
     except Exception as e:
         print(f"Error reading table: {e}")
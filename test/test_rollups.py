@@ -0,0 +1,79 @@
+import hashlib
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from stables.analytics.rollups import (
+    hll_estimate,
+    hll_merge,
+    hll_sketch,
+    rollup_periods,
+)
+
+
+def _addresses(start: int, stop: int):
+    return [f"0x{i:040X}" for i in range(start, stop)]
+
+
+def test_sketch_registers_and_estimates():
+    address = "0x00000000000000000000000000000000000000Ab"
+    hashed = int(hashlib.md5(address.lower().encode()).hexdigest()[:16], 16)
+    sketch = hll_sketch([address])
+    # The top 11 bits select the register, which keeps the position of the first 1-bit
+    assert np.flatnonzero(sketch).tolist() == [hashed >> 53]
+    assert sketch.max() == 53 - (hashed & ((1 << 53) - 1)).bit_length() + 1
+
+    # Lower-case hashing makes the sketch case insensitive
+    assert np.array_equal(
+        hll_sketch(_addresses(0, 100)),
+        hll_sketch(a.lower() for a in _addresses(0, 100)),
+    )
+    for n in [100, 50_000]:
+        assert abs(hll_estimate(hll_sketch(_addresses(0, n))) - n) < 0.05 * n
+
+    # The union of overlapping sketches counts the union of the sets
+    merged = hll_merge(
+        [hll_sketch(_addresses(0, 6000)), hll_sketch(_addresses(4000, 9000))]
+    )
+    assert np.array_equal(merged, hll_sketch(_addresses(0, 9000)))
+
+
+def test_rollup_periods_merges_daily_sketches():
+    days = pd.date_range("2024-01-01", periods=40, freq="D", tz="UTC")
+    daily = pd.DataFrame(
+        {
+            "chainid": 1,
+            "token_address": "0xtoken",
+            "day": days,
+            "transfer_count": 10,
+            "mint_count": 1,
+            "burn_count": 0,
+            "volume": [Decimal("1.5")] * len(days),
+            "mint_volume": [Decimal(1)] * len(days),
+            "burn_volume": [Decimal(0)] * len(days),
+            "first_block": range(0, 400, 10),
+            "last_block": range(9, 400, 10),
+            # The same 200 senders every day, 50 new receivers per day
+            "sender_hll": [hll_sketch(_addresses(0, 200)) for _ in days],
+            "receiver_hll": [
+                hll_sketch(_addresses(50 * i, 50 * i + 50)) for i in range(len(days))
+            ],
+        }
+    )
+    months = rollup_periods(daily, "M")
+    assert months["period"].tolist() == [
+        pd.Timestamp("2024-01-01", tz="UTC"),
+        pd.Timestamp("2024-02-01", tz="UTC"),
+    ]
+    january = months.iloc[0]
+    assert january["transfer_count"] == 310
+    assert january["volume"] == Decimal("46.5")
+    assert (january["first_block"], january["last_block"]) == (0, 309)
+    assert abs(january["sender_count"] - 200) < 10
+    assert abs(january["receiver_count"] - 31 * 50) < 0.05 * 31 * 50
+
+
+if __name__ == "__main__":
+    test_sketch_registers_and_estimates()
+    test_rollup_periods_merges_daily_sketches()
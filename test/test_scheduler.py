@@ -0,0 +1,132 @@
+import os
+import tempfile
+
+import pytest
+
+from stables.data.load import scheduler as scheduler_module
+from stables.data.load.logs import LogChunkMetrics
+from stables.data.load.scheduler import (
+    LogScheduler,
+    LogTarget,
+    _TargetState,
+    load_manifest,
+)
+
+MANIFEST = """
+[defaults]
+table_schema = "ethena_raw"
+table_name = "usde_contract_logs"
+
+[[targets]]
+chainid = 1
+address = "0x4C9EDD5852cd905f086C759E8383e09bff1E68B3"
+
+[[targets]]
+chainid = 8453
+address = "0x5d3a1ff2b6bab83b63cd9ad0787074081a52ef34"
+table_name = "usde_base_logs"
+start_block = 100
+"""
+
+
+def test_load_manifest_applies_defaults():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "targets.toml")
+        with open(path, "w") as f:
+            f.write(MANIFEST)
+        usde, base = load_manifest(path)
+
+    assert usde.address == "0x4c9edd5852cd905f086c759e8383e09bff1e68b3"
+    assert (usde.table_schema, usde.table_name, usde.start_block) == (
+        "ethena_raw",
+        "usde_contract_logs",
+        None,
+    )
+    assert (base.chainid, base.table_name, base.start_block) == (
+        8453,
+        "usde_base_logs",
+        100,
+    )
+
+
+def test_target_state_walks_gaps_in_order():
+    state = _TargetState(
+        None, [(0, 99), (200, 299)], block_chunk_size=100, max_block_chunk_size=100
+    )
+    assert state.lag == 300
+
+    assert state.next_window() == (0, 99)
+    assert state.planner.record(0, 99, n_results=10)
+    assert state.lag == 100
+    assert state.next_window() == (200, 299)
+    assert state.planner.record(200, 299, n_results=10)
+    assert state.next_window() is None and state.lag == 0
+
+
+class FixedPlanScheduler(LogScheduler):
+    """Scheduler with fixed block gaps per target, so no chain head or database is needed."""
+
+    def __init__(self, targets, gaps):
+        super().__init__(
+            targets, db_config=None, max_workers=2, poll_interval=60, loader="copy"
+        )
+        self.gaps = gaps
+
+    def plan(self):
+        return [
+            _TargetState(t, self.gaps[t.address], 100, 100)
+            for t in self.targets
+            if not self._is_backing_off(t)
+        ]
+
+
+def test_failing_target_is_backed_off_and_others_keep_loading(monkeypatch):
+    broken = LogTarget(1, "0xbad", "raw", "logs")
+    healthy = LogTarget(1, "0xok", "raw", "logs")
+    scheduler = FixedPlanScheduler(
+        [broken, healthy], {"0xbad": [(0, 299)], "0xok": [(0, 299)]}
+    )
+
+    def fetch(chainid, address, from_block, to_block):
+        if address == "0xbad":
+            raise RuntimeError("Etherscan is down")
+        return []
+
+    def commit(pipeline, db_config, schema, table, chainid, address, f, t, *args):
+        return LogChunkMetrics(f, t, 0, 0, 0.0, 0.0, load_id=address)
+
+    monkeypatch.setattr(scheduler_module, "fetch_with_retries", fetch)
+    monkeypatch.setattr(scheduler_module, "commit_window", commit)
+
+    results = scheduler.run_once()
+    assert sorted((m.load_id, m.from_block, m.to_block) for _, m in results) == [
+        ("0xok", 0, 99),
+        ("0xok", 100, 199),
+        ("0xok", 200, 299),
+    ]
+    assert list(scheduler.errors) == [broken.name]
+    assert scheduler._is_backing_off(broken)
+    assert not scheduler._is_backing_off(healthy)
+
+
+def test_run_forever_survives_a_failed_round():
+    rounds = []
+
+    class FlakyScheduler(LogScheduler):
+        def run_once(self):
+            rounds.append(len(rounds))
+            if len(rounds) == 1:
+                raise ConnectionError("Postgres is down")
+            self.stop()
+            return []
+
+    FlakyScheduler([], db_config=None, poll_interval=0.01).run_forever()
+    assert rounds == [0, 1]
+
+
+if __name__ == "__main__":
+    test_load_manifest_applies_defaults()
+    test_target_state_walks_gaps_in_order()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_failing_target_is_backed_off_and_others_keep_loading(monkeypatch)
+    test_run_forever_survives_a_failed_round()
@@ -0,0 +1,72 @@
+import io
+from collections import namedtuple
+
+from decimal import Decimal
+
+from stables.utils.postgres import _copy_csv_to_arrow, _rows_to_arrow, _rows_to_frame
+
+Column = namedtuple("Column", ["name", "type_code"])
+
+# bool, jsonb, int2[], text[], bool[]
+DESCRIPTION = [
+    Column("active", 16),
+    Column("meta", 3802),
+    Column("registers", 1005),
+    Column("tags", 1009),
+    Column("flags", 1000),
+]
+EXPECTED = [
+    {
+        "active": True,
+        "meta": '{"a": 1}',
+        "registers": [0, 3, 1],
+        "tags": ["a", "b,c", None],
+        "flags": [True, False],
+    },
+    {"active": False, "meta": None, "registers": [], "tags": [], "flags": None},
+    {"active": None, "meta": "[1, 2]", "registers": None, "tags": None, "flags": []},
+]
+
+
+def test_copy_csv_reads_booleans_json_and_arrays():
+    # As written by COPY ... TO STDOUT WITH (FORMAT csv)
+    csv = (
+        't,"{""a"": 1}","{0,3,1}","{a,""b,c"",NULL}","{t,f}"\n'
+        "f,,{},{},\n"
+        ',"[1, 2]",,,{}\n'
+    )
+    table = _copy_csv_to_arrow(io.BytesIO(csv.encode()), DESCRIPTION)
+    assert table.to_pylist() == EXPECTED
+
+
+def test_cursor_rows_match_copy():
+    # As fetched by psycopg2, which parses json and arrays
+    rows = [
+        (True, {"a": 1}, [0, 3, 1], ["a", "b,c", None], [True, False]),
+        (False, None, [], [], None),
+        (None, [1, 2], None, None, []),
+    ]
+    table = _rows_to_arrow(rows, DESCRIPTION)
+    assert table.to_pylist() == EXPECTED
+    assert str(table.schema.field("registers").type) == "list<item: int16>"
+
+
+def test_cursor_rows_to_plain_pandas_without_pyarrow():
+    description = DESCRIPTION + [Column("amount", 1700)]
+    rows = [
+        (True, {"a": 1}, [0, 3, 1], ["a", "b,c", None], [True, False], Decimal("1e30")),
+        (False, None, [], [], None, None),
+    ]
+    frame = _rows_to_frame(rows, description)
+    assert list(frame.columns) == [column.name for column in description]
+    assert frame["meta"][0] == '{"a": 1}' and frame["meta"].isna()[1]
+    assert frame["registers"].tolist() == [[0, 3, 1], []]
+    # numeric is exact text, as the Arrow readers return it
+    assert frame["amount"][0] == "1E+30" and frame["amount"].isna()[1]
+    assert _rows_to_frame([], description).empty
+
+
+if __name__ == "__main__":
+    test_copy_csv_reads_booleans_json_and_arrays()
+    test_cursor_rows_match_copy()
+    test_cursor_rows_to_plain_pandas_without_pyarrow()